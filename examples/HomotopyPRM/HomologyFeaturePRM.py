@@ -41,6 +41,7 @@ feat2 = gr.FeatureNode(3, "uf-1", pt=np.array([3.0, 3.0]), keywords={'upwelling
 
 initialNodes = [startN, endN, feat1, feat2]
 
+map['hazard_index'] = gr.get_hazard_index(map) # reused for every edge
 G = gr.PRM(map, 100, 6.0, connection=gr.HEdgeConn, initialNodes=initialNodes)
 
 
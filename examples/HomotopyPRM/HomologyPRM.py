@@ -36,6 +36,7 @@ map = {'width': 20, 'height': 20, 'hazards': np.array([[5.0, 5.0], [7.5, 3.0]])}
 startN = gr.GeometricNode(0, np.array([6, 7]))
 endN = gr.GeometricNode(1, np.array([8.5, 7]))
 
+map['hazard_index'] = gr.get_hazard_index(map) # reused for every edge
 G = gr.PRM(map, 100, 6.0, connection=gr.HEdgeConn, initialNodes=[startN, endN])
 
 
@@ -20,6 +20,7 @@
 # Written Ian Rankin - March 2020
 #
 # An example set of code to show loading and saving a graph structure using pickle
+# and using the homotopy roadmap format (save_h_roadmap, load_h_roadmap)
 
 import rdml_graph as gr
 import numpy as np
@@ -72,4 +73,15 @@ loaded = pickle.load( open("sample.g", "rb"))
 plt.figure()
 gr.plot2DGeoGraph(loaded, 'red')
 plt.title('Loaded graph')
+plt.show(block=False)
+
+# The homotopy roadmap format stores the HEdge signatures as arrays, so they
+# are not recomputed, and the arrays are memory mapped when loaded.
+gr.save_h_roadmap(G, 'sample_roadmap', map={'hazards': features})
+
+loaded_roadmap, loaded_map = gr.load_h_roadmap('sample_roadmap')
+
+plt.figure()
+gr.plot2DGeoGraph(loaded_roadmap, 'green')
+plt.title('Loaded homotopy roadmap')
 plt.show()
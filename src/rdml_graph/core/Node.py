@@ -122,20 +122,21 @@ class TreeNode(Node):
     # to return the list of all states in path.
     # @return a list of nodes along the tree to root [0] is the current node.
     def getRevPath(self):
-        if self.parent is None:
-            return [self]
-
-        return [self] + self.parent.getRevPath()
+        path = []
+        cur = self
+        while cur is not None:
+            path.append(cur)
+            cur = cur.parent
+        return path
 
     ## getPath
     # This function works its way to up the search tree to the root node
     # to return the list of all states in path.
     # @return a list of nodes along the tree to root [0] is the root
     def getPath(self):
-        if self.parent is None:
-            return [self]
-
-        return self.parent.getPath() + [self]
+        path = self.getRevPath()
+        path.reverse()
+        return path
 
     # getTreeStats
     # This function returns various statistics about the current tree
@@ -83,33 +83,51 @@ class SearchState(TreeNode):
     # This function works its way to up the search tree to the root node
     # to return the list of all states in path.
     def getRevPath(self):
-        if self.parent is None:
-            return [self.state]
-
-        return [self.state] + self.parent.getRevPath()
+        path = []
+        cur = self
+        while cur is not None:
+            path.append(cur.state)
+            cur = cur.parent
+        return path
 
 
     ## getPath
     # This function works its way to up the search tree to the root node
     # to return the list of all states in path.
     def getPath(self, keepEdges=False, keepNodes=True):
-        if self.parent is None:
-            if keepNodes:
-                return [self.state]
-            else:
-                return []
-
-        if keepEdges and keepNodes:
-            return self.parent.getPath(keepEdges=True) + \
-                    [self.parent.state.e[self.parent_e_id], self.state]
-        elif keepEdges:
-            return self.parent.getPath(keepEdges=True, keepNodes=False) + \
-                    [self.parent.state.e[self.parent_e_id]]
-        elif keepNodes:
-            return self.parent.getPath() + [self.state]
-        else:
+        depth = self.depth()
+        if depth == 0:
+            return [self.state] if keepNodes else []
+        if not keepEdges and not keepNodes:
             raise ValueError("Cannot keep neither edges nor nodes in path, please select one or both of them.")
 
+        # fill a preallocated path from the end, walking up the tree.
+        step = 2 if keepEdges and keepNodes else 1
+        path = [None] * (depth * step + keepNodes)
+        i = len(path) - 1
+        cur = self
+        while cur.parent is not None:
+            if keepNodes:
+                path[i] = cur.state
+                i -= 1
+            if keepEdges:
+                path[i] = cur.parent.state.e[cur.parent_e_id]
+                i -= 1
+            cur = cur.parent
+        if keepNodes:
+            path[0] = cur.state
+        return path
+
+    ## depth
+    # @return - the number of parents between the search state and the root.
+    def depth(self):
+        depth = 0
+        cur = self.parent
+        while cur is not None:
+            depth += 1
+            cur = cur.parent
+        return depth
+
     ################################ Operator overloads
 
     ## < operator overload
@@ -27,7 +27,7 @@ import shapely.geometry as geo
 from ..core import GeometricNode
 from ..core import Edge
 from ..homotopy import HEdge
-from ..homotopy import HomologySignature, HomotopySignature
+from ..homotopy import HomologySignature, HomotopySignature, HazardIndex
 
 ########################## Sampling functions for PRM's
 
@@ -106,6 +106,34 @@ def polygonCollision(u, v, map):
 
 ######################### Edge connection functions
 
+## get_hazard_index
+# Builds the HazardIndex of the map's hazards. Build it once per map and store
+# it as map['hazard_index'] so HEdgeConn and HomotopyEdgeConn reuse it for
+# every edge of a PRM. The index is owned by the caller, and must be rebuilt
+# if map['hazards'] or map['ray_angle'] are changed.
+# @param map - the input map MUST have map['hazards'] defined as a 2d numpy array
+#
+# @return - the HazardIndex for map['hazards'] and map['ray_angle'] (if given)
+def get_hazard_index(map):
+    ray_angle = map['ray_angle'] if 'ray_angle' in map else np.pi/2
+    return HazardIndex(map['hazards'], ray_angle)
+
+## edge_features
+# Gets the features and ray angle used to compute the signature of an edge.
+# This is map['hazard_index'] if the caller has built one, otherwise the
+# map['hazards'] array is tested directly.
+# @param map - the input map MUST have map['hazards'] defined as a 2d numpy array
+#
+# @return - features (HazardIndex or numpy array), ray_angle
+def edge_features(map):
+    ray_angle = map['ray_angle'] if 'ray_angle' in map else np.pi/2
+    if 'hazard_index' in map:
+        index = map['hazard_index']
+        if index.shape[0] != map['hazards'].shape[0] or index.ray_angle != ray_angle:
+            raise ValueError('map hazard_index does not match the map hazards and ray_angle')
+        return index, ray_angle
+    return map['hazards'], ray_angle
+
 ## EdgeConnection
 # Creates a connection between node u to node v.
 # Default version just connects the two using an Edge object
@@ -126,7 +154,8 @@ def EdgeConnection(parent, child, map, cost = None):
 # Creates a connection between parent and child node using a Homotopy Edge
 # @param parent - parent node of connection
 # @param child - child node of connection.
-# @param map - the input map MUST have map['features'] defined as a 2d numpy array
+# @param map - the input map MUST have map['hazards'] defined as a 2d numpy array,
+#       and may have map['hazard_index'] (see get_hazard_index)
 # @param cost - the cost of the connection (if None assume it must caluclate the cost)
 #
 # @return - cost of edge.
@@ -135,12 +164,9 @@ def HEdgeConn(parent, child, map, cost = None):
         cost = np.linalg.norm(parent.pt - child.pt, ord=2)
 
     h_sign = HomologySignature(map['hazards'].shape[0])
-    if 'ray_angle' in map:
-        parent.addEdge(HEdge(parent, child, h_sign, cost=cost, \
-                        features=map['hazards'], ray_angle=map['ray_angle']))
-    else:
-        parent.addEdge(HEdge(parent, child, h_sign, cost=cost,\
-                            features=map['hazards']))
+    features, ray_angle = edge_features(map)
+    parent.addEdge(HEdge(parent, child, h_sign, cost=cost, \
+                    features=features, ray_angle=ray_angle))
 
     return cost
 
@@ -148,7 +174,8 @@ def HEdgeConn(parent, child, map, cost = None):
 # Creates a connection between parent and child node using a Homotopy Edge
 # @param parent - parent node of connection
 # @param child - child node of connection.
-# @param map - the input map MUST have map['features'] defined as a 2d numpy array
+# @param map - the input map MUST have map['hazards'] defined as a 2d numpy array,
+#       and may have map['hazard_index'] (see get_hazard_index)
 # @param cost - the cost of the connection (if None assume it must caluclate the cost)
 #
 # @return - cost of edge.
@@ -157,11 +184,8 @@ def HomotopyEdgeConn(parent, child, map, cost = None):
         cost = np.linalg.norm(parent.pt - child.pt, ord=2)
 
     h_sign = HomotopySignature()
-    if 'ray_angle' in map:
-        parent.addEdge(HEdge(parent, child, h_sign, cost=cost, \
-                        features=map['hazards'], ray_angle=map['ray_angle']))
-    else:
-        parent.addEdge(HEdge(parent, child, h_sign, cost=cost,\
-                            features=map['hazards']))
+    features, ray_angle = edge_features(map)
+    parent.addEdge(HEdge(parent, child, h_sign, cost=cost, \
+                    features=features, ray_angle=ray_angle))
 
     return cost
@@ -1,7 +1,7 @@
 from .PRM import PRM, sample2DUniform, noCollision, EdgeConnection
 from .BasicSamplingFunctions import sample2DUniform, sample2DPolygon, \
                     noCollision, polygonCollision, \
-                    EdgeConnection, HEdgeConn, HomotopyEdgeConn
+                    EdgeConnection, HEdgeConn, HomotopyEdgeConn, get_hazard_index
 
 from .CostmapSamplingFunctions import sample2DPolygonCostmap, costmapCollision, costmapCollisionPt
 from .ConnectedGrid import connected_grid
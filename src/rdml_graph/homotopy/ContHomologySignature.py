@@ -16,26 +16,22 @@
 # OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 # DEALINGS IN THE SOFTWARE.
 #
+## @package ContHomologySignature.py
 # Written Ian Rankin - February 2020
 #
-# Homology augumented node.
-# This is a set of nodes built on-top of a standard
-# Node and graph, but has a different successor function for the H2-augmented graph
-# (H2 = homology here)
+# Continuous homology signature (winding angle signature).
+# Instead of counting crossings of reference rays, the signature stores the
+# total signed angle subtended by the path around each feature. Paths between
+# the same two points are homologous if their winding angles are equal.
 # Based on work by following paper:
 # S. Bhattacharya, R. Ghrist, V. Kumar (2015) Persistent Homology for Path Planning
 #       in uncertain environments.
-#
-##################################### Incomplete ############################
-
-from rdml_graph.core import State
-from rdml_graph.core import Node
-from rdml_graph.core import Edge
-from rdml_graph.homotopy import HSignature
 
 import numpy as np
-
-import pdb
+from rdml_graph.homotopy import HSignature
+from rdml_graph.homotopy.HEdge import HEdge
+from rdml_graph.homotopy.HomologySignature import HazardIndex
+import copy
 
 # Compute the signed angle (+ = CW, - = CCW) between ps-vref and pe-vref.
 # Function based on Code from Seth McCammon.
@@ -43,8 +39,160 @@ import pdb
 # @param pe - the ending point of the line segment (numpy array x 2)
 # @param pref - the reference point of the line segment (numpy array n x 2)
 #
-# @return - angle between line segments from reference point
+# @return - angle between line segments from reference point (numpy n)
 def computeSubtendedAngleLineSegment(ps, pe, pref):
-    vref_ps = ps[np.newaxis, :] - pref
-    vref_pe = pe[np.newaxis, :] - pref
-    return np.arctan2(vref_ps[:,1], vref_ps[:,0]) - math.arctan2(vref_pe[:,1], vref_pe[:,0])
+    return computeSubtendedAngles(np.array([ps, pe]), pref)[0]
+
+## computeSubtendedAngles
+# Computes the signed angle (+ = CW, - = CCW) subtended by every segment of a
+# path around every feature in a single vectorized pass.
+# The angle for a straight segment is always in (-pi, pi], so it is found
+# directly from the cross and dot product of the vectors from the feature to
+# the segment end points without needing to unwrap angles.
+# @param path - the points of the path (numpy n x 2)
+# @param features - the reference points (numpy m x 2)
+#
+# @return - numpy (n-1) x m array of subtended angles per segment and feature.
+def computeSubtendedAngles(path, features):
+    path = np.asarray(path, dtype=float)
+    features = np.asarray(features, dtype=float)
+
+    # vectors from each feature to the start and end of each segment (n-1, m, 2)
+    v_s = path[:-1, np.newaxis, :] - features[np.newaxis, :, :]
+    v_e = path[1:, np.newaxis, :] - features[np.newaxis, :, :]
+
+    cross = v_s[:,:,0] * v_e[:,:,1] - v_s[:,:,1] * v_e[:,:,0]
+    dot = v_s[:,:,0] * v_e[:,:,0] + v_s[:,:,1] * v_e[:,:,1]
+
+    # negate the cross product so clockwise rotation is positive.
+    return np.arctan2(-cross, dot)
+
+
+## Continuous homology signature
+# Stores the winding angle of the path around each feature.
+# Unlike the HomologySignature, there is no reference ray, so the signature
+# does not depend on the ray angle, and segments passing close to the ray
+# direction do not cause degenerate crossings.
+class ContHomologySignature(HSignature):
+    ## Constuctor
+    # @param numHazards - this is the total number of obstacles the h-signature
+    #           needs to keep track of.
+    # @param tol - [opt] the tolerance in radians for two signatures to be equal.
+    # @param max_winding - [opt] the maximum absolute winding angle around any
+    #           feature before an edge crossing is considered a loop.
+    def __init__(self, numHazards, tol=1e-6, max_winding=2*np.pi):
+        self.sign = np.zeros(numHazards, dtype=float)
+        self.tol = tol
+        self.max_winding = max_winding
+
+    ## edge_cross
+    # This function takes the HSignature and the HSign fragment contained in a
+    # Homotopy Edge, and adds the edge winding angles to the current HSignature.
+    # @param edge - a homotopy edge.
+    #
+    # @return - true if valid edge crossing, false if the crossing is invalid (loop)
+    # @post - this objects sign is updated with the given
+    def edge_cross(self, edge):
+        if not isinstance(edge, HEdge):
+            raise TypeError('edge_cross passed an edge which is not of type HEdge')
+
+        self.sign += edge.HSign.sign
+        if len(self.sign) < 1:
+            return True
+        return np.amax(np.abs(self.sign)) <= self.max_winding + self.tol
+
+    ## compute_line_segment
+    # This function turns the current HSignature into the h signature for a
+    # line-segment
+    # @param pt_a - the first point of the line segment (numpy)
+    # @param pt_a - the second point of the line segment (numpy)
+    # @param features - the features (numpy n x 2) or a HazardIndex
+    # @param ray_angle - ignored, only for compatibility with other signatures.
+    def compute_line_segment(self, pt_a, pt_b, features, ray_angle=np.pi/2):
+        if isinstance(features, HazardIndex):
+            features = features.features
+        self.sign = computeSubtendedAngleLineSegment(pt_a, pt_b, features)
+
+    ## compute_path
+    # This function turns the current HSignature into the h signature for
+    # a full path of waypoints.
+    # @param path - the points of the path (numpy n x 2)
+    # @param features - the features (numpy m x 2)
+    def compute_path(self, path, features):
+        if len(path) < 2:
+            self.sign = np.zeros(len(features), dtype=float)
+        else:
+            self.sign = np.sum(computeSubtendedAngles(path, features), axis=0)
+
+    ## cross
+    # A function to add winding angle around a feature to the HSignature
+    # @param id - the id of the feature
+    # @param value - the angle (radians) to add (+ = CW, - = CCW)
+    def cross(self, id, value):
+        if id >= len(self) or id < 0:
+            raise IndexError('H-signature crossing idx: ' + str(id) + '  with length ' + str(len(self)))
+        self.sign[id] += value
+
+    ## copy
+    # The sign is a flat float array, so a shallow copy with a copied array
+    # is equivalent to a deepcopy, but much faster.
+    def copy(self):
+        newSign = copy.copy(self)
+        newSign.sign = self.sign.copy()
+        return newSign
+
+    ############################## Operator overloading
+
+    ## y = self[idx] operator overload
+    # Returns the winding angle around the feature.
+    def __getitem__(self, id):
+        return self.sign[id]
+
+    def __neg__(self):
+        sign = self.copy()
+        sign.sign = -sign.sign
+        return sign
+
+    def __add__(self, other):
+        newSign = self.copy()
+        newSign.sign += other.sign
+        return newSign
+
+    def __sub__(self, other):
+        newSign = self.copy()
+        newSign.sign -= other.sign
+        return newSign
+
+    ## str(self) operator overload
+    # Human readable print output
+    def __str__(self):
+        return str(self.sign)
+
+    ## quantized
+    # The winding angles rounded to multiples of the tolerance, used for both
+    # equality and hashing so equal signatures always hash the same.
+    def quantized(self):
+        return np.round(self.sign / self.tol).astype(np.int64)
+
+    ## hash function
+    # The winding angles are rounded to the tolerance so signatures that are equal
+    # within floating point error hash the same.
+    def __hash__(self):
+        return hash(self.quantized().tobytes())
+
+    ## len(self) operator overload
+    def __len__(self):
+        return len(self.sign)
+
+    ## == operator overload
+    # Function to handle checking for equality between HSignatures
+    # (the winding angles are equal when rounded to the tolerance)
+    def __eq__(self, other):
+        if not isinstance(other, ContHomologySignature) or len(other) != len(self) \
+                or other.tol != self.tol:
+            return False
+        return np.array_equal(self.quantized(), other.quantized())
+
+    ## != operator overload
+    def __ne__(self, other):
+        return not (self == other)
@@ -56,6 +56,10 @@ class FeatureNode(GeometricNode):
 
 
 ## A state that incapsulates the set of states of Homotopy and features
+# The set of visited feature names is stored as a bitmask over the needed names,
+# so successors, hashing, and goal checks do not need to build or compare sets.
+# The feature name to bit index table and the dominance table are built once
+# by the root state and shared by every state of the search.
 class HomotopyFeatureState(HNode):
     ## constructor
     # @param node - the input Node for homotopy graph.
@@ -63,40 +67,160 @@ class HomotopyFeatureState(HNode):
     # @param parent - [optional] the edge from the parent HNode
     # @param root - [optional] the root node of the homotopy graph.
     # @param names - a set of names along path
-    # @param keywords - a set of keywords along path.
-    def __init__(self, n, h_sign, parentEdge=None, root=None, names=frozenset(), neededNames=frozenset()):
+    # @param neededNames - the set of (lower case) names the search tracks.
+    # @param prune_dominated - [opt] if true, successors that are dominated by an
+    #           already generated state with the same node and h-signature are pruned.
+    #           A state dominates another if it has visited a superset of the
+    #           names for less or equal cost.
+    # @param path_cost - [opt] the cost of the path to this state.
+    # @param name_idx - [opt] shared table of name to bit index (built if not given)
+    def __init__(self, n, h_sign, parentEdge=None, root=None, names=frozenset(), \
+                neededNames=frozenset(), prune_dominated=True, path_cost=0.0, \
+                name_idx=None, names_mask=None):
         super(HomotopyFeatureState, self).__init__(n, h_sign, parentEdge, root)
 
-        self.names = names
         self.neededNames = neededNames
+        self.prune_dominated = prune_dominated
+        self.path_cost = path_cost
+
+        if name_idx is None:
+            # sorted to keep the bit ordering deterministic between runs.
+            all_names = sorted(set(neededNames) | set(names))
+            name_idx = {'bits': {name: i for i, name in enumerate(all_names)}, \
+                        'masks': {}, 'dominance': {}}
+        self.name_idx = name_idx
+
+        if names_mask is None:
+            names_mask = 0
+            for name in names:
+                names_mask |= 1 << name_idx['bits'][name]
+        self.names_mask = names_mask
+        self._hash = None
+
+    ## @var names_mask
+    # integer bitmask of the visited names (bit index given by name_idx['bits'])
+    ## @var name_idx
+    # dictionary shared by all states of a search with the name to bit index
+    # table 'bits', a cache of goal name masks 'masks', and the dominance table
+    # 'dominance' used for pruning.
+
+    ## names
+    # The set of visited names, reconstructed from the bitmask.
+    # Prefer has_names for goal checks as it is constant time.
+    @property
+    def names(self):
+        return frozenset(name for name, bit in self.name_idx['bits'].items() \
+                            if (self.names_mask >> bit) & 1)
+
+    ## mask_of
+    # get the bitmask of a set of names. The result is cached so repeated goal
+    # checks with the same set of names do not rebuild the mask.
+    # @param names - a set of names (should be a frozenset or hashable)
+    #
+    # @return the integer bitmask, or None if a name is not tracked by the search.
+    def mask_of(self, names):
+        masks = self.name_idx['masks']
+        try:
+            return masks[names]
+        except KeyError:
+            pass
+        except TypeError:
+            names = frozenset(names)
+            if names in masks:
+                return masks[names]
+
+        bits = self.name_idx['bits']
+        mask = 0
+        for name in names:
+            if name not in bits:
+                mask = None
+                break
+            mask |= 1 << bits[name]
+        masks[names] = mask
+        return mask
+
+    ## has_names
+    # checks if every name in names has been visited along the path.
+    # @param names - a set of names
+    def has_names(self, names):
+        mask = self.mask_of(names)
+        return mask is not None and (self.names_mask & mask) == mask
+
+    ## is_dominated
+    # checks the shared dominance table to see if a state with the given node,
+    # h-signature, names and cost is dominated by a previously generated state.
+    # If it is not dominated it is added to the table, and any entries it dominates
+    # are removed.
+    # @param key - the (node, h_sign) tuple
+    # @param mask - the names bitmask of the state
+    # @param cost - the path cost of the state
+    #
+    # @return True if the state is dominated.
+    def is_dominated(self, key, mask, cost):
+        dominance = self.name_idx['dominance']
+        entries = dominance.get(key)
+        if entries is None:
+            dominance[key] = [(mask, cost)]
+            return False
+
+        for other_mask, other_cost in entries:
+            if (other_mask & mask) == mask and other_cost <= cost:
+                return True
+
+        dominance[key] = [(m, c) for m, c in entries \
+                            if not ((mask & m) == m and cost <= c)]
+        dominance[key].append((mask, cost))
+        return False
 
     ## successor function for Homotopy node.
     def successor(self):
+        # The root starts a new search, so clear any previous dominance table.
+        if self.parent is None:
+            self.name_idx['dominance'] = {}
+
+        bits = self.name_idx['bits']
         result = []
         for edge in self.node.e:
             newHSign = self.h_sign.copy()
             goodHSign = newHSign.edge_cross(edge)
 
             if goodHSign:
-                newNames = None
-                newKeywords = None
-                if isinstance(edge.c, FeatureNode) and edge.c.name.lower() in self.neededNames:
-                    newNames = frozenset(self.names | {edge.c.name.lower()})
-                else:
-                    newNames = frozenset(self.names)
-
-                succ = HomotopyFeatureState(n=edge.c, h_sign=newHSign,\
-                            names=newNames, neededNames=self.neededNames, parentEdge=edge,\
-                            root=self.root)
-                result += [(succ, edge.getCost())]
-        #pdb.set_trace()
+                newMask = self.names_mask
+                if isinstance(edge.c, FeatureNode):
+                    name = edge.c.name.lower()
+                    if name in self.neededNames:
+                        newMask |= 1 << bits[name]
+
+                cost = edge.getCost()
+                newCost = self.path_cost + cost
+                if self.prune_dominated and \
+                        self.is_dominated((edge.c, newHSign), newMask, newCost):
+                    continue
+
+                succ = HomotopyFeatureState(n=edge.c, h_sign=newHSign, \
+                            neededNames=self.neededNames, parentEdge=edge, \
+                            root=self.root, prune_dominated=self.prune_dominated, \
+                            path_cost=newCost, name_idx=self.name_idx, \
+                            names_mask=newMask)
+                result.append((succ, cost))
         return result
 
+    ## ==
+    # equals checks the node, h-signature, and visited names.
+    def __eq__(self, other):
+        if not isinstance(other, HomotopyFeatureState):
+            return False
+        return self.names_mask == other.names_mask and \
+                super(HomotopyFeatureState, self).__eq__(other)
+
     ## hash function overload
     # This hash takes into account both the node hash (should be defined),
     # and the h signatures hash (also defined).
     # parent edge is not considered.
+    # The hash is cached as the state does not change after construction.
     ###### THIS is actually important for SEARCHES as it defines what is considered
     # already explored.
     def __hash__(self):
-        return hash((self.node, self.h_sign, self.names))
+        if self._hash is None:
+            self._hash = hash((self.node, self.h_sign, self.names_mask))
+        return self._hash
@@ -62,8 +62,11 @@ def partial_h_feature_goal(n, data, goal):
     if not isinstance(goalH, HSignatureGoal):
         raise TypeError("partial_h_feature_goal given goal which should be (Node, HomologySignatureGoal, set(string), set(string))")
 
-    return goalH.checkSign(n.h_sign) and goalNode == n.node and \
-            goalNames <= n.names
+    if not (goalNode == n.node and goalH.checkSign(n.h_sign)):
+        return False
+    if hasattr(n, 'has_names'):
+        return n.has_names(goalNames)
+    return goalNames <= n.names
 
 ## abstract class for an Hsignature goal
 class HSignatureGoal(object):
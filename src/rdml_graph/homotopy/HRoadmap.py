@@ -0,0 +1,192 @@
+# Copyright 2020 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+#
+## @package HRoadmap.py
+# Written Ian Rankin - March 2020
+#
+# Saving and loading of homotopy augmented roadmaps (graphs of HEdges).
+# The roadmap is stored as a directory of .npy arrays, so it can be memory
+# mapped on load, and the HEdge signatures are stored and do not need to be
+# recomputed from the hazards.
+#
+# Directory layout:
+#   meta.json - format version, signature type, and feature node information
+#   pts.npy - (n x 2) node points
+#   ids.npy - (n) node ids
+#   indptr.npy, indices.npy, costs.npy - CSR adjacency (edges of node i are
+#                   indices[indptr[i]:indptr[i+1]])
+#   sign.npy - (num_edges x num_features) signatures (homology signatures)
+#   sign_indptr.npy, sign_data.npy - CSR signatures (homotopy signatures)
+#   hazards.npy - [opt] the hazards the signatures were computed with.
+
+import numpy as np
+import json
+import os
+
+from rdml_graph.core import GeometricNode
+from rdml_graph.homotopy.HEdge import HEdge
+from rdml_graph.homotopy.HomologySignature import HomologySignature
+from rdml_graph.homotopy.HomotopySignature import HomotopySignature
+from rdml_graph.homotopy.ContHomologySignature import ContHomologySignature
+from rdml_graph.homotopy.FeatureNode import FeatureNode
+
+H_ROADMAP_VERSION = 1
+
+## save_h_roadmap
+# Saves a homotopy augmented roadmap (such as the output of PRM with HEdgeConn)
+# All edges must be HEdges with the same type of signature, and point to nodes
+# in G.
+# @param G - list of GeometricNodes (or FeatureNodes) with HEdges
+# @param path - the directory to save the roadmap to (created if needed)
+# @param map - [opt] the map the roadmap was created with, 'hazards' and
+#               'ray_angle' are saved if present.
+def save_h_roadmap(G, path, map=None):
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    idx = {n: i for i, n in enumerate(G)}
+    num_edges = sum([len(n.e) for n in G])
+
+    pts = np.array([n.pt for n in G], dtype=float)
+    ids = np.array([n.id for n in G])
+    indptr = np.zeros(len(G)+1, dtype=np.int64)
+    indices = np.empty(num_edges, dtype=np.int32)
+    costs = np.empty(num_edges, dtype=float)
+    signs = [None] * num_edges
+
+    k = 0
+    for i, n in enumerate(G):
+        for e in n.e:
+            if not isinstance(e, HEdge):
+                raise TypeError('save_h_roadmap given a graph with an edge that is not an HEdge')
+            if e.c not in idx:
+                raise ValueError('save_h_roadmap edge child id: ' + str(e.c.id) + ' not in G')
+            indices[k] = idx[e.c]
+            costs[k] = e.getCost()
+            signs[k] = e.HSign
+            k += 1
+        indptr[i+1] = k
+
+    meta = {'version': H_ROADMAP_VERSION, 'sign_type': None, 'features': {}}
+    if num_edges > 0:
+        sign_type = type(signs[0])
+        if any(type(s) is not sign_type for s in signs):
+            raise TypeError('save_h_roadmap given edges with different signature types')
+        meta['sign_type'] = sign_type.__name__
+
+        if sign_type is HomotopySignature:
+            sign_indptr = np.zeros(num_edges+1, dtype=np.int64)
+            sign_indptr[1:] = np.cumsum([len(s) for s in signs])
+            sign_data = np.empty(sign_indptr[-1], dtype=np.int32)
+            for i, s in enumerate(signs):
+                sign_data[sign_indptr[i]:sign_indptr[i+1]] = s.sign
+            np.save(os.path.join(path, 'sign_indptr.npy'), sign_indptr)
+            np.save(os.path.join(path, 'sign_data.npy'), sign_data)
+        elif sign_type is HomologySignature or sign_type is ContHomologySignature:
+            np.save(os.path.join(path, 'sign.npy'), np.array([s.sign for s in signs]))
+            if sign_type is ContHomologySignature:
+                meta['tol'] = signs[0].tol
+                meta['max_winding'] = signs[0].max_winding
+        else:
+            raise TypeError('save_h_roadmap unsupported signature type: ' + sign_type.__name__)
+
+    for i, n in enumerate(G):
+        if isinstance(n, FeatureNode):
+            meta['features'][str(i)] = {'name': n.name, 'keywords': sorted(n.keywords)}
+
+    if map is not None:
+        if 'hazards' in map:
+            np.save(os.path.join(path, 'hazards.npy'), np.asarray(map['hazards'], dtype=float))
+        if 'ray_angle' in map:
+            meta['ray_angle'] = float(map['ray_angle'])
+
+    np.save(os.path.join(path, 'pts.npy'), pts)
+    np.save(os.path.join(path, 'ids.npy'), ids)
+    np.save(os.path.join(path, 'indptr.npy'), indptr)
+    np.save(os.path.join(path, 'indices.npy'), indices)
+    np.save(os.path.join(path, 'costs.npy'), costs)
+
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+
+## load_h_roadmap
+# Loads a homotopy augmented roadmap saved by save_h_roadmap.
+# The HEdge signatures are read directly from disk and are not recomputed.
+# If memory mapped, the node points and homology signatures are read-only views
+# of the files on disk, and are only paged in when used.
+# @param path - the directory the roadmap was saved to.
+# @param mmap - [opt] if true, memory map the arrays instead of reading them.
+#
+# @return G, map - the list of nodes, and a map dictionary with 'hazards' and
+#               'ray_angle' if they were saved.
+def load_h_roadmap(path, mmap=True):
+    mmap_mode = 'r' if mmap else None
+    def load(name):
+        return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+    with open(os.path.join(path, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    if meta['version'] > H_ROADMAP_VERSION:
+        raise ValueError('load_h_roadmap given roadmap version: ' + str(meta['version']) + \
+                        ' newer than supported version: ' + str(H_ROADMAP_VERSION))
+
+    pts = load('pts.npy')
+    ids = np.load(os.path.join(path, 'ids.npy')).tolist()
+    indptr = np.load(os.path.join(path, 'indptr.npy'))
+    indices = np.load(os.path.join(path, 'indices.npy'))
+    costs = np.load(os.path.join(path, 'costs.npy')).tolist()
+
+    features = meta['features']
+    G = [None] * len(ids)
+    for i in range(len(ids)):
+        if str(i) in features:
+            feat = features[str(i)]
+            G[i] = FeatureNode(ids[i], feat['name'], pt=pts[i], keywords=feat['keywords'])
+        else:
+            G[i] = GeometricNode(ids[i], pts[i])
+
+    sign_type = meta['sign_type']
+    if sign_type == 'HomotopySignature':
+        sign_indptr = np.load(os.path.join(path, 'sign_indptr.npy'))
+        sign_data = np.load(os.path.join(path, 'sign_data.npy'))
+        def get_sign(k):
+            return HomotopySignature(sign_data[sign_indptr[k]:sign_indptr[k+1]].tolist())
+    elif sign_type == 'HomologySignature' or sign_type == 'ContHomologySignature':
+        sign_arr = load('sign.npy')
+        template = HomologySignature(0) if sign_type == 'HomologySignature' else \
+                    ContHomologySignature(0, tol=meta['tol'], max_winding=meta['max_winding'])
+        def get_sign(k):
+            sign = template.copy()
+            sign.sign = sign_arr[k]
+            return sign
+
+    for i, n in enumerate(G):
+        for k in range(indptr[i], indptr[i+1]):
+            e = HEdge(n, G[indices[k]], HomologySignature(0), cost=costs[k])
+            # set the signature directly to avoid copying it.
+            e.HSign = get_sign(k)
+            n.addEdge(e)
+
+    map = {}
+    if os.path.isfile(os.path.join(path, 'hazards.npy')):
+        map['hazards'] = load('hazards.npy')
+    if 'ray_angle' in meta:
+        map['ray_angle'] = meta['ray_angle']
+
+    return G, map
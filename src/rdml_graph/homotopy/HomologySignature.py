@@ -77,6 +77,119 @@ def rayIntersection(pt1, pt2, origin, angle=np.pi/2):
         # no intersection
         return 0
 
+## rayIntersections
+# Vectorized version of rayIntersection for many origins (features) at once.
+# The same computation is performed for each origin as rayIntersection.
+# @param pt1 - first point of line segment (numpy 2d)
+# @param pt2 - second point of the line segment (numpy 2d)
+# @param origins - the origins of the rays (numpy n x 2)
+# @param angle - the angle of the rays. (scalar)
+#
+# @return - numpy array (n) of 0 = no intersection, 1 = intersection in positive
+#            direction, -1 for negative direction (int8)
+def rayIntersections(pt1, pt2, origins, angle=np.pi/2):
+    result = np.zeros(len(origins), dtype=np.int8)
+    if len(origins) == 0:
+        return result
+
+    rayDir = np.array([np.cos(angle), np.sin(angle)])
+    v2 = pt2 - pt1
+    v3 = np.array([-rayDir[1], rayDir[0]]) # perpendicular to rayDir
+
+    den = v2[0]*v3[0] + v2[1]*v3[1]
+    # check for parallel lines segment to ray
+    if den == 0:
+        return result
+
+    v1 = origins - pt1
+    v1_v3 = v1[:,0]*v3[0] + v1[:,1]*v3[1]
+    t1 = (v2[0]*v1[:,1] - v2[1]*v1[:,0]) / den
+    t2 = v1_v3 / den
+
+    crossed = (t1 >= 0.0) & (t2 >= 0.0) & (t2 <= 1.0)
+    # x coordinate of a transformed point frame decides direction.
+    result[crossed] = np.where(v1_v3[crossed] < 0, 1, -1)
+    return result
+
+## HazardIndex
+# A spatial index of the features (hazards) for ray intersection tests.
+# With a fixed ray angle, a segment can only cross the ray of a feature if the
+# feature lies between the segment end points along the axis perpendicular to
+# the ray. The features are sorted along that axis, so the candidate features
+# for each segment are found with a binary search, and only those are tested.
+# This makes computing a segments crossings O(log(features) + candidates)
+# instead of O(features).
+class HazardIndex(object):
+    ## constructor
+    # @param features - the features (numpy n x 2)
+    # @param ray_angle - the angle of the rays from each feature.
+    def __init__(self, features, ray_angle=np.pi/2):
+        self.source = features
+        self.features = np.asarray(features, dtype=float)
+        self.shape = self.features.shape
+        self.ray_angle = ray_angle
+
+        rayDir = np.array([np.cos(ray_angle), np.sin(ray_angle)])
+        self.perp = np.array([-rayDir[1], rayDir[0]])
+
+        proj = self.features.dot(self.perp) if len(self.features) > 0 else np.empty(0)
+        self.order = np.argsort(proj, kind='stable')
+        self.sorted_proj = proj[self.order]
+        self.sorted_features = self.features[self.order]
+
+        # slack for floating point error between the projections and the exact test.
+        scale = np.amax(np.abs(self.features)) if len(self.features) > 0 else 1.0
+        self.eps = 1e-9 * max(scale, 1.0)
+
+    ## @var source
+    # the features array the index was built from.
+    ## @var features
+    # the features in the original order (numpy n x 2)
+    ## @var order
+    # the original index of each feature in sorted order.
+
+    ## candidates
+    # Gets the indicies of the features that the segment may cross the ray of.
+    # @param pt_a - the first point of the line segment (numpy)
+    # @param pt_b - the second point of the line segment (numpy)
+    #
+    # @return - slice start, end into the sorted features.
+    def candidates(self, pt_a, pt_b):
+        p_a = pt_a[0]*self.perp[0] + pt_a[1]*self.perp[1]
+        p_b = pt_b[0]*self.perp[0] + pt_b[1]*self.perp[1]
+        lo = min(p_a, p_b) - self.eps
+        hi = max(p_a, p_b) + self.eps
+        start = np.searchsorted(self.sorted_proj, lo, side='left')
+        end = np.searchsorted(self.sorted_proj, hi, side='right')
+        return start, end
+
+    ## crossings
+    # Finds all features whose ray is crossed by the line segment.
+    # @param pt_a - the first point of the line segment (numpy)
+    # @param pt_b - the second point of the line segment (numpy)
+    #
+    # @return - idx, signs numpy arrays of the crossed feature indicies (ascending)
+    #           and the sign of each crossing.
+    def crossings(self, pt_a, pt_b):
+        start, end = self.candidates(pt_a, pt_b)
+        signs = rayIntersections(pt_a, pt_b, self.sorted_features[start:end], self.ray_angle)
+        crossed = signs != 0
+        idx = self.order[start:end][crossed]
+        signs = signs[crossed]
+
+        sort_idx = np.argsort(idx)
+        return idx[sort_idx], signs[sort_idx]
+
+    ## len(self) operator overload
+    def __len__(self):
+        return len(self.features)
+
+    ## y = self[idx] operator overload
+    # returns the feature in the original order
+    def __getitem__(self, idx):
+        return self.features[idx]
+
+
 ## Homology signature
 # A discrete homology signature.
 # It uses the same reference lines for homotopy signautres described by:
@@ -116,12 +229,15 @@ class HomologySignature(HSignature):
     # line-segment
     # @param pt_a - the first point of the line segment (numpy)
     # @param pt_a - the second point of the line segment (numpy)
+    # @param features - the features (numpy n x 2) or a HazardIndex of the features
+    # @param ray_angle - the angle of the rays (ignored if features is a HazardIndex)
     def compute_line_segment(self, pt_a, pt_b, features, ray_angle=np.pi/2):
-        num_features = len(self.sign)
-
-        for i in range(num_features):
-            self.sign[i] = rayIntersection(pt_a, pt_b, \
-                                                features[i], ray_angle)
+        if isinstance(features, HazardIndex):
+            idx, signs = features.crossings(pt_a, pt_b)
+            self.sign = np.zeros(len(features), dtype=np.byte)
+            self.sign[idx] = signs
+        else:
+            self.sign = rayIntersections(pt_a, pt_b, features, ray_angle)
 
     ## cross
     # A function to add a crossing to the HSignature
@@ -133,8 +249,13 @@ class HomologySignature(HSignature):
         # Check if the signature contains the id
         self.sign[id] = max(-1, min(value + self.sign[id], 1))
 
+    ## copy
+    # The sign is a flat integer array, so a shallow copy with a copied array
+    # is equivalent to a deepcopy, but much faster.
     def copy(self):
-        return copy.deepcopy(self)
+        newSign = copy.copy(self)
+        newSign.sign = self.sign.copy()
+        return newSign
 
     ############################## Operator overloading
 
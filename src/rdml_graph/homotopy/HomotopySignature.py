@@ -36,7 +36,7 @@ import copy
 from rdml_graph.homotopy import HSignature
 from rdml_graph.homotopy.HEdge import HEdge
 from rdml_graph.homotopy import HSignatureGoal
-from rdml_graph.homotopy.HomologySignature import rayIntersection
+from rdml_graph.homotopy.HomologySignature import rayIntersections, HazardIndex
 
 # for checking python version (required for hashing function)
 import sys
@@ -110,26 +110,27 @@ class HomotopySignature(HSignature):
     # line-segment
     # @param pt_a - the first point of the line segment (numpy)
     # @param pt_a - the second point of the line segment (numpy)
+    # @param features - the features (numpy n x 2) or a HazardIndex of the features
+    # @param ray_angle - the angle of the rays (ignored if features is a HazardIndex)
     def compute_line_segment(self, pt_a, pt_b, features, ray_angle=np.pi/2):
-        #pdb.set_trace()
-        num_features = features.shape[0]
-        self.sign = []
+        if isinstance(features, HazardIndex):
+            idx, signs = features.crossings(pt_a, pt_b)
+        else:
+            signs = rayIntersections(pt_a, pt_b, features, ray_angle)
+            idx = np.nonzero(signs)[0]
+            signs = signs[idx]
 
-        for i in range(num_features):
-            sign = rayIntersection(pt_a, pt_b, features[i], ray_angle)
-            if sign != 0:
-                self.cross(i+1, sign)
+        # crossings as signed feature ids (features start at 1)
+        crossings = (idx + 1) * signs.astype(int)
 
-        if len(self) > 1:
+        if len(crossings) > 1:
             # sort the crossings into the correct order.
             # This is done by projecting the given features onto the vector between the parent and child.
             vec = pt_b - pt_a
-            projections = [0] * len(self)
-            for i in range(len(self)):
-                projections[i] = features[abs(self.sign[i])-1].dot(vec)
+            projections = features[idx].dot(vec)
+            crossings = crossings[np.lexsort((crossings, projections))]
 
-            _, self.sign = zip(*sorted(zip(projections, self.sign)))
-            self.sign = list(self.sign)
+        self.sign = crossings.tolist()
 
 
 
@@ -167,8 +168,13 @@ class HomotopySignature(HSignature):
         
         return False
 
+    ## copy
+    # The sign is a flat list of integers, so a shallow copy with a copied list
+    # is equivalent to a deepcopy, but much faster.
     def copy(self):
-        return copy.deepcopy(self)
+        newSign = copy.copy(self)
+        newSign.sign = list(self.sign)
+        return newSign
 
     ############################## Operator overloading
 
@@ -0,0 +1,215 @@
+# Copyright 2020 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+#
+## @package PathSignatures.py
+# Written Ian Rankin - April 2021
+#
+# Batch computation of homology and homotopy signatures for arbitrary paths
+# of waypoints (such as from getWaypoints, HPath, or StochasticOptimizer).
+# All segments of all paths are tested against all features in a few
+# vectorized NumPy operations instead of looping over paths and edges.
+
+import numpy as np
+
+from rdml_graph.homotopy.HomologySignature import HazardIndex
+
+# maximum number of (segment, feature) pairs evaluated at once, bounds the
+# size of the temporary arrays.
+_MAX_CHUNK_ELEMENTS = 2**22
+
+## padPaths
+# Converts a batch of paths into a NaN padded array.
+# @param paths - a padded numpy array (B x L x 2) (padded with NaN or given lengths)
+#               or a list of (n x 2) numpy arrays, HPaths, or HNodes.
+# @param lengths - [opt] the number of valid points in each path of a padded array.
+#               If not given, a padded array is assumed to be padded with NaN.
+#
+# @return padded (B x L x 2) float array, lengths (B) int array
+def padPaths(paths, lengths=None):
+    if isinstance(paths, np.ndarray) and paths.ndim == 3:
+        padded = np.array(paths, dtype=float)
+        if lengths is None:
+            valid = ~np.any(np.isnan(padded), axis=2)
+            # the length is the number of leading valid points.
+            lengths = np.argmin(np.append(valid, np.zeros((len(padded), 1), dtype=bool), axis=1), axis=1)
+        else:
+            lengths = np.asarray(lengths, dtype=int)
+            for i, l in enumerate(lengths):
+                padded[i, l:] = np.nan
+        return padded, lengths
+
+    arrs = []
+    for p in paths:
+        if hasattr(p, 'getHPath'):
+            p = p.getHPath().path
+        arrs.append(np.asarray(p, dtype=float).reshape(-1, 2))
+    lengths = np.array([len(p) for p in arrs], dtype=int)
+    max_len = np.amax(lengths) if len(arrs) > 0 else 0
+
+    padded = np.full((len(arrs), max_len, 2), np.nan)
+    for i, p in enumerate(arrs):
+        padded[i, :len(p)] = p
+    return padded, lengths
+
+## segmentRayIntersections
+# Computes the ray crossings of many segments with many features at once.
+# Uses the same computation as rayIntersection for every (segment, feature) pair.
+# @param pt1 - the first points of the segments (numpy n x 2)
+# @param pt2 - the second points of the segments (numpy n x 2)
+# @param origins - the origins of the rays (numpy m x 2)
+# @param angle - the angle of the rays.
+#
+# @return - numpy (n x m) int8 array of 0 = no intersection, 1 = positive, -1 = negative
+def segmentRayIntersections(pt1, pt2, origins, angle=np.pi/2):
+    rayDir = np.array([np.cos(angle), np.sin(angle)])
+    v3 = np.array([-rayDir[1], rayDir[0]]) # perpendicular to rayDir
+
+    v2 = pt2 - pt1
+    den = v2[:,0]*v3[0] + v2[:,1]*v3[1]
+    # parallel (or empty) segments never cross, avoid divide by zero.
+    parallel = ~(den != 0)
+    den = np.where(parallel, 1.0, den)
+
+    v1_x = origins[np.newaxis,:,0] - pt1[:,0,np.newaxis]
+    v1_y = origins[np.newaxis,:,1] - pt1[:,1,np.newaxis]
+    v1_v3 = v1_x*v3[0] + v1_y*v3[1]
+    t1 = (v2[:,0,np.newaxis]*v1_y - v2[:,1,np.newaxis]*v1_x) / den[:,np.newaxis]
+    t2 = v1_v3 / den[:,np.newaxis]
+
+    crossed = (t1 >= 0.0) & (t2 >= 0.0) & (t2 <= 1.0) & ~parallel[:,np.newaxis]
+    return np.where(crossed, np.where(v1_v3 < 0, 1, -1), 0).astype(np.int8)
+
+## _path_crossings
+# get every crossing of every path.
+#
+# @return path_idx, seg_idx, feature_idx, sign, num_paths, pt1, pt2
+#           parallel arrays of each crossing (sorted by path and segment), the
+#           number of paths, and the first and second points of every segment.
+def _path_crossings(paths, features, ray_angle, lengths):
+    if isinstance(features, HazardIndex):
+        ray_angle = features.ray_angle
+        features = features.features
+    features = np.asarray(features, dtype=float)
+
+    padded, lengths = padPaths(paths, lengths)
+    B = padded.shape[0]
+    S = max(padded.shape[1] - 1, 0)
+
+    pt1 = padded[:, :-1].reshape(-1, 2)
+    pt2 = padded[:, 1:].reshape(-1, 2)
+    seg_valid = (np.arange(S)[np.newaxis, :] < (lengths[:, np.newaxis] - 1)).reshape(-1)
+    seg_ids = np.nonzero(seg_valid)[0]
+
+    chunk = max(1, _MAX_CHUNK_ELEMENTS // max(len(features), 1))
+    all_seg = []
+    all_feat = []
+    all_sign = []
+    for start in range(0, len(seg_ids), chunk):
+        ids = seg_ids[start:start+chunk]
+        crossings = segmentRayIntersections(pt1[ids], pt2[ids], features, ray_angle)
+        seg, feat = np.nonzero(crossings)
+        all_seg.append(ids[seg])
+        all_feat.append(feat)
+        all_sign.append(crossings[seg, feat])
+
+    if len(all_seg) > 0:
+        seg = np.concatenate(all_seg)
+        feat = np.concatenate(all_feat)
+        sign = np.concatenate(all_sign).astype(int)
+    else:
+        seg = np.empty(0, dtype=int)
+        feat = np.empty(0, dtype=int)
+        sign = np.empty(0, dtype=int)
+
+    return seg // max(S, 1), seg, feat, sign, B, pt1, pt2
+
+## batchHomologySignatures
+# Computes the homology signature of every path in a batch.
+# @param paths - a padded numpy array (B x L x 2) (padded with NaN or given lengths)
+#               or a list of (n x 2) numpy arrays, HPaths, or HNodes.
+# @param features - the features (numpy m x 2) or a HazardIndex
+# @param ray_angle - [opt] the angle of the rays (ignored if given a HazardIndex)
+# @param lengths - [opt] the number of valid points in each path of a padded array.
+#
+# @return - numpy (B x m) int array, row i is the homology signature of path i
+#           (the same as HomologySignature.sign for the path).
+def batchHomologySignatures(paths, features, ray_angle=np.pi/2, lengths=None):
+    path_idx, seg, feat, sign, B, _, _ = \
+                _path_crossings(paths, features, ray_angle, lengths)
+
+    signs = np.zeros((B, len(features)), dtype=int)
+    np.add.at(signs, (path_idx, feat), sign)
+    return signs
+
+## batchHomotopySignatures
+# Computes the homotopy signature of every path in a batch.
+# The crossings are found for all paths at once, then ordered along each segment
+# (as HomotopySignature.compute_line_segment) and reduced by removing adjacent
+# canceling crossings.
+# @param paths - a padded numpy array (B x L x 2) (padded with NaN or given lengths)
+#               or a list of (n x 2) numpy arrays, HPaths, or HNodes.
+# @param features - the features (numpy m x 2) or a HazardIndex
+# @param ray_angle - [opt] the angle of the rays (ignored if given a HazardIndex)
+# @param lengths - [opt] the number of valid points in each path of a padded array.
+#
+# @return - list of B lists, each the homotopy signature of the path
+#           (the same as HomotopySignature.sign, feature ids start at 1).
+def batchHomotopySignatures(paths, features, ray_angle=np.pi/2, lengths=None):
+    path_idx, seg, feat, sign, B, pt1, pt2 = \
+                _path_crossings(paths, features, ray_angle, lengths)
+    if isinstance(features, HazardIndex):
+        features = features.features
+    features = np.asarray(features, dtype=float)
+
+    crossings = (feat + 1) * sign
+    projections = np.sum(features[feat] * (pt2[seg] - pt1[seg]), axis=1)
+    order = np.lexsort((crossings, projections, seg))
+    crossings = crossings[order].tolist()
+    splits = np.searchsorted(path_idx[order], np.arange(B+1))
+
+    result = [None] * B
+    for b in range(B):
+        stack = []
+        for c in crossings[splits[b]:splits[b+1]]:
+            if len(stack) > 0 and stack[-1] == -c:
+                stack.pop()
+            else:
+                stack.append(c)
+        result[b] = stack
+    return result
+
+## groupBySignature
+# Groups paths by their signature.
+# @param signs - either the output of batchHomologySignatures (numpy B x m)
+#               or batchHomotopySignatures (list of lists)
+#
+# @return labels, unique - labels[i] is the group index of path i, and
+#           unique[j] is the signature of group j.
+def groupBySignature(signs):
+    if isinstance(signs, np.ndarray):
+        if len(signs) == 0:
+            return np.empty(0, dtype=int), signs
+        unique, labels = np.unique(signs, axis=0, return_inverse=True)
+        return labels.reshape(-1), unique
+
+    groups = {}
+    labels = np.empty(len(signs), dtype=int)
+    for i, s in enumerate(signs):
+        labels[i] = groups.setdefault(tuple(s), len(groups))
+    unique = [list(s) for s in groups]
+    return labels, unique
@@ -3,7 +3,13 @@
 from .HSignature import HSignature
 from .HGoalSignature import partial_h_goal_check, partial_h_feature_goal, HSignatureGoal
 from .HomotopySignature import HomotopySignature, HomotopySignatureGoal
-from .HomologySignature import HomologySignature, HomologySignatureGoal, rayIntersection
+from .HomologySignature import HomologySignature, HomologySignatureGoal, rayIntersection, \
+            rayIntersections, HazardIndex
+from .ContHomologySignature import ContHomologySignature, computeSubtendedAngles, \
+            computeSubtendedAngleLineSegment
 from .HNode import HNode, HPath, HNodeNoBacktrack
 from .HEdge import HEdge
 from .FeatureNode import FeatureNode, HomotopyFeatureState
+from .HRoadmap import save_h_roadmap, load_h_roadmap
+from .PathSignatures import padPaths, segmentRayIntersections, batchHomologySignatures, \
+            batchHomotopySignatures, groupBySignature
@@ -24,6 +24,7 @@
 
 import pdb, itertools, time, sys
 from scipy.interpolate import RegularGridInterpolator
+from scipy.ndimage import distance_transform_edt
 import numpy as np
 #from rdml_utils import locationArange, Location, euclideanDist, HSignature
 
@@ -35,6 +36,21 @@ import matplotlib.pyplot as plt
 
 
 
+## segmentDistances
+# the distances of points to the line segments p1 -> p2 (elementwise)
+# @param xx - the x values of the points
+# @param yy - the y values of the points
+# @param p1 - the start points of the segments (2 x ...) broadcastable with xx
+# @param p2 - the end points of the segments (2 x ...)
+def segmentDistances(xx, yy, p1, p2):
+    dx, dy = p2[0] - p1[0], p2[1] - p1[1]
+    length_sq = dx*dx + dy*dy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = ((xx - p1[0])*dx + (yy - p1[1])*dy) / length_sq
+    t = np.clip(np.nan_to_num(t), 0, 1)
+    return np.sqrt((xx - p1[0] - t*dx)**2 + (yy - p1[1] - t*dy)**2)
+
+
 class PathEvaluator(object):
     """PathEvaluator default path evaluator class for information gathering tasks"""
     def __init__(self):
@@ -65,22 +81,26 @@ class PathEvaluatorWithRadius(PathEvaluator):
     self.x_ticks = x_ticks
     self.y_ticks = y_ticks
 
-  def getExactMask(self, path, budget=float('inf')):
-    budgeted_path, budgeted_path_len = applyBudget(path, budget)
-    mask = np.zeros(self.info_field.shape)
-
-    if isinstance(budgeted_path, np.ndarray):
-      #shapely_path = [Location(xlon=pt[0], ylat=pt[1]).shapelyPoint() for pt in budgeted_path]
-      shapely_path = [Point((pt[0], pt[1])) for pt in budgeted_path]
-    # else:
-    #   shapely_path = [pt.shapelyPoint() for pt in budgeted_path]
-
-    ls = LineString(shapely_path)
-
-    distances = np.array([ls.distance(pt) for pt in self.pts])
-
-    distances = distances.reshape(self.info_field.shape)
-
+  ## pathWindow
+  # Finds the cells that could be within the radius of the path, the bounding box
+  # of the path plus the radius, as (possibly outside of the field) index ranges.
+  # @param path - the path numpy (n x 2)
+  #
+  # @return - (x_lo, x_hi), (y_lo, y_hi) inclusive index ranges
+  def pathWindow(self, path):
+    x_scale = self.x_ticks[1] - self.x_ticks[0]
+    y_scale = self.y_ticks[1] - self.y_ticks[0]
+    lo = np.min(path, axis=0) - self.radius
+    hi = np.max(path, axis=0) + self.radius
+    x_range = (int(np.ceil((lo[0] - self.x_ticks[0]) / x_scale)), \
+               int(np.floor((hi[0] - self.x_ticks[0]) / x_scale)))
+    y_range = (int(np.ceil((lo[1] - self.y_ticks[0]) / y_scale)), \
+               int(np.floor((hi[1] - self.y_ticks[0]) / y_scale)))
+    return x_range, y_range
+
+  ## distanceMask
+  # applies the method of the evaluator to the distances from the path.
+  def distanceMask(self, distances):
     if self.method == 'binary':
       mask = distances <= self.radius
 
@@ -92,33 +112,87 @@ class PathEvaluatorWithRadius(PathEvaluator):
 
     return mask
 
-  def getExactScore(self, path, budget=float('inf'), plot=False):
-    budgeted_path, budgeted_path_len = applyBudget(path, budget)
-    mask = np.zeros(self.info_field.shape)
-
-    if len(budgeted_path) < 2:
-      return 0.0, 0.0
-
-    if isinstance(budgeted_path, np.ndarray):
-      #shapely_path = [Location(xlon=pt[0], ylat=pt[1]).shapelyPoint() for pt in budgeted_path]
-      shapely_path = [Point((pt[0], pt[1])) for pt in budgeted_path]
-    # else:
-    #   shapely_path = [pt.shapelyPoint() for pt in budgeted_path]
+  ## getExactDistances
+  # the exact distances from the grid to the path, only computed within the
+  # radius window of the path (inf elsewhere).
+  def getExactDistances(self, budgeted_path):
+    distances = np.ones(self.info_field.shape)*float('inf')
 
-    ls = LineString(shapely_path)
+    (x_lo, x_hi), (y_lo, y_hi) = self.pathWindow(budgeted_path)
+    x_lo, y_lo = max(x_lo, 0), max(y_lo, 0)
+    x_hi, y_hi = min(x_hi, len(self.x_ticks)-1), min(y_hi, len(self.y_ticks)-1)
+    if x_lo > x_hi or y_lo > y_hi:
+      return distances
+
+    xx = self.xx[x_lo:x_hi+1, y_lo:y_hi+1]
+    yy = self.yy[x_lo:x_hi+1, y_lo:y_hi+1]
+    window = distances[x_lo:x_hi+1, y_lo:y_hi+1]
+    for p1, p2 in zip(budgeted_path[:-1], budgeted_path[1:]):
+      np.minimum(window, segmentDistances(xx, yy, p1, p2), out=window)
+
+    return distances
+
+  ## getDistances
+  # the distances from the grid to the path, the path is rasterized once and
+  # the nearest path cell of every grid cell found with a euclidean distance
+  # transform of the radius window of the path (inf elsewhere). The distance
+  # is then measured to the segment of the nearest path cell, so it only
+  # differs from the exact distance near corners of the path.
+  # (Expects evenly spaced x_ticks and y_ticks)
+  def getDistances(self, budgeted_path):
+    distances = np.ones(self.info_field.shape)*float('inf')
+    scale = np.array([self.x_ticks[1] - self.x_ticks[0], self.y_ticks[1] - self.y_ticks[0]])
+    origin = np.array([self.x_ticks[0], self.y_ticks[0]])
+
+    (x_lo, x_hi), (y_lo, y_hi) = self.pathWindow(budgeted_path)
+    x0, y0 = max(x_lo, 0), max(y_lo, 0)
+    x1, y1 = min(x_hi, len(self.x_ticks)-1), min(y_hi, len(self.y_ticks)-1)
+    if x0 > x1 or y0 > y1:
+      return distances
+    # the window is grown to hold the rasterized path
+    win_lo = np.array([x_lo, y_lo]) - 1
+    win_hi = np.array([x_hi, y_hi]) + 1
+
+    # sample the path finer than the grid
+    step = np.min(scale) / 2
+    samples, sample_seg = [budgeted_path[-1:]], [[len(budgeted_path)-2]]
+    for i, (p1, p2) in enumerate(zip(budgeted_path[:-1], budgeted_path[1:])):
+      num = max(int(np.ceil(np.linalg.norm(p2 - p1) / step)), 1)
+      samples.append(p1 + np.linspace(0, 1, num, endpoint=False)[:, np.newaxis] * (p2 - p1))
+      sample_seg.append(np.full(num, i))
+    samples = np.concatenate(samples)
+    idx = np.rint((samples - origin) / scale).astype(int) - win_lo
+
+    path_seg = np.full(win_hi - win_lo + 1, -1)
+    path_seg[idx[:,0], idx[:,1]] = np.concatenate(sample_seg)
+    nearest = distance_transform_edt(path_seg < 0, sampling=scale, \
+                                      return_distances=False, return_indices=True)
+
+    # distance to the segment of the nearest path cell (and the segments
+    # next to it for the corners of the path), within the field
+    nearest = nearest[:, x0-win_lo[0]:x1-win_lo[0]+1, y0-win_lo[1]:y1-win_lo[1]+1]
+    seg = path_seg[nearest[0], nearest[1]]
+    xx, yy = self.xx[x0:x1+1, y0:y1+1], self.yy[x0:x1+1, y0:y1+1]
+    window = distances[x0:x1+1, y0:y1+1]
+    for s in (seg, np.maximum(seg-1, 0), np.minimum(seg+1, len(budgeted_path)-2)):
+      np.minimum(window, segmentDistances(xx, yy, budgeted_path[s].transpose(2,0,1), \
+                          budgeted_path[s+1].transpose(2,0,1)), out=window)
+    return distances
 
-    distances = np.array([ls.distance(pt) for pt in self.pts])
+  def getExactMask(self, path, budget=float('inf')):
+    budgeted_path, budgeted_path_len = applyBudget(path, budget)
+    budgeted_path = np.asarray(budgeted_path, dtype=float)
 
-    distances = distances.reshape(self.info_field.shape)
+    return self.distanceMask(self.getExactDistances(budgeted_path))
 
-    if self.method == 'binary':
-      mask = distances <= self.radius
+  def getExactScore(self, path, budget=float('inf'), plot=False):
+    budgeted_path, budgeted_path_len = applyBudget(path, budget)
 
-    elif self.method == 'linear':
-      mask = (self.radius - np.minimum(distances, self.radius)) / self.radius
+    if len(budgeted_path) < 2:
+      return 0.0, 0.0
+    budgeted_path = np.asarray(budgeted_path, dtype=float)
 
-    elif self.method == 'squared':
-      mask = ((self.radius - np.minimum(distances, self.radius)) / self.radius)**2
+    mask = self.distanceMask(self.getExactDistances(budgeted_path))
 
     if plot:
       plt.figure()
@@ -130,127 +204,22 @@ class PathEvaluatorWithRadius(PathEvaluator):
 
 
   def getMask(self, path, budget=float('inf')):
-    distances = np.ones(self.info_field.shape)*float('inf')
     budgeted_path, budgeted_path_len = applyBudget(path, budget)
 
     if len(budgeted_path) < 2:
       return 0., 0.
+    budgeted_path = np.asarray(budgeted_path, dtype=float)
 
-    if isinstance(budgeted_path, np.ndarray):
-      query_pts = np.zeros((0,2))
-
-      for p1, p2 in zip(budgeted_path[:-1], budgeted_path[1:]):
-        if not np.array_equal(p1, p2):
-          unit_vec = (p2 - p1) / np.linalg.norm(p2-p1)
-
-          dx_step, dy_step = self.step_size*unit_vec
-
-
-          if dx_step != 0:
-            xs = np.arange(p1[0], p2[0], dx_step)
-          if dy_step != 0:
-            ys = np.arange(p1[1], p2[1], dy_step)
-          if dx_step == 0:
-            xs = np.ones(ys.shape)*p1[0]
-          if dy_step == 0:
-            ys = np.ones(xs.shape)*p1[1]
-
-          xs = xs[:len(ys)] # Ensure the two are of equal length
-          ys = ys[:len(xs)]
-
-          segment_query_pts = np.vstack((xs, ys)).transpose()
-
-          query_pts = np.vstack((query_pts, segment_query_pts))
-
-      query_pts = np.vstack((query_pts, p2))
-
-
-    else:
-      # query_pts = []
-      # for p1, p2 in zip(budgeted_path[:-1], budgeted_path[1:]):
-      #   query_pts += locationArange(p1, p2, self.step_size)
-      # query_pts = [pt.asTuple() for pt in query_pts]
-      # query_pts.append(p2.asTuple())
-      print('functionality not defined, needs an ndarray of points')
-
-    for pt in query_pts:
-      z = np.sqrt((self.xx-pt[0])**2 + (self.yy-pt[1])**2)
-      distances = np.minimum(z, distances)
-
-
-    if self.method == 'binary':
-      mask = distances <= self.radius
-
-    elif self.method == 'linear':
-      mask = (self.radius - np.minimum(distances, self.radius)) / self.radius
-
-    elif self.method == 'squared':
-      mask = ((self.radius - np.minimum(distances, self.radius)) / self.radius)**2
-
-    return mask
+    return self.distanceMask(self.getDistances(budgeted_path))
 
   def getScore(self, path, budget=float('inf')):
-    distances = np.ones(self.info_field.shape)*float('inf')
     budgeted_path, budgeted_path_len = applyBudget(path, budget)
 
     if len(budgeted_path) < 2:
       return 0., 0.
+    budgeted_path = np.asarray(budgeted_path, dtype=float)
 
-    if isinstance(budgeted_path, np.ndarray):
-      query_pts = np.zeros((0,2))
-
-      for p1, p2 in zip(budgeted_path[:-1], budgeted_path[1:]):
-        unit_vec = (p2 - p1) / np.linalg.norm(p2-p1)
-
-        dx_step, dy_step = self.step_size*unit_vec
-
-
-        if dx_step != 0:
-          xs = np.arange(p1[0], p2[0], dx_step)
-        if dy_step != 0:
-          ys = np.arange(p1[1], p2[1], dy_step)
-        if dx_step == 0:
-          xs = np.ones(ys.shape)*p1[0]
-        if dy_step == 0:
-          ys = np.ones(xs.shape)*p1[1]
-
-        xs = xs[:len(ys)] # Ensure the two are of equal length
-        ys = ys[:len(xs)]
-
-        segment_query_pts = np.vstack((xs, ys)).transpose()
-
-        query_pts = np.vstack((query_pts, segment_query_pts))
-
-      query_pts = np.vstack((query_pts, p2))
-
-
-    else:
-      print('functionality not defined, needs an ndarray of points')
-      # query_pts = []
-      # for p1, p2 in zip(budgeted_path[:-1], budgeted_path[1:]):
-      #   query_pts += locationArange(p1, p2, self.step_size)
-      # query_pts = [pt.asTuple() for pt in query_pts]
-      # query_pts.append(p2.asTuple())
-
-    for pt in query_pts:
-      z = np.sqrt((self.xx-pt[0])**2 + (self.yy-pt[1])**2)
-      distances = np.minimum(z, distances)
-
-
-    if self.method == 'binary':
-      mask = distances <= self.radius
-
-    elif self.method == 'linear':
-      mask = (self.radius - np.minimum(distances, self.radius)) / self.radius
-
-    elif self.method == 'squared':
-      mask = ((self.radius - np.minimum(distances, self.radius)) / self.radius)**2
-
-    # if plot:
-    #   plt.figure()
-    #   ax = plt.gca()
-    #   plt.pcolor(self.x_ticks, self.y_ticks, (mask*self.info_field).transpose())
-    #   plt.show(False)
+    mask = self.distanceMask(self.getDistances(budgeted_path))
 
     return np.sum(mask*self.info_field), 1.0
 
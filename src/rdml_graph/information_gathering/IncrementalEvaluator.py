@@ -0,0 +1,148 @@
+# Copyright 2021 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+#
+## @package IncrementalEvaluator.py
+# Written Ian Rankin March 2021
+#
+# An incremental version of the MaskedEvaluator for paths that are built or
+# changed one waypoint at a time (MCTS rollouts, path optimization). The
+# coverage of the current path is cached as a count of the segments covering
+# each cell, so appending, removing, or moving a waypoint only rasterizes the
+# changed segments and scores the marginal change of the coverage.
+
+import numpy as np
+
+
+class IncrementalMaskedEvaluator(object):
+
+    ## constructor
+    # @param evaluator - the MaskedEvaluator used to rasterize and score segments.
+    # @param path - [opt] the initial path (n x 2)
+    def __init__(self, evaluator, path=None):
+        self.evaluator = evaluator
+        self.reset(path)
+
+    ## reset
+    # clears the cached coverage and sets the path.
+    # @param path - [opt] the new path (n x 2)
+    def reset(self, path=None):
+        width, height = self.evaluator.info_field.shape[0:2]
+        self.counts = np.zeros(width*height, dtype=np.int32)
+        self.path = []
+        self.seg_cells = []
+        self.raw_score = np.zeros(len(self.evaluator.chan))
+
+        if path is not None:
+            for pt in path:
+                self.push(pt)
+
+    def __len__(self):
+        return len(self.path)
+
+    ## score
+    # @return - the score of the current path (same as evaluator.getScore
+    #           without a budget)
+    def score(self):
+        return self.raw_score * self.evaluator.scales
+
+    ## getMask
+    # @return - the coverage mask of the current path (x,y) int8
+    def getMask(self):
+        return (self.counts > 0).astype(np.int8).reshape(self.evaluator.info_field.shape[0:2])
+
+    ## segmentCells
+    # @return - the unique cells covered by the segment pt1 -> pt2
+    def segmentCells(self, pt1, pt2):
+        return self.evaluator.uniqueCells(self.evaluator.swathCells(pt1, pt2))
+
+    ## gain
+    # The marginal gain of appending pt to the path, without changing the path.
+    # @param pt - the new waypoint
+    #
+    # @return - the change of the score.
+    def gain(self, pt):
+        if len(self.path) == 0:
+            return np.zeros(len(self.evaluator.chan))
+        cells = self.segmentCells(self.path[-1], pt)
+        return self.evaluator.cellScores(cells[self.counts[cells] == 0]) * self.evaluator.scales
+
+    ## push
+    # appends pt to the path.
+    # @param pt - the new waypoint
+    #
+    # @return - the change of the score.
+    def push(self, pt):
+        pt = np.asarray(pt, dtype=float)
+        if len(self.path) == 0:
+            self.path.append(pt)
+            return np.zeros(len(self.evaluator.chan))
+
+        cells = self.segmentCells(self.path[-1], pt)
+        self.path.append(pt)
+        self.seg_cells.append(cells)
+        return self._addCells(cells) * self.evaluator.scales
+
+    ## pop
+    # removes the last waypoint of the path (undoing push).
+    #
+    # @return - the removed waypoint
+    def pop(self):
+        pt = self.path.pop()
+        if len(self.seg_cells) > 0:
+            self._removeCells(self.seg_cells.pop())
+        return pt
+
+    ## setPoint
+    # moves a waypoint of the path, only the (up to two) segments touching
+    # the waypoint are rasterized. Undo by setting the returned point back.
+    # @param idx - the index of the waypoint
+    # @param pt - the new location of the waypoint
+    #
+    # @return - the old waypoint, the change of the score.
+    def setPoint(self, idx, pt):
+        pt = np.asarray(pt, dtype=float)
+        if idx < 0:
+            idx += len(self.path)
+        old = self.path[idx]
+        change = np.zeros(len(self.evaluator.chan))
+
+        segs = [i for i in (idx-1, idx) if 0 <= i < len(self.seg_cells)]
+        for i in segs:
+            change -= self._removeCells(self.seg_cells[i])
+        self.path[idx] = pt
+        for i in segs:
+            self.seg_cells[i] = self.segmentCells(self.path[i], self.path[i+1])
+            change += self._addCells(self.seg_cells[i])
+
+        return old, change * self.evaluator.scales
+
+    ## _addCells
+    # @return - the unscaled score of the newly covered cells
+    def _addCells(self, cells):
+        gain = self.evaluator.cellScores(cells[self.counts[cells] == 0])
+        self.counts[cells] += 1
+        self.raw_score += gain
+        return gain
+
+    ## _removeCells
+    # @return - the unscaled score of the cells no longer covered
+    def _removeCells(self, cells):
+        self.counts[cells] -= 1
+        loss = self.evaluator.cellScores(cells[self.counts[cells] == 0])
+        self.raw_score -= loss
+        return loss
@@ -30,6 +30,8 @@ import numpy as np
 from rdml_graph.information_gathering import PathEvaluator
 from rdml_graph.information_gathering import applyBudget
 import math
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 import pdb
 
@@ -52,6 +54,39 @@ def parameterizeLine(pt1, pt2):
 
     return a,b,c
 
+## parameterizeLines
+# parameterize many lines using the equation ax + by + c = 0 (see parameterizeLine)
+# @param pts1 - the first points numpy(n, 2)
+# @param pts2 - the second points numpy(n, 2)
+#
+# @return a,b,c - each numpy(n)
+def parameterizeLines(pts1, pts2):
+    dx = pts1[:,0] - pts2[:,0]
+    dy = pts1[:,1] - pts2[:,1]
+    vertical = dx == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = np.where(vertical, 1.0, -dy / dx)
+        b = np.where(vertical, -dx / dy, 1.0)
+    c = -a * pts1[:,0] - b * pts1[:,1]
+
+    return a,b,c
+
+
+# the evaluator of the worker processes of getScores (set by _init_score_worker)
+_worker = {}
+
+def _init_score_worker(cls, state, shm_name, shape, dtype):
+    global _worker
+    shm = shared_memory.SharedMemory(name=shm_name)
+
+    evaluator = cls.__new__(cls)
+    evaluator.__dict__.update(state)
+    evaluator.info_field = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _worker = {'shm': shm, 'evaluator': evaluator}
+
+def _score_worker(paths, budget, chunk_size):
+    return _worker['evaluator'].batchScores(paths, budget, chunk_size)
+
 
 class MaskedEvaluator(PathEvaluator):
 
@@ -132,155 +167,250 @@ class MaskedEvaluator(PathEvaluator):
         return y_mins
 
 
+    ## swathColumns
+    # Rasterizes the swaths (within radius) of many segments at once, finding
+    # the y range of the swath for every x column of every segment with array
+    # operations.
+    # @param pts1 - the start points of the segments numpy(n, 2)
+    # @param pts2 - the end points of the segments numpy(n, 2)
+    #
+    # @return - x_idx, min_y, max_y, seg (each numpy(k)) the x index, y range
+    #           [min_y, max_y) and segment index of each column of the swaths,
+    #           in segment order.
+    def swathColumns(self, pts1, pts2):
+        pts1 = np.asarray(pts1, dtype=float).reshape(-1, 2)
+        pts2 = np.asarray(pts2, dtype=float).reshape(-1, 2)
+        width, height = self.info_field.shape[0:2]
+        x0, y0 = self.x_ticks[0], self.y_ticks[0]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dir = pts1 - pts2
+            dir = dir / np.linalg.norm(dir, axis=1)[:, np.newaxis]
+            perp = np.stack((-dir[:,1], dir[:,0]), axis=1) # forced to be vertical
+            perp[perp[:,1] < 0] *= -1
+
+            is_min = (pts1[:,0] < pts2[:,0])[:, np.newaxis]
+            min_pt = np.where(is_min, pts1, pts2)
+            max_pt = np.where(is_min, pts2, pts1)
+
+            upper_min_per = min_pt + perp*self.radius
+            upper_max_per = max_pt + perp*self.radius
+            lower_min_per = min_pt - perp*self.radius
+            lower_max_per = max_pt - perp*self.radius
+            upper_param = parameterizeLines(upper_min_per, upper_max_per)
+            low_param = parameterizeLines(lower_min_per, lower_max_per)
+
+            # the x columns of each segment
+            min_x = np.maximum(min_pt[:,0] - self.radius, x0)
+            max_x = np.minimum(max_pt[:,0] + self.radius, self.x_ticks[-1]+self.x_scale)
+            min_x_idx = np.maximum(np.ceil((min_x - x0) / self.x_scale), 0).astype(np.intp)
+            max_x_idx = np.minimum(np.ceil((max_x - x0) / self.x_scale), width).astype(np.intp)
+            counts = np.maximum(max_x_idx - min_x_idx, 0)
+
+            seg = np.repeat(np.arange(len(counts)), counts)
+            offset = np.arange(len(seg)) - np.repeat(np.cumsum(counts) - counts, counts)
+            x_idx = min_x_idx[seg] + offset
+            # the same x values as np.arange from the first column of the segment
+            x_start = min_x_idx*self.x_scale + x0
+            x_step = (x_start + self.x_scale) - x_start
+            x = x_start[seg] + offset*x_step[seg]
+
+            # the y range of each column
+            min_y_arr = self.gen_slices_along_x(x, min_pt[seg].T, max_pt[seg].T, \
+                                        line_low_loc=lower_min_per[seg,0], \
+                                        line_high_loc=lower_max_per[seg,0], \
+                                        line_param=[p[seg] for p in low_param], \
+                                        isTop = False)
+            max_y_arr = self.gen_slices_along_x(x, min_pt[seg].T, max_pt[seg].T, \
+                                        line_low_loc=upper_min_per[seg,0], \
+                                        line_high_loc=upper_max_per[seg,0], \
+                                        line_param=[p[seg] for p in upper_param], \
+                                        isTop = True)
+            min_y_arr = np.where(np.isnan(min_y_arr), np.inf, min_y_arr)
+            max_y_arr = np.where(np.isnan(max_y_arr), -np.inf, max_y_arr)
+
+            min_y = np.ceil((np.maximum(min_y_arr, y0) - y0) / self.y_scale)
+            max_y = np.ceil((np.minimum(max_y_arr, self.y_ticks[-1]+self.y_scale) \
+                                - y0) / self.y_scale)
+        min_y = np.clip(min_y, 0, height).astype(np.intp)
+        max_y = np.clip(max_y, 0, height).astype(np.intp)
+        return x_idx, min_y, np.maximum(max_y, min_y), seg
+
+    ## swathCells
+    # Rasterizes the swaths of many segments at once (see swathColumns)
+    # @param pts1 - the start points of the segments numpy(n, 2)
+    # @param pts2 - the end points of the segments numpy(n, 2)
+    # @param return_segments - [opt] if true, also return the index of the
+    #           segment of each cell.
+    #
+    # @return - the flat indicies (x * height + y) of the covered cells, with
+    #           duplicates (see uniqueCells), numpy(k)
+    def swathCells(self, pts1, pts2, return_segments=False):
+        height = self.info_field.shape[1]
+        x_idx, min_y, max_y, seg = self.swathColumns(pts1, pts2)
+
+        # expand the y range of each column to the cells, the cells of a column
+        # are consecutive flat indicies from x * height + min_y
+        lengths = max_y - min_y
+        base = x_idx * height + min_y - (np.cumsum(lengths) - lengths)
+        cells = np.repeat(base, lengths) + np.arange(np.sum(lengths))
+        if return_segments:
+            return cells, np.repeat(seg, lengths)
+        return cells
+
+    ## uniqueCells
+    # @param cells - flat cell indicies (with duplicates)
+    #
+    # @return - the unique cell indicies (sorted)
+    def uniqueCells(self, cells):
+        cells = np.sort(cells)
+        if len(cells) == 0:
+            return cells
+        return cells[np.concatenate(([True], cells[1:] != cells[:-1]))]
+
+    ## cellScores
+    # @param cells - the unique flat cell indicies
+    #
+    # @return - the sum of the information of the cells, for each channel.
+    def cellScores(self, cells):
+        field = self.info_field.reshape(-1, self.info_field.shape[2])
+        return np.sum(field[cells][:, self.chan], axis=0)
+
+    ## getSegmentAlongX
+    # Scores the cells of the swath of a segment not already covered by the mask.
+    # @param pt1 - the first point of the segment
+    # @param pt2 - the second point of the segment
+    # @param cur_mask - the coverage mask (width, height), set to 1 for the
+    #           cells of the swath.
+    #
+    # @return - the score of the newly covered cells for each channel.
     def getSegmentAlongX(self, pt1, pt2, cur_mask):
-        scores = np.zeros(len(self.chan))
-
-        dir = pt1 - pt2 # find the norm of the vector
-        dir = dir / np.linalg.norm(dir)
-        perp = np.array([-dir[1], dir[0]]) # forced to be vertical
-        if perp[1] < 0:
-            perp = -perp
-
-        #end_pt1 = -dir*self.radius + pt1
-        #end_pt2 = dir*self.radius + pt2
-        if pt1[0] < pt2[0]:
-            min_pt = pt1
-            max_pt = pt2
-        else:
-            min_pt = pt2
-            max_pt = pt1
-
-        upper_min_per = min_pt + perp*self.radius
-        upper_max_per = max_pt + perp*self.radius
-        lower_min_per = min_pt - perp*self.radius
-        lower_max_per = max_pt - perp*self.radius
-
-        # if pt1[0] == pt2[0]:
-        #     pdb.set_trace()
-
-        # upper_line = np.append(upper_min_per[np.newaxis,:], upper_max_per[np.newaxis, :], axis=0)
-        # line = np.append(pt1[np.newaxis,:], pt2[np.newaxis, :], axis=0)
-        # lower_line = np.append(lower_min_per[np.newaxis,:], lower_max_per[np.newaxis, :], axis=0)
-        #
-        #
-        # import matplotlib.pyplot as plt
-        #plt.figure()
-
-        #plt.scatter(upper_min_per[0][np.newaxis], upper_min_per[1][np.newaxis])
-        #plt.scatter(upper_max_per[0][np.newaxis], upper_max_per[1][np.newaxis])
-        #plt.scatter(lower_min_per[0][np.newaxis], lower_min_per[1][np.newaxis])
-        #plt.scatter(lower_max_per[0][np.newaxis], lower_max_per[1][np.newaxis])
-        # plt.plot(upper_line[:,0], upper_line[:,1])
-        # plt.plot(line[:,0], line[:,1])
-        # plt.plot(lower_line[:,0], lower_line[:,1])
-        # plt.xlim([self.x_ticks[0], self.x_ticks[-1]])
-        # plt.ylim([self.y_ticks[0], self.y_ticks[-1]])
-
-
-        upper_param = parameterizeLine(upper_min_per, upper_max_per)
-        #a_cen,b_cen,c_cen = parameterizeLine(pt1, pt2)
-        #a_low,b_low,c_low = parameterizeLine(lower_min_per, lower_max_per)
-        low_param = parameterizeLine(lower_min_per, lower_max_per)
-
-
-        min_x = max(min_pt[0] - self.radius, self.x_ticks[0])
-        max_x = min(max_pt[0] + self.radius, self.x_ticks[-1]+self.x_scale)
-
-        min_x_idx = math.ceil((min_x - self.x_ticks[0]) / self.x_scale)
-        max_x_idx = math.ceil((max_x - self.x_ticks[0]) / self.x_scale)
-        # ensure the indicies are within the information field
-        min_x_idx = max(0, min_x_idx)
-        max_x_idx = min(self.info_field.shape[0], max_x_idx)
-        if min_x_idx > self.info_field.shape[0]:
-            return np.zeros(len(self.chan))
-        elif max_x_idx < 0:
-            return np.zeros(len(self.chan))
-
-        x_range = np.arange((min_x_idx*self.x_scale)+self.x_ticks[0], \
-                ((max_x_idx+1)*self.x_scale)+self.x_ticks[0]-0.01, self.x_scale)
-
-
-        min_y_arr = self.gen_slices_along_x(x_range, min_pt, max_pt, \
-                                    line_low_loc=lower_min_per[0], \
-                                    line_high_loc=lower_max_per[0], \
-                                    line_param=low_param, \
-                                    isTop = False)
-        max_y_arr = self.gen_slices_along_x(x_range, min_pt, max_pt, \
-                                    line_low_loc=upper_min_per[0], \
-                                    line_high_loc=upper_max_per[0], \
-                                    line_param=upper_param, \
-                                    isTop = True)
-
-        #pdb.set_trace()
-        # import matplotlib.pyplot as plt
-        # plt.plot(x_range,min_y)
-        # plt.plot(x_range,max_y)
-        # plt.plot(np.array(pt1[0],pt2[0]), np.array(pt1[1],pt2[1]), color='green')
-        # plt.show()
-
-        for i, x in enumerate(range(min_x_idx, max_x_idx)):
-            #print('min_y_arr[i]: ' + str(min_y_arr[i])+ ' max_y_arr[i]: '+str(max_y_arr[i]))
-            min_y = math.ceil((max(min_y_arr[i], self.y_ticks[0])-self.y_ticks[0]) / self.y_scale)
-            max_y = math.ceil((min(max_y_arr[i], self.y_ticks[-1]+self.y_scale)\
-                                -self.y_ticks[0]) / self.y_scale)
-            min_y = max(min_y, 0)
-            max_y = min(max_y, self.info_field.shape[1])
-            if min_y > self.info_field.shape[1]:
-                continue
-            elif max_y < 0:
-                continue
-
-            #print('min_y: '+str(min_y)+' max_y: '+str(max_y))
-            # min_max_pts = np.array([[x, min_y_arr[i]], [x, max_y_arr[i]]])
-            # plt.scatter(min_max_pts[:,0], min_max_pts[:,1])
-
-
-            shaped_mask = np.repeat(cur_mask[x,min_y:max_y, np.newaxis]==1, \
-                                    len(self.chan), \
-                                    axis=1)
-
-            # (condition, true_selector, false_selector)
-            scores_raw = np.where(shaped_mask, \
-                        np.zeros((max_y - min_y, len(self.chan))), \
-                        self.info_field[x, min_y:max_y, self.chan].transpose())
-
-
-            scores = self.determineScore(shaped_mask, scores, x, min_y, max_y)
-            cur_mask[x, min_y:max_y] = 1
-
-        #print(cur_mask)
-
-        return scores
-
-    def determineScore(self, shaped_mask, scores, x, min_y, max_y):
-        scores_raw = np.where(shaped_mask, \
-                    np.zeros((max_y - min_y, len(self.chan))), \
-                    self.info_field[x, min_y:max_y, self.chan].transpose())
-
-        scores += np.sum(scores_raw, axis=0)
-        return scores
+        height = self.info_field.shape[1]
+        cells = self.uniqueCells(self.swathCells(pt1, pt2))
+        x, y = cells // height, cells % height
+        new = cells[cur_mask[x, y] != 1]
+        cur_mask[x, y] = 1
+        return self.cellScores(new)
 
 
     ## @override
     # getScore, gets the score of path given within the budget
     # @param path - the path as 2d numpy array (n x 2)
     # @param budget - the budget of the path, (typically path length)
+    # @param return_mask - [opt] if true, also return the coverage mask.
     def getScore(self, path, budget=None, return_mask=False):
         if budget is None:
             budget = self.budget
-        path, length = applyBudget(path, budget)
+        if len(path) > 1:
+            path, length = applyBudget(path, budget)
+        path = np.asarray(path, dtype=float).reshape(-1, 2)
 
-        mask = np.zeros(self.info_field.shape[0:2], dtype=np.int8)
-        scores = np.zeros(len(self.chan))
+        # all of the cells covered by the path, each only scored once.
+        cells = self.uniqueCells(self.swathCells(path[:-1], path[1:]))
+        scores = self.cellScores(cells)
 
-        for i in range(1, len(path)):
-            pt1 = path[i-1]
-            pt2 = path[i]
-
-            scores += self.getSegmentAlongX(pt1, pt2, mask)
-
-        #print(mask)
         if return_mask:
+            mask = np.zeros(self.info_field.shape[0:2], dtype=np.int8)
+            mask.reshape(-1)[cells] = 1
             return scores * self.scales, mask
 
         return scores * self.scales
+
+
+    ## getScores
+    # Gets the scores of many paths at once. The paths are scored in chunks,
+    # the swaths of all of the paths of a chunk are rasterized together as
+    # ranges of covered cells (see batchScores), so no mask of the size of the
+    # field is allocated.
+    # Starting the worker processes (and copying the info_field to shared
+    # memory) takes ~0.1s, so num_workers only pays off on multi-core machines
+    # for batches taking well over that to score in process (thousands of
+    # paths), by default the paths are scored in process.
+    # @param paths - the paths, sequence of 2d numpy arrays (n x 2) (or (m x n x 2))
+    # @param budget - the budget of the paths, (typically path length)
+    # @param num_workers - [opt] the number of worker processes, if given the
+    #           chunks are scored in parallel with the info_field in shared memory.
+    # @param chunk_size - [opt] the number of paths scored together (16-64 paths
+    #           are fastest, smaller chunks have more overhead, and larger
+    #           chunks use more memory).
+    #
+    # @return - the scores of the paths numpy (m x channels)
+    def getScores(self, paths, budget=None, num_workers=None, chunk_size=32):
+        if budget is None:
+            budget = self.budget
+
+        if num_workers is None or num_workers <= 1 or len(paths) <= chunk_size:
+            return self.batchScores(paths, budget, chunk_size) * self.scales
+
+        shm = shared_memory.SharedMemory(create=True, size=max(self.info_field.nbytes, 1))
+        try:
+            field = np.ndarray(self.info_field.shape, dtype=self.info_field.dtype, buffer=shm.buf)
+            field[:] = self.info_field
+            state = {k: v for k, v in self.__dict__.items() if k != 'info_field'}
+
+            starts = range(0, len(paths), chunk_size)
+            with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_score_worker, \
+                        initargs=(type(self), state, shm.name, field.shape, field.dtype)) as pool:
+                results = list(pool.map(_score_worker, \
+                            [paths[i:i+chunk_size] for i in starts], \
+                            [budget]*len(starts), [chunk_size]*len(starts)))
+            del field
+        finally:
+            shm.close()
+            shm.unlink()
+
+        return np.concatenate(results, axis=0) * self.scales
+
+    ## batchScores
+    # Gets the (unscaled) scores of the paths, see getScores. Rather than the
+    # cells, the y ranges of the columns of the swaths are used. The ranges of
+    # each path in the same column are merged, and scored with a prefix sum
+    # of the info_field along y, so the cost depends on the number of columns
+    # not the number of cells.
+    # @param paths - the paths, sequence of 2d numpy arrays (n x 2)
+    # @param budget - the budget of the paths
+    # @param chunk_size - [opt] the number of paths rasterized together.
+    #
+    # @return - the unscaled scores of the paths numpy (m x channels)
+    def batchScores(self, paths, budget, chunk_size=32):
+        width, height = self.info_field.shape[0:2]
+        # prefix[x, y] is the sum of the field in column x below y
+        prefix = np.zeros((width, height+1, len(self.chan)))
+        np.cumsum(self.info_field[:, :, self.chan], axis=1, out=prefix[:, 1:])
+        prefix = prefix.reshape(width*(height+1), len(self.chan))
+        scores = np.zeros((len(paths), len(self.chan)))
+
+        for start in range(0, len(paths), chunk_size):
+            pts1, pts2, num_segs = [], [], []
+            for path in paths[start:start+chunk_size]:
+                path = np.asarray(path, dtype=float).reshape(-1, 2)
+                if len(path) > 1 and \
+                        np.sum(np.linalg.norm(path[1:] - path[:-1], axis=1)) > budget:
+                    path = np.asarray(applyBudget(path, budget)[0], dtype=float)
+                pts1.append(path[:-1])
+                pts2.append(path[1:])
+                num_segs.append(len(path[1:]))
+
+            x_idx, min_y, max_y, seg = self.swathColumns(np.concatenate(pts1), \
+                                                          np.concatenate(pts2))
+            path_idx = np.repeat(np.arange(len(num_segs)), num_segs)[seg]
+
+            # sort the ranges by (path, column, min_y), offset so the ranges of
+            # different (path, column) pairs never overlap.
+            offset = (path_idx * width + x_idx) * (height+1)
+            lo, hi = offset + min_y, offset + max_y
+            order = np.argsort(lo, kind='stable')
+            lo, hi, offset = lo[order], hi[order], offset[order]
+
+            # the part of each range not covered by the previous ranges.
+            prev_hi = np.maximum.accumulate(hi)
+            lo[1:] = np.maximum(lo[1:], prev_hi[:-1])
+            hi = np.maximum(hi, lo)
+
+            # (path_idx * width + x) * (height+1) + y -> x * (height+1) + y
+            values = prefix[hi % (width*(height+1))] - prefix[lo % (width*(height+1))]
+            path_idx = path_idx[order]
+            for c in range(len(self.chan)):
+                scores[start:start+len(num_segs), c] = np.bincount(path_idx, \
+                                weights=values[:, c], minlength=len(num_segs))
+        return scores
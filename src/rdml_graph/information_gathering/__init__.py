@@ -4,3 +4,4 @@ from .Evaluator import PathEvaluator, PathEvaluatorWithRadius, PathEvaluatorAlon
 from .MaskedEvaluator import MaskedEvaluator
 from .StochasticOptimizer import StochasticOptimizer
 from .InfoField import random_field2d, random_multi_field2d
+from .IncrementalEvaluator import IncrementalMaskedEvaluator
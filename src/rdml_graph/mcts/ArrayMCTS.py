@@ -0,0 +1,210 @@
+# Copyright 2020 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+#
+## @package ArrayMCTS.py
+# Written Ian Rankin February 2020
+#
+# MCTS using the array backed MCTSArrayTree, for large trees.
+# The selection, rollout, and solution functions take the tree and node index
+# (tree, idx, ...) instead of an MCTSTree node.
+
+import numpy as np
+from rdml_graph.mcts.MCTSArrayTree import MCTSArrayTree
+from rdml_graph.mcts.MCTS import mctsOutput
+from rdml_graph.mcts.MCTSHelper import MCTSProgress
+from rdml_graph.mcts.ParetoFront import ParetoFront, get_pareto
+from rdml_graph.mcts.RolloutLog import rolloutStorage
+from rdml_graph.mcts.MCTSRandom import makeRNG, randomIndex
+
+
+############## Selection functions
+
+## arrayUCBSelection
+# Upper confidence bound selection, vectorized over the expanded children.
+# @param tree - the MCTSArrayTree
+# @param idx - the current node index
+# @param budget - the budget of the algorithm, if needed.
+# @param data - generic data, if needed.
+#
+# @return - the index of the selected child.
+def arrayUCBSelection(tree, idx, budget, data):
+    children = tree.children(idx)
+    s, e = children.start, children.stop
+    n = tree.num_updates[s:e]
+    score = tree.sum_reward[s:e] / n + np.sqrt((2 * np.log(tree.num_updates[idx])) / n)
+    return s + np.argmax(score)
+
+## arrayParetoUCBSelection
+# Upper confidence bound selection for pareto fronts, vectorized over
+# the expanded children. (same as paretoUCBSelection)
+# @param tree - the MCTSArrayTree
+# @param idx - the current node index
+# @param budget - the budget of the algorithm, if needed.
+# @param data - generic data, if needed.
+#
+# @return - the index of the selected child.
+def arrayParetoUCBSelection(tree, idx, budget, data):
+    children = tree.children(idx)
+    s, e = children.start, children.stop
+    n = tree.num_updates[s:e]
+    exploration = np.sqrt((4 * np.log(tree.num_updates[idx])) / (2 * n))
+    UCB = (tree.sum_reward[s:e] / n[:, np.newaxis]) + exploration[:, np.newaxis]
+
+    pareto_idx = get_pareto(UCB)
+    return s + pareto_idx[randomIndex(len(pareto_idx), tree.rng)]
+
+
+############## rollout functions
+
+## arrayRandomRollout
+# Performs a rollout using random successors of the states, without adding
+# nodes to the tree.
+# @param tree - the MCTSArrayTree
+# @param idx - the node index to rollout from
+# @param budget - the budget of the sequence
+# @param data - a generic structure to store data for a rollout.
+#
+# @return sequence of states of the rollout (including the path to the node).
+def arrayRandomRollout(tree, idx, budget, data=None):
+    path = tree.getPath(idx)
+    state = tree.states[idx]
+    cost = tree.rCost[idx]
+    rng = tree.rng
+
+    while cost <= budget:
+        succ = state.successor()
+        if len(succ) <= 0:
+            break
+        child = succ[randomIndex(len(succ), rng)]
+        state = child[0]
+        cost += child[1]
+        path.append(state)
+    return path
+
+
+############## solution functions
+
+## arrayBestAvgReward
+# Follows the children with the best average reward to a leaf of the tree.
+# @param tree - the MCTSArrayTree
+# @param bestSeq - the sequence with highest reward
+# @param bestR - the best seen reward
+# @param data - generic data possibly useful for the best reward.
+def arrayBestAvgReward(tree, bestSeq, bestR, data=None):
+    idx = 0
+    while tree.num_expanded[idx] > 0:
+        children = tree.children(idx)
+        idx = children.start + np.argmax(tree.reward(children))
+    return tree.getPath(idx), tree.reward(idx)
+
+## arrayMostSimulations
+# Follows the children with the most simulations to a leaf of the tree.
+# @param tree - the MCTSArrayTree
+# @param bestSeq - the sequence with highest reward
+# @param bestR - the best seen reward
+# @param data - generic data possibly useful for the best reward.
+def arrayMostSimulations(tree, bestSeq, bestR, data=None):
+    idx = 0
+    while tree.num_expanded[idx] > 0:
+        children = tree.children(idx)
+        idx = children.start + np.argmax(tree.num_updates[children.start:children.stop])
+    return tree.getPath(idx), tree.reward(idx)
+
+
+## arraySelectAndExpand
+# The selection and expansion steps of MCTS on the array tree.
+# @param tree - the MCTSArrayTree
+# @param selection - selection function (tree, idx, budget, data)
+# @param budget - the total budget of the search
+# @param data - persistent data across the MCTS.
+#
+# @return - the index of the node to perform a rollout from.
+def arraySelectAndExpand(tree, selection, budget, data):
+    current = 0
+    while True:
+        if tree.num_unpicked(current) > 0:
+            child = tree.expandNode(current)
+            tree.successor(child, budget)
+            return child
+        elif tree.num_expanded[current] <= 0:
+            # reached planning horizon, perform rollout on this node.
+            return current
+        current = selection(tree, current, budget, data)
+
+
+## MCTSArray
+# MCTS using the array backed MCTSArrayTree.
+# Takes the same parameters as MCTS, with selection, rollout and solution
+# functions taking the tree and node index (see arrayUCBSelection,
+# arrayRandomRollout, and arrayBestAvgReward).
+# @param capacity - [opt] the initial number of nodes allocated in the tree.
+# @param show_progress - [opt] if true, show a tqdm progress bar (default false)
+# @param seed - [opt] seed (int, SeedSequence, or Generator) of the search, if
+#               None the global numpy random state is used.
+#
+# @return - solution, reward, opt[data] (same as MCTS, root is the MCTSArrayTree)
+def MCTSArray(start, max_iterations, rewardFunc, budget=1.0, selection=arrayUCBSelection, \
+            rolloutFunc=arrayRandomRollout, solutionFunc=arrayBestAvgReward, data=None, \
+            actor_number=0, multi_obj_dim=1, output_tree=False, get_all_seq=False, \
+            iter_up_progress=5, progress_func=None, capacity=1024, show_progress=False, \
+            seed=None):
+    all_values = multi_obj_dim < -1
+    multi_obj_dim = abs(multi_obj_dim) if all_values else multi_obj_dim
+
+    rng = makeRNG(seed) if seed is not None else None
+    tree = MCTSArrayTree(start, multi_obj_dim=multi_obj_dim, capacity=capacity, \
+                actor_number=actor_number, rng=rng)
+    tree.successor(0, budget)
+
+    bestSeq, bestReward, optimal = None, -np.inf, None
+    if multi_obj_dim > 1:
+        optimal = ParetoFront(multi_obj_dim, alloc_size=int(np.ceil(max_iterations/10)))
+    all_sequences = rolloutStorage(get_all_seq)
+
+    progress = MCTSProgress(max_iterations, progress_func, iter_up_progress, show_progress)
+    i = 0
+    while i < max_iterations:
+        try: # Allow keyboard input to interupt MCTS
+            if i >= progress.next:
+                progress.update(i)
+
+            ######### SELECTION and Expansion
+            current = arraySelectAndExpand(tree, selection, budget, data)
+
+            ######## ROLLOUT
+            sequence = rolloutFunc(tree, current, budget, data)
+            rolloutReward, rewardActorNum = rewardFunc(sequence, budget, data)
+            if all_sequences is not None:
+                all_sequences.append((sequence, rolloutReward, rewardActorNum))
+
+            if multi_obj_dim > 1:
+                optimal.check_and_add(rolloutReward, sequence)
+            elif rolloutReward > bestReward:
+                bestReward = rolloutReward
+                bestSeq = sequence
+
+            ######## BACK-PROPOGATE
+            tree.backpropReward(current, rolloutReward, rewardActorNum)
+            i += 1
+        except KeyboardInterrupt:
+            break
+    progress.close(i)
+
+    return mctsOutput(tree, bestSeq, bestReward, optimal, all_sequences, \
+                solutionFunc, data, multi_obj_dim, all_values, output_tree, \
+                False, True)
@@ -25,12 +25,15 @@
 #
 
 
-import tqdm
 import numpy as np
-from inspect import getfullargspec
 from rdml_graph.mcts import MCTSTree
+from rdml_graph.mcts.TranspositionTree import TranspositionTree
+from rdml_graph.mcts.MultiActorTree import MultiActorTree, actorReward
 from rdml_graph.mcts import UCBSelection, randomRollout, bestAvgReward
+from rdml_graph.mcts.MCTSHelper import MCTSProgress, hasKeepEdges
 from rdml_graph.mcts.ParetoFront import ParetoFront
+from rdml_graph.mcts.RolloutLog import RolloutLog, rolloutStorage
+from rdml_graph.mcts.MCTSRandom import makeRNG
 
 import pdb
 
@@ -48,26 +51,59 @@ import pdb
 # @param actor_number - the starting actor number.
 # @param multi_obj_dim - [opt]the dimension of the multi-objective reward values
 # @param output_tree - [opt (False)] sets whether to output the root of the full mcts tree
-# @param get_all_seq - [opt] sets whether to output every reward sequence
+# @param get_all_seq - [opt] sets whether to output every reward sequence, or a
+#               RolloutLog to store the rollouts in (as ids, bounding the memory used)
 # @param iter_up_progress - [opt] the number of iterations to update the MCTS code
 # @param progress_func - [opt] the function to call to update on the current progress.
+#               (called at most every 0.1 seconds)
 # @param keepEdges - [opt] if true, keep the edges in the path default is true.
 # @param keepNodes - [opt] if true, keep the nodes in the path default is false.
+# @param transposition - [opt] key function (tree node) -> hashable, if given the
+#               statistics of tree nodes with the same key are shared
+#               (see TranspositionTree, nodeBudgetKey, and nodeVisitedKey)
+# @param widening - [opt] (k, alpha) progressive widening, nodes are only expanded
+#               while they have less than k * num_updates^alpha children, and the
+#               children are created lazily.
+# @param prior - [opt] prior function (state, data) -> score, the children are
+#               expanded from the highest prior instead of randomly.
+# @param show_progress - [opt] if true, show a tqdm progress bar (default false)
+# @param num_actors - [opt] the number of actors, if given the rewards are vectors
+#               with a reward for each actor (see MultiActorTree, and
+#               actorUCBSelection), and the best sequence is the best for
+#               actor_number. (Can not be used with transposition)
+# @param seed - [opt] seed (int, SeedSequence, or Generator) of the search, all
+#               random choices of the tree use its Generator, so runs with the
+#               same seed are reproducible. If None the global numpy random
+#               state is used.
 #
 # @return - solution, reward, opt[data]
 #           solution - list of states of best path (including start state)
 #           reward - float value of best reward.
-#           data - has possible values of ['root', 'all_paths', 'all_rewards', 'all_actors', 'solutionSeq', 'solutionReward']
+#           data - has possible values of ['root', 'all_paths', 'all_rewards', 'all_actors', 'rollouts', 'solutionSeq', 'solutionReward']
 def MCTS(   start, max_iterations, rewardFunc, budget=1.0, selection=UCBSelection, \
             rolloutFunc=randomRollout, solutionFunc=bestAvgReward, data=None, \
             actor_number=0, multi_obj_dim=1, output_tree=False, get_all_seq=False, \
-            iter_up_progress=5, progress_func=None, keepEdges=False, keepNodes=True):
+            iter_up_progress=5, progress_func=None, keepEdges=False, keepNodes=True, \
+            transposition=None, widening=None, prior=None, show_progress=False, \
+            num_actors=None, seed=None):
+    if transposition is not None and num_actors is not None:
+        raise ValueError('MCTS transposition does not support num_actors')
+
     # Set the root of the search tree.
-    root = MCTSTree(start, 0, None)
-    root.unpicked_children = root.successor(budget)
+    if transposition is not None:
+        root = TranspositionTree(start, 0, None, transposition)
+    elif num_actors is not None:
+        root = MultiActorTree(start, 0, None, actor_number=actor_number, num_actors=num_actors)
+    else:
+        root = MCTSTree(start, 0, None)
+    if seed is not None:
+        root.rng = makeRNG(seed)
+    if widening is None and prior is None:
+        root.unpicked_children = root.successor(budget)
+    else:
+        root.unpicked_children = root.lazySuccessor(budget, prior, data)
 
-    if get_all_seq:
-        all_sequences = [None] * max_iterations
+    all_sequences = rolloutStorage(get_all_seq)
     if multi_obj_dim < -1:
         multi_obj_dim = -multi_obj_dim
         all_values = True
@@ -77,41 +113,22 @@ def MCTS(   start, max_iterations, rewardFunc, budget=1.0, selection=UCBSelectio
         optimal = ParetoFront(multi_obj_dim, alloc_size=int(np.ceil(max_iterations/10)))
     else:
         bestReward = -np.inf
+        bestActorReward = -np.inf
         bestSeq = None
 
     # check if the rollout function has the arguments for keep edges and keep nodes.
-    rollout_has_keep_edges = 'keepEdges' in getfullargspec(rolloutFunc).args
-
-    # check if the solution function has the arguments for keepEdges
-    solution_has_keep_edges = 'keepEdges' in getfullargspec(solutionFunc).args
+    rollout_has_keep_edges = hasKeepEdges(rolloutFunc)
+    progress = MCTSProgress(max_iterations, progress_func, iter_up_progress, show_progress)
 
     # Main loop of MCTS
-    for i in tqdm.tqdm(range(max_iterations)):
+    i = 0
+    while i < max_iterations:
         try: # Allow keyboard input to interupt MCTS
-            current = root
-            if i % iter_up_progress == 0 and progress_func is not None:
-                progress_func(i / max_iterations)
+            if i >= progress.next:
+                progress.update(i)
 
             ######### SELECTION and Expansion
-            # Check all possibilties of selection.
-            while True:
-                if len(current.unpicked_children) > 0:
-                    ######## Expansion
-                    child = current.expandNode()
-                    child.unpicked_children = child.successor(budget)
-
-                    current = child
-
-                    # once a node has been successfully expanded break out of selection loop.
-                    break
-                else:
-                    ######## Selection.
-                    if len(current.children) <= 0:
-                        # reached planning horizon, perform rollout on this node.
-                        break
-
-                    current = selection(current, budget, data)
-            # end selection expansion while loop.
+            current = selectAndExpand(root, selection, budget, data, widening, prior)
 
             ######## ROLLOUT
             # perform rollout to the end of a possible sequence.
@@ -123,11 +140,18 @@ def MCTS(   start, max_iterations, rewardFunc, budget=1.0, selection=UCBSelectio
             else:
                 sequence = rolloutFunc(current, budget, data)
             rolloutReward, rewardActorNum = rewardFunc(sequence, budget, data)
-            if get_all_seq:
-                all_sequences[i] = (sequence, rolloutReward, rewardActorNum)
+            if num_actors is not None:
+                rolloutReward = actorReward(rolloutReward, rewardActorNum, num_actors)
+            if all_sequences is not None:
+                all_sequences.append((sequence, rolloutReward, rewardActorNum))
 
             if multi_obj_dim > 1:
                 optimal.check_and_add(rolloutReward, sequence)
+            elif num_actors is not None:
+                if rolloutReward[actor_number] > bestActorReward:
+                    bestActorReward = rolloutReward[actor_number]
+                    bestReward = rolloutReward
+                    bestSeq = sequence
             else:
                 if rolloutReward > bestReward:
                     bestReward = rolloutReward
@@ -136,13 +160,180 @@ def MCTS(   start, max_iterations, rewardFunc, budget=1.0, selection=UCBSelectio
 
             ######## BACK-PROPOGATE
             current.backpropReward(rolloutReward, rewardActorNum)
+            i += 1
         except KeyboardInterrupt:
-            if get_all_seq:
-                del all_sequences[i:]
             break
     # end main for loop
+    progress.close(i)
 
     ######## SOLUTION
+    if multi_obj_dim > 1:
+        bestSeq, bestReward = None, None
+    else:
+        optimal = None
+    return mctsOutput(root, bestSeq, bestReward, optimal, all_sequences, \
+                solutionFunc, data, multi_obj_dim, all_values, output_tree, \
+                keepEdges, keepNodes)
+
+
+## MCTSBatch
+# MCTS which selects a batch of leaves per step, using virtual loss to spread
+# the selections over the tree, and evaluates the rewards of all of their rollouts
+# in a single call to reward_batch (allowing vectorized reward functions).
+# Takes the same parameters as MCTS, with the following additions.
+# @param max_iterations - the total number of rollouts.
+# @param rewardFunc - the reward function for an end state (sequence, budget, data)
+#               only used if reward_batch is None.
+# @param iter_up_progress - [opt] the number of batches between progress updates.
+# @param batch_size - [opt] the number of leaves selected for each batch.
+# @param reward_batch - [opt] the batched reward function (sequences, budget, data)
+#               returns (rewards, actors), with a reward and actor number per sequence.
+# @param virtual_loss - [opt] the virtual loss applied to the nodes on the path
+#               of each selected leaf until the batch is backpropagated.
+# @param show_progress - [opt] if true, show a tqdm progress bar (default false)
+# @param seed - [opt] seed (int, SeedSequence, or Generator) of the search.
+#
+# @return - solution, reward, opt[data] (same as MCTS)
+def MCTSBatch(start, max_iterations, rewardFunc=None, budget=1.0, selection=UCBSelection, \
+            rolloutFunc=randomRollout, solutionFunc=bestAvgReward, data=None, \
+            actor_number=0, multi_obj_dim=1, output_tree=False, get_all_seq=False, \
+            iter_up_progress=5, progress_func=None, keepEdges=False, keepNodes=True, \
+            batch_size=16, reward_batch=None, virtual_loss=1.0, show_progress=False, \
+            seed=None):
+    if reward_batch is None and rewardFunc is None:
+        raise ValueError('MCTSBatch requires either rewardFunc or reward_batch')
+
+    root = MCTSTree(start, 0, None)
+    if seed is not None:
+        root.rng = makeRNG(seed)
+    root.unpicked_children = root.successor(budget)
+
+    all_values = multi_obj_dim < -1
+    multi_obj_dim = abs(multi_obj_dim) if all_values else multi_obj_dim
+    bestSeq, bestReward, optimal = None, -np.inf, None
+    if multi_obj_dim > 1:
+        optimal = ParetoFront(multi_obj_dim, alloc_size=int(np.ceil(max_iterations/10)))
+        loss = np.full(multi_obj_dim, virtual_loss, dtype=float)
+    else:
+        loss = virtual_loss
+    all_sequences = rolloutStorage(get_all_seq)
+
+    rollout_has_keep_edges = hasKeepEdges(rolloutFunc)
+    progress = MCTSProgress(max_iterations, progress_func, iter_up_progress * batch_size, \
+                            show_progress)
+
+    i = 0
+    while i < max_iterations:
+        try: # Allow keyboard input to interupt MCTS
+            if i >= progress.next:
+                progress.update(i)
+            n = min(batch_size, max_iterations - i)
+
+            ######### SELECTION, Expansion, and ROLLOUT of the batch
+            leaves = []
+            sequences = []
+            for j in range(n):
+                current = selectAndExpand(root, selection, budget, data)
+                current.addVirtualLoss(loss)
+                leaves.append(current)
+
+                if rollout_has_keep_edges:
+                    sequences.append(rolloutFunc(current, budget, data, keepEdges=keepEdges, keepNodes=keepNodes))
+                else:
+                    sequences.append(rolloutFunc(current, budget, data))
+
+            for current in leaves:
+                current.removeVirtualLoss(loss)
+
+            ######## REWARD of the batch
+            if reward_batch is not None:
+                rewards, actors = reward_batch(sequences, budget, data)
+            else:
+                rewards, actors = zip(*[rewardFunc(seq, budget, data) for seq in sequences])
+
+            for current, sequence, rolloutReward, rewardActorNum in \
+                                        zip(leaves, sequences, rewards, actors):
+                if all_sequences is not None:
+                    all_sequences.append((sequence, rolloutReward, rewardActorNum))
+
+                if multi_obj_dim > 1:
+                    optimal.check_and_add(rolloutReward, sequence)
+                elif rolloutReward > bestReward:
+                    bestReward = rolloutReward
+                    bestSeq = sequence
+
+                ######## BACK-PROPOGATE
+                current.backpropReward(rolloutReward, rewardActorNum)
+            i += n
+        except KeyboardInterrupt:
+            break
+    progress.close(i)
+
+    return mctsOutput(root, bestSeq, bestReward, optimal, all_sequences, \
+                solutionFunc, data, multi_obj_dim, all_values, output_tree, \
+                keepEdges, keepNodes)
+
+
+## selectAndExpand
+# The selection and expansion steps of MCTS.
+# Selects down the tree until a node with unpicked children is found and expands
+# it, or a node with no children is reached (planning horizon).
+# @param root - the root of the search tree
+# @param selection - selection function (current, budget, data)
+# @param budget - the total budget of the search
+# @param data - persistent data across the MCTS.
+# @param widening - [opt] (k, alpha) progressive widening, a node is only expanded
+#               while it has less than k * num_updates^alpha children.
+# @param prior - [opt] prior function (state, data) -> score, the order to expand
+#               the children in (highest first).
+#
+# @return - the MCTSTree node to perform a rollout from.
+def selectAndExpand(root, selection, budget, data, widening=None, prior=None):
+    current = root
+    # Check all possibilties of selection.
+    while True:
+        if len(current.unpicked_children) > 0 and (widening is None or \
+                len(current.children) < widening[0] * max(current.num_updates, 1) ** widening[1]):
+            ######## Expansion
+            child = current.expandNode()
+            if widening is None and prior is None:
+                child.unpicked_children = child.successor(budget)
+            else:
+                child.unpicked_children = child.lazySuccessor(budget, prior, data)
+
+            # once a node has been successfully expanded break out of selection loop.
+            return child
+        else:
+            ######## Selection.
+            if len(current.children) <= 0:
+                # reached planning horizon, perform rollout on this node.
+                return current
+
+            current = selection(current, budget, data)
+
+
+## mctsOutput
+# Builds the return values of the MCTS algorithm from the search results.
+# Shared by the different MCTS variants so they keep the same return contract.
+# @param root - the root of the search tree
+# @param bestSeq - the sequence with the highest reward (single objective)
+# @param bestReward - the highest reward (single objective)
+# @param optimal - the ParetoFront of rewards (multi-objective)
+# @param all_sequences - list of (sequence, reward, actor), RolloutLog, or None
+# @param solutionFunc - (root, bestSeq, bestReward, data)
+# @param data - persistent data across the MCTS.
+# @param multi_obj_dim - the dimension of the multi-objective reward values
+# @param all_values - true if multi_obj_dim was given as less than -1
+# @param output_tree - sets whether to output the root of the full mcts tree
+# @param keepEdges - if true, keep the edges in the path.
+# @param keepNodes - if true, keep the nodes in the path.
+#
+# @return - solution, reward, data (see MCTS)
+def mctsOutput(root, bestSeq, bestReward, optimal, all_sequences, solutionFunc, \
+                data, multi_obj_dim, all_values, output_tree, keepEdges, keepNodes):
+    # check if the solution function has the arguments for keepEdges
+    solution_has_keep_edges = hasKeepEdges(solutionFunc)
+
     other = {}
 
     if all_values:
@@ -155,7 +346,11 @@ def MCTS(   start, max_iterations, rewardFunc, budget=1.0, selection=UCBSelectio
         other['solutionReward'] = solutionReward
     if output_tree:
         other['root'] = root
-    if get_all_seq:
+    if isinstance(all_sequences, RolloutLog):
+        other['rollouts'] = all_sequences
+        other['all_rewards'] = all_sequences.rewards()
+        other['all_actors'] = all_sequences.actors()
+    elif all_sequences is not None:
         other['all_paths'] = [sol[0] for sol in all_sequences]
         other['all_rewards'] = np.array([sol[1] for sol in all_sequences])
         other['all_actors'] = [sol[2] for sol in all_sequences]
@@ -173,4 +368,3 @@ def MCTS(   start, max_iterations, rewardFunc, budget=1.0, selection=UCBSelectio
             # single-objective return
             solution, reward = solutionFunc(root, bestSeq, bestReward, data)
         return solution, reward, other
-# End MCTS
@@ -0,0 +1,230 @@
+# Copyright 2020 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+#
+## @package MCTSArrayTree.py
+# Written Ian Rankin February 2020
+#
+# A compact MCTS search tree, where the statistics of every node are stored in
+# preallocated numpy arrays (grown geometrically) instead of an MCTSTree object
+# per node. Nodes are referenced by integer index, and the states are kept
+# in a side table.
+# The children of a node are allocated as a contiguous block when its successors
+# are generated, with the expanded children kept at the front of the block, so
+# selection can be vectorized over a slice of the arrays.
+
+import numpy as np
+from rdml_graph.mcts.MCTSRandom import randomIndex
+
+
+## MCTSArrayTree
+# Array backed MCTS search tree.
+class MCTSArrayTree:
+    ## Constructor
+    # @param start - the state at the root of the tree.
+    # @param multi_obj_dim - [opt] the dimension of the rewards (1 for scalar rewards)
+    # @param capacity - [opt] the initial number of nodes allocated.
+    # @param actor_number - [opt] the actor number of the root.
+    # @param rng - [opt] the numpy Generator of the tree (None uses np.random)
+    def __init__(self, start, multi_obj_dim=1, capacity=1024, actor_number=0, rng=None):
+        self.multi_obj_dim = multi_obj_dim
+        self.rng = rng
+        self.size = 0
+        self.capacity = 0
+
+        self.states = []
+        self.parent = np.empty(0, dtype=np.int64)
+        self.edge_id = np.empty(0, dtype=np.int64)
+        self.actor = np.empty(0, dtype=np.int64)
+        self.rCost = np.empty(0, dtype=float)
+        self.num_updates = np.empty(0, dtype=np.int64)
+        if multi_obj_dim > 1:
+            self.sum_reward = np.empty((0, multi_obj_dim), dtype=float)
+        else:
+            self.sum_reward = np.empty(0, dtype=float)
+        self.best_reward = np.empty(0, dtype=float)
+        # child_start is -1 until the successors of the node are generated.
+        self.child_start = np.empty(0, dtype=np.int64)
+        self.child_count = np.empty(0, dtype=np.int64)
+        self.num_expanded = np.empty(0, dtype=np.int64)
+
+        self._grow(max(capacity, 1))
+        self._alloc([start], np.array([0.0]), -1, np.array([-1]), np.array([actor_number]))
+
+    ## _grow
+    # Grows the arrays to at least the given capacity (doubling the capacity).
+    # @param min_capacity - the minimum capacity needed.
+    def _grow(self, min_capacity):
+        if min_capacity <= self.capacity:
+            return
+        capacity = max(min_capacity, 2 * self.capacity)
+
+        def resize(arr, fill):
+            new = np.full((capacity,) + arr.shape[1:], fill, dtype=arr.dtype)
+            new[:self.size] = arr[:self.size]
+            return new
+
+        self.parent = resize(self.parent, -1)
+        self.edge_id = resize(self.edge_id, -1)
+        self.actor = resize(self.actor, 0)
+        self.rCost = resize(self.rCost, 0.0)
+        self.num_updates = resize(self.num_updates, 0)
+        self.sum_reward = resize(self.sum_reward, 0.0)
+        self.best_reward = resize(self.best_reward, -np.inf)
+        self.child_start = resize(self.child_start, -1)
+        self.child_count = resize(self.child_count, 0)
+        self.num_expanded = resize(self.num_expanded, 0)
+        self.capacity = capacity
+
+    ## _alloc
+    # Allocates a contiguous block of nodes.
+    # @return - the index of the first node of the block.
+    def _alloc(self, states, costs, parent, edge_ids, actors):
+        n = len(states)
+        start = self.size
+        self._grow(start + n)
+        end = start + n
+
+        self.states += states
+        self.parent[start:end] = parent
+        self.edge_id[start:end] = edge_ids
+        self.actor[start:end] = actors
+        self.rCost[start:end] = costs
+        self.size = end
+        return start
+
+    def __len__(self):
+        return self.size
+
+    ## reward
+    # @param idx - the node index (or array of indicies)
+    # @return - the average reward of the node.
+    def reward(self, idx):
+        if self.multi_obj_dim > 1:
+            return self.sum_reward[idx] / np.asarray(self.num_updates[idx])[..., np.newaxis]
+        return self.sum_reward[idx] / self.num_updates[idx]
+
+    ## children
+    # @param idx - the node index
+    # @return - the indicies of the expanded children of the node (a range).
+    def children(self, idx):
+        start = self.child_start[idx]
+        if start < 0:
+            return range(0)
+        return range(start, start + self.num_expanded[idx])
+
+    ## num_unpicked
+    # @param idx - the node index
+    # @return - the number of children of the node not yet expanded.
+    def num_unpicked(self, idx):
+        return self.child_count[idx] - self.num_expanded[idx]
+
+    ## successor
+    # Generates the children of the node (once) as a contiguous block.
+    # Removes children over budget in the same way as MCTSTree.successor.
+    # @param idx - the node index
+    # @param budget - the max budget of the successor function.
+    #
+    # @return - the range of the indicies of the children
+    def successor(self, idx, budget=np.inf):
+        if self.child_start[idx] >= 0:
+            return range(self.child_start[idx], self.child_start[idx] + self.child_count[idx])
+
+        succ = []
+        if self.rCost[idx] <= budget:
+            succ = self.states[idx].successor()
+
+        n = len(succ)
+        states = [s[0] for s in succ]
+        costs = self.rCost[idx] + np.array([s[1] for s in succ], dtype=float)
+        actors = np.array([s[2] if len(s) == 3 else 0 for s in succ], dtype=np.int64)
+        start = self._alloc(states, costs, idx, np.arange(n), actors)
+
+        self.child_start[idx] = start
+        self.child_count[idx] = n
+        self.num_expanded[idx] = 0
+        return range(start, start + n)
+
+    ## expandNode
+    # expands an unpicked child of the node. The child is swapped to the
+    # end of the expanded children, which is possible as unpicked children
+    # have no children of their own.
+    # @param idx - the node index
+    # @param child - [opt] the offset of the unpicked child (normally random)
+    #
+    # @return - the index of the expanded child.
+    def expandNode(self, idx, child=None):
+        num_unpicked = self.num_unpicked(idx)
+        if child is None:
+            child = randomIndex(num_unpicked, self.rng)
+        front = self.child_start[idx] + self.num_expanded[idx]
+        chosen = front + child
+        if chosen != front:
+            self._swap(front, chosen)
+        self.num_expanded[idx] += 1
+        return front
+
+    def _swap(self, a, b):
+        self.states[a], self.states[b] = self.states[b], self.states[a]
+        for arr in (self.edge_id, self.actor, self.rCost):
+            arr[a], arr[b] = arr[b], arr[a]
+
+    ## path_indicies
+    # @param idx - the node index
+    # @return - the array of node indicies from the root to the node.
+    def path_indicies(self, idx):
+        path = []
+        while idx >= 0:
+            path.append(idx)
+            idx = self.parent[idx]
+        return np.array(path[::-1], dtype=np.int64)
+
+    ## backpropReward
+    # Back-propogates the reward from the node to the root.
+    # @param idx - the node index
+    # @param reward - the amount of the reward.
+    # @param actor_number - the actor being rewarded.
+    def backpropReward(self, idx, reward, actor_number):
+        path = self.path_indicies(idx)
+        sign = np.where(self.actor[path] == actor_number, 1.0, -1.0)
+        if self.multi_obj_dim > 1:
+            self.sum_reward[path] += sign[:, np.newaxis] * np.asarray(reward)
+        else:
+            signed = sign * reward
+            self.sum_reward[path] += signed
+            np.maximum(self.best_reward[path], signed, out=signed)
+            self.best_reward[path] = signed
+        self.num_updates[path] += 1
+
+    ## getPath
+    # Gets the path from the root to the given node.
+    # @param idx - the node index
+    # @param keepEdges - [opt] if true, keep the edges in the path.
+    # @param keepNodes - [opt] if true, keep the nodes in the path.
+    #
+    # @return - list of states (and edges)
+    def getPath(self, idx, keepEdges=False, keepNodes=True):
+        if not keepEdges and not keepNodes:
+            raise ValueError("Cannot keep neither edges nor nodes in path, please select one or both of them.")
+        path_idx = self.path_indicies(idx)
+        path = [self.states[path_idx[0]]] if keepNodes else []
+        for p, c in zip(path_idx[:-1], path_idx[1:]):
+            if keepEdges:
+                path.append(self.states[p].e[self.edge_id[c]])
+            if keepNodes:
+                path.append(self.states[c])
+        return path
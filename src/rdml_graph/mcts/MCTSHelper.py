@@ -22,14 +22,95 @@
 # A set of various helper functions for the MCTS Tree search.
 
 import tqdm
+import time
+import functools
 import numpy as np
+from inspect import getfullargspec
 from rdml_graph.mcts import MCTSTree
-from rdml_graph.mcts.ParetoFront import ParetoFront, get_pareto
+from rdml_graph.mcts.ParetoFront import ParetoFront, get_pareto, get_pareto_pairwise
+from rdml_graph.mcts.MCTSRandom import randomIndex, randomFloat
 
 import pdb
 
 ########################### Common functions for MCTS
 
+############## Progress and callbacks
+
+## hasArgument
+# checks whether the function takes the named argument. The signature is only
+# inspected once per function.
+# @param func - the function to check
+# @param name - the name of the argument
+#
+# @return - True if the function has the argument.
+@functools.lru_cache(maxsize=256)
+def hasArgument(func, name):
+    return name in getfullargspec(func).args
+
+## hasKeepEdges
+# checks whether the (rollout or solution) function takes the keepEdges and
+# keepNodes arguments.
+# @param func - the function to check
+#
+# @return - True if the function has the keepEdges argument.
+def hasKeepEdges(func):
+    return hasArgument(func, 'keepEdges')
+
+## MCTSProgress
+# Opt-in progress reporting for the MCTS loops. The loop only needs to compare
+# the iteration against next, which is every iter_up_progress iterations when
+# reporting (and never otherwise). The progress function and progress bar are
+# updated at most every min_interval seconds.
+class MCTSProgress(object):
+    ## constructor
+    # @param max_iterations - the total number of iterations (None if unknown,
+    #               then update must be given the fraction)
+    # @param progress_func - [opt] the function to call with the progress (0-1)
+    # @param iter_up_progress - [opt] the number of iterations between checks.
+    # @param show_progress - [opt] if true, show a tqdm progress bar.
+    # @param min_interval - [opt] the minimum time in seconds between updates.
+    def __init__(self, max_iterations, progress_func=None, iter_up_progress=5, \
+                show_progress=False, min_interval=0.1):
+        self.max_iterations = max_iterations
+        self.progress_func = progress_func
+        self.iter_up_progress = max(1, iter_up_progress)
+        self.min_interval = min_interval
+        self.pbar = tqdm.tqdm(total=max_iterations) if show_progress else None
+        self.last_i = 0
+        self.last_time = -np.inf
+        if progress_func is None and self.pbar is None:
+            self.next = np.inf
+        else:
+            self.next = 0
+
+    ## @var next
+    # the next iteration to call update at.
+
+    ## update
+    # reports the progress (if enough time has passed), and sets next.
+    # @param i - the current iteration
+    # @param fraction - [opt] the progress (0-1), defaults to i / max_iterations
+    def update(self, i, fraction=None):
+        now = time.monotonic()
+        if now - self.last_time >= self.min_interval:
+            self.last_time = now
+            if self.progress_func is not None:
+                if fraction is None:
+                    fraction = i / self.max_iterations
+                self.progress_func(fraction)
+            if self.pbar is not None:
+                self.pbar.update(i - self.last_i)
+                self.last_i = i
+        self.next = i + self.iter_up_progress
+
+    ## close
+    # closes the progress bar.
+    # @param i - the number of iterations completed.
+    def close(self, i):
+        if self.pbar is not None:
+            self.pbar.update(i - self.last_i)
+            self.pbar.close()
+
 ############## Selection functions
 
 ## UCBSelection
@@ -58,19 +139,19 @@ def UCBSelection(current, budget, data):
 # @param budget - the budget of the algorithm, if needed.
 # @param data - generic data, if needed.
 def paretoUCBSelection(current, budget, data):
-    D = current.sum_reward.shape[0]
+    # the cached statistics of the child nodes
+    child_num_updates, child_sum_reward = current.childStats()
 
-    # get the needed values from the child nodes
-    child_num_updates = np.array([child.num_updates for child in current.children])
-    child_sum_reward = np.array([child.sum_reward for child in current.children])
-    
     # calcuate the UCB values for each child
     exploration = np.sqrt((4 * np.log(current.num_updates)) / (2 * child_num_updates))
     UCB = (child_sum_reward / child_num_updates[:,np.newaxis]) + exploration[:, np.newaxis]
 
     # get the pareto front of the UCB values
-    pareto_idx = get_pareto(UCB)
-    rand_idx = np.random.randint(0, len(pareto_idx))
+    if UCB.shape[0] <= 64:
+        pareto_idx = get_pareto_pairwise(UCB)
+    else:
+        pareto_idx = get_pareto(UCB)
+    rand_idx = randomIndex(len(pareto_idx), current.rng)
 
     # select a random child from the pareto front
     child = current.children[pareto_idx[rand_idx]]
@@ -92,7 +173,8 @@ def paretoUCBSelection(current, budget, data):
 # @return sequence of states. of roll out.
 def randomRollout(treeState, budget, data=None, keepEdges=False, keepNodes=True):
     current = treeState
-    remainingBudget = budget - treeState.rCost
+    rollout = []
+    rng = treeState.rng
 
     while True:
         succ = current.successor(budget)
@@ -100,13 +182,20 @@ def randomRollout(treeState, budget, data=None, keepEdges=False, keepNodes=True)
         if len(succ) <= 0:
             break
 
-        childIdx = np.random.randint(0, len(succ))
+        childIdx = randomIndex(len(succ), rng)
         child = succ[childIdx]
 
         current = child
+        rollout.append(current)
 
-    # return the path of the current state.
-    return current.getPath(keepEdges=keepEdges, keepNodes=keepNodes)
+    # return the path of the current state, reusing the path to the tree state.
+    path = treeState.getPath(keepEdges=keepEdges, keepNodes=keepNodes)
+    for node in rollout:
+        if keepEdges:
+            path.append(node.parent.state.e[node.parent_e_id])
+        if keepNodes:
+            path.append(node.state)
+    return path
 
     ## this is an older version that does not work with MCTSTree for
     # the sequence.
@@ -147,6 +236,121 @@ def randomRollout(treeState, budget, data=None, keepEdges=False, keepNodes=True)
     '''
 
 
+############## cached rollouts
+# Rollouts that walk the successors of the states directly, without creating
+# MCTSTree nodes, using a table of cached successors for each state.
+# The states must be hashable (such as graph Nodes).
+
+## cachedSuccessors
+# Gets the successors of the state, from the table if they have been generated.
+# @param state - the state
+# @param table - the successor table dictionary {state: (children, costs)}
+#
+# @return - list of child states, numpy array of the edge costs
+def cachedSuccessors(state, table):
+    entry = table.get(state)
+    if entry is None:
+        succ = state.successor()
+        entry = ([s[0] for s in succ], np.array([s[1] for s in succ], dtype=float))
+        table[state] = entry
+    return entry
+
+## cachedRollout
+# Creates a rollout function which walks the successor table using a policy.
+# @param policy - [opt] policy function (state, children, costs, data) -> child index
+#               if the policy has an rng argument, the Generator of the tree is passed.
+# @param table - [opt] the successor table dictionary (shared between rollouts)
+#
+# @return - rollout function (treeState, budget, data, keepEdges, keepNodes)
+def cachedRollout(policy=None, table=None):
+    if policy is None:
+        policy = randomPolicy
+    if table is None:
+        table = {}
+    policy_has_rng = hasArgument(policy, 'rng')
+
+    def rollout(treeState, budget, data=None, keepEdges=False, keepNodes=True):
+        path = treeState.getPath(keepEdges=keepEdges, keepNodes=keepNodes)
+        state = treeState.state
+        cost = treeState.rCost
+        rng = treeState.rng
+
+        while cost <= budget:
+            children, costs = cachedSuccessors(state, table)
+            if len(children) <= 0:
+                break
+            if policy_has_rng:
+                idx = policy(state, children, costs, data, rng=rng)
+            else:
+                idx = policy(state, children, costs, data)
+            if keepEdges:
+                path.append(state.e[idx])
+            state = children[idx]
+            cost += costs[idx]
+            if keepNodes:
+                path.append(state)
+        return path
+    rollout.table = table
+    return rollout
+
+## randomPolicy
+# rollout policy selecting a random child.
+def randomPolicy(state, children, costs, data, rng=None):
+    return randomIndex(len(children), rng)
+
+## greedyPolicy
+# Creates a rollout policy selecting the child with the highest heuristic value.
+# The best child is cached for each state when data is None (the heuristic can
+# depend on data, which may change between searches).
+# @param heuristic - the heuristic function (child state, data) -> value
+#
+# @return - policy function (state, children, costs, data) -> child index
+def greedyPolicy(heuristic):
+    best = {}
+    def policy(state, children, costs, data):
+        if data is not None:
+            return int(np.argmax([heuristic(child, data) for child in children]))
+        idx = best.get(state)
+        if idx is None:
+            idx = int(np.argmax([heuristic(child, None) for child in children]))
+            best[state] = idx
+        return idx
+    return policy
+
+## epsilonGreedyPolicy
+# Creates a rollout policy selecting the child with the highest heuristic value,
+# or a random child with probability epsilon.
+# @param heuristic - the heuristic function (child state, data) -> value
+# @param epsilon - [opt] the probability of selecting a random child.
+#
+# @return - policy function (state, children, costs, data) -> child index
+def epsilonGreedyPolicy(heuristic, epsilon=0.1):
+    greedy = greedyPolicy(heuristic)
+    def policy(state, children, costs, data, rng=None):
+        if randomFloat(rng) < epsilon:
+            return randomIndex(len(children), rng)
+        return greedy(state, children, costs, data)
+    return policy
+
+## softmaxCostPolicy
+# Creates a rollout policy selecting children with probability proportional
+# to exp(-cost / temperature), so cheaper edges are preferred.
+# The cumulative distributions are cached for each state.
+# @param temperature - [opt] the temperature of the softmax.
+#
+# @return - policy function (state, children, costs, data) -> child index
+def softmaxCostPolicy(temperature=1.0):
+    cdfs = {}
+    def policy(state, children, costs, data, rng=None):
+        cdf = cdfs.get(state)
+        if cdf is None:
+            p = np.exp(-(costs - np.min(costs)) / temperature)
+            cdf = np.cumsum(p / np.sum(p))
+            cdfs[state] = cdf
+        return min(int(np.searchsorted(cdf, randomFloat(rng), side='right')), len(cdf) - 1)
+    return policy
+
+
 ############### solution functions
 
 
@@ -190,23 +394,21 @@ def mostSimulationsSingle(root, bestSeq, bestR, data=None, keepEdges=False, keep
 
 
 def mostSimulations(root, bestSeq, bestR, data=None, keepEdges=False, keepNodes=True):
-    # base case
-    if len(root.children) < 1:
-        return root.getPath(keepEdges=keepEdges, keepNodes=keepNodes), root.reward()
-
-    best = -np.inf
-    bestIdx = -1
-    for i in range(len(root.children)):
-        child = root.children[i]
-        if child.num_updates > best:
-            best = child.num_updates
-            bestIdx = i
+    # follow the child with the most simulations down to a leaf
+    while len(root.children) > 0:
+        best = -np.inf
+        bestIdx = -1
+        for i in range(len(root.children)):
+            child = root.children[i]
+            if child.num_updates > best:
+                best = child.num_updates
+                bestIdx = i
+
+        if bestIdx == -1:
+            break
+        root = root.children[bestIdx]
 
-    if bestIdx != -1:
-        # recursively call mostSimulations on the best child
-        return mostSimulations(root.children[bestIdx], bestSeq, bestR, data, keepEdges=keepEdges, keepNodes=keepNodes)
-    else:
-        return root.getPath(keepEdges=keepEdges, keepNodes=keepNodes), root.reward()
+    return root.getPath(keepEdges=keepEdges, keepNodes=keepNodes), root.reward()
 
 ## bestReward
 # This function selects the best seen leaf
@@ -217,19 +419,20 @@ def mostSimulations(root, bestSeq, bestR, data=None, keepEdges=False, keepNodes=
 # @param keepEdges - [opt] if true, keep the edges in the path.
 # @param keepNodes - [opt] if true, keep the nodes in the path.
 def bestAvgReward(root, bestSeq, bestR, data=None, keepEdges=False, keepNodes=True):
-    best = -np.inf
-    bestIdx = -1
-
-    for i in range(len(root.children)):
-        child = root.children[i]
-        if child.reward() > best:
-            best = child.reward()
-            bestIdx = i
-
-    if bestIdx != -1:
-        return bestAvgReward(root.children[bestIdx], bestSeq, bestR, data, keepEdges=keepEdges, keepNodes=keepNodes)
-    else:
-        return root.getPath(keepEdges=keepEdges, keepNodes=keepNodes), root.reward()
+    # follow the child with the best average reward down to a leaf
+    while True:
+        best = -np.inf
+        bestIdx = -1
+
+        for i in range(len(root.children)):
+            child = root.children[i]
+            if child.reward() > best:
+                best = child.reward()
+                bestIdx = i
+
+        if bestIdx == -1:
+            return root.getPath(keepEdges=keepEdges, keepNodes=keepNodes), root.reward()
+        root = root.children[bestIdx]
 
 ## highestReward
 # This function selects the best seen leaf. (Should not be selected for multiple agents)
@@ -0,0 +1,175 @@
+# Copyright 2020 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+#
+## @package MCTSPlanner.py
+# Written Ian Rankin February 2020
+#
+# An anytime and resumable MCTS planner for online replanning. The search tree
+# is kept between calls, so the search can be run for a wall clock time limit,
+# the current best solution returned, and later continued, or re-rooted at the
+# executed action, keeping the statistics of the subtree.
+
+import time
+import numpy as np
+from rdml_graph.mcts.MCTSTree import MCTSTree
+from rdml_graph.mcts.MCTSHelper import UCBSelection, randomRollout, bestAvgReward, \
+            hasKeepEdges, MCTSProgress
+from rdml_graph.mcts.MCTS import selectAndExpand, mctsOutput
+from rdml_graph.mcts.ParetoFront import ParetoFront
+from rdml_graph.mcts.MCTSRandom import makeRNG
+
+
+## MCTSPlanner
+# Resumable MCTS search. Takes the same parameters as MCTS.
+class MCTSPlanner:
+    ## Constructor
+    # @param start - the entry state of the MCTS algorithm
+    # @param rewardFunc - the reward function for an end state (sequence, budget, data)
+    # @param budget - the total budget of the search (costs are measured from the
+    #               original start state, so the budget is kept when re-rooting)
+    # @param selection - selection function (current, budget, data)
+    # @param rolloutFunc - rollout function (treeState, budget, data)
+    # @param solutionFunc - (root, bestSeq, bestReward, data)
+    # @param data - persistent data across the MCTS.
+    # @param multi_obj_dim - [opt]the dimension of the multi-objective reward values
+    # @param keepEdges - [opt] if true, keep the edges in the path.
+    # @param keepNodes - [opt] if true, keep the nodes in the path.
+    # @param seed - [opt] seed (int, SeedSequence, or Generator) of the search.
+    def __init__(self, start, rewardFunc, budget=1.0, selection=UCBSelection, \
+                rolloutFunc=randomRollout, solutionFunc=bestAvgReward, data=None, \
+                multi_obj_dim=1, keepEdges=False, keepNodes=True, seed=None):
+        self.rewardFunc = rewardFunc
+        self.budget = budget
+        self.selection = selection
+        self.rolloutFunc = rolloutFunc
+        self.solutionFunc = solutionFunc
+        self.data = data
+        self.all_values = multi_obj_dim < -1
+        self.multi_obj_dim = abs(multi_obj_dim) if self.all_values else multi_obj_dim
+        self.keepEdges = keepEdges
+        self.keepNodes = keepNodes
+        self.rollout_has_keep_edges = hasKeepEdges(rolloutFunc)
+
+        self.root = MCTSTree(start, 0, None)
+        if seed is not None:
+            self.root.rng = makeRNG(seed)
+        self.root.unpicked_children = self.root.successor(budget)
+        self.iterations = 0
+        self._reset_best()
+
+    def _reset_best(self):
+        self.bestSeq, self.bestReward = None, -np.inf
+        self.optimal = None
+        if self.multi_obj_dim > 1:
+            self.optimal = ParetoFront(self.multi_obj_dim, alloc_size=100)
+
+    ## iterate
+    # Performs a single iteration of MCTS on the tree.
+    def iterate(self):
+        current = selectAndExpand(self.root, self.selection, self.budget, self.data)
+
+        if self.rollout_has_keep_edges:
+            sequence = self.rolloutFunc(current, self.budget, self.data, \
+                            keepEdges=self.keepEdges, keepNodes=self.keepNodes)
+        else:
+            sequence = self.rolloutFunc(current, self.budget, self.data)
+        rolloutReward, rewardActorNum = self.rewardFunc(sequence, self.budget, self.data)
+
+        if self.multi_obj_dim > 1:
+            self.optimal.check_and_add(rolloutReward, sequence)
+        elif rolloutReward > self.bestReward:
+            self.bestReward = rolloutReward
+            self.bestSeq = sequence
+
+        current.backpropReward(rolloutReward, rewardActorNum)
+        self.iterations += 1
+
+    ## run
+    # Runs the search until the number of iterations or the time limit is reached.
+    # @param max_iterations - [opt] the max number of iterations of this call.
+    # @param time_limit - [opt] the wall clock time limit of this call (seconds)
+    # @param output_tree - [opt] sets whether to output the root of the tree
+    # @param iter_up_progress - [opt] the number of iterations between progress checks.
+    # @param progress_func - [opt] the function to call with the progress (0-1), the
+    #               larger of the fraction of iterations and of the time limit.
+    # @param show_progress - [opt] if true, show a tqdm progress bar (default false)
+    #
+    # @return - solution, reward, data (see MCTS)
+    def run(self, max_iterations=None, time_limit=None, output_tree=False, \
+                iter_up_progress=5, progress_func=None, show_progress=False):
+        if max_iterations is None and time_limit is None:
+            raise ValueError('MCTSPlanner.run requires max_iterations or time_limit')
+        start_time = time.perf_counter()
+        deadline = None if time_limit is None else start_time + time_limit
+        progress = MCTSProgress(max_iterations, progress_func, iter_up_progress, show_progress)
+
+        i = 0
+        while (max_iterations is None or i < max_iterations) and \
+                    (deadline is None or time.perf_counter() < deadline):
+            if i >= progress.next:
+                fraction = 0.0 if max_iterations is None else i / max_iterations
+                if time_limit is not None:
+                    fraction = max(fraction, (time.perf_counter() - start_time) / time_limit)
+                progress.update(i, min(fraction, 1.0))
+            self.iterate()
+            i += 1
+        progress.close(i)
+        return self.solution(output_tree=output_tree)
+
+    ## solution
+    # @param output_tree - [opt] sets whether to output the root of the tree
+    #
+    # @return - the current solution, reward, data (see MCTS)
+    def solution(self, output_tree=False):
+        return mctsOutput(self.root, self.bestSeq, self.bestReward, self.optimal, \
+                    None, self.solutionFunc, self.data, self.multi_obj_dim, \
+                    self.all_values, output_tree, self.keepEdges, self.keepNodes)
+
+    ## advance
+    # Re-roots the tree at the child of the root for the executed action, keeping
+    # the statistics of its subtree. The best sequences seen are reset, as they
+    # start from the previous root.
+    # @param action - the index of the successor of the root (parent_e_id), or
+    #               the state of the child (compared with ==).
+    #
+    # @return - the new root MCTSTree
+    def advance(self, action):
+        succ = self.root.successor(self.budget)
+        if isinstance(action, (int, np.integer)):
+            matches = [c for c in succ if c.parent_e_id == action]
+        else:
+            matches = [c for c in succ if c.state == action]
+        if len(matches) == 0:
+            raise ValueError('MCTSPlanner.advance action is not a successor of the root')
+        child = matches[0]
+
+        if not any(c is child for c in self.root.children):
+            child.unpicked_children = child.successor(self.budget)
+        child.parent = None
+        child.parent_e_id = None
+
+        # the cached paths of the subtree include the previous root.
+        stack = [child]
+        while len(stack) > 0:
+            node = stack.pop()
+            node._path_cache = None
+            stack += node.children
+
+        self.root = child
+        self._reset_best()
+        return child
@@ -0,0 +1,68 @@
+# Copyright 2020 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+#
+## @package MCTSRandom.py
+# Written Ian Rankin February 2020
+#
+# Random number helpers for MCTS. The stochastic parts of the search (expansion,
+# selection ties, rollouts) draw from the numpy Generator of the tree (the rng
+# attribute), or from the global numpy random state if the tree has none.
+# Parallel searches spawn independent seeds with SeedSequence, so runs with the
+# same seed are reproducible and workers never share seeds.
+
+import numpy as np
+
+
+## makeRNG
+# @param seed - None, int, SeedSequence, or Generator (returned unchanged)
+#
+# @return - a numpy Generator
+def makeRNG(seed=None):
+    return np.random.default_rng(seed)
+
+## spawnSeeds
+# Spawns independent seeds (for parallel workers).
+# @param seed - None, int, SeedSequence, or Generator
+# @param num - the number of seeds.
+#
+# @return - list of num SeedSequence
+def spawnSeeds(seed, num):
+    if isinstance(seed, np.random.Generator):
+        seed = np.random.SeedSequence(seed.integers(0, 2**63, size=4))
+    elif not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(num)
+
+## randomIndex
+# @param n - the number of indicies
+# @param rng - [opt] the Generator, or None to use the global numpy random state
+#
+# @return - a random integer in [0, n)
+def randomIndex(n, rng=None):
+    if rng is None:
+        return np.random.randint(0, n)
+    return int(rng.integers(n))
+
+## randomFloat
+# @param rng - [opt] the Generator, or None to use the global numpy random state
+#
+# @return - a random float in [0, 1)
+def randomFloat(rng=None):
+    if rng is None:
+        return np.random.random()
+    return rng.random()
@@ -29,10 +29,21 @@ from rdml_graph.core import SearchState
 import pdb
 
 import numpy as np
+import threading
+from rdml_graph.mcts.MCTSRandom import randomIndex
+
+# guards successor generation when the tree is shared between threads.
+_successor_lock = threading.Lock()
 
 ## MCTSTree
 # The search tree for MCTS
 class MCTSTree(SearchState):
+    # whether the statistics arrays of the children are cached (see childStats)
+    cache_child_stats = True
+    # the numpy Generator of the tree (shared with the children), if None the
+    # global numpy random state is used.
+    rng = None
+
     ## Constructor
     # @param state - the state of the MCTS tree
     # @param rCost - the real cost to the state
@@ -49,6 +60,15 @@ class MCTSTree(SearchState):
         self.num_updates = 0
         self.actor_number = actor_number
         self.succ_called = False
+        self._path_cache = None
+        # lazy successors (see lazySuccessor)
+        self._succ = None
+        self._succ_nodes = None
+        self.ordered = False
+        # cached statistics of the children (see childStats)
+        self._child_n = None
+        self._child_r = None
+        self._slot = None
 
     ## reward
     # reward is an average of all total rewards propagated through the tree.
@@ -61,44 +81,160 @@ class MCTSTree(SearchState):
     # @param reward - the amount of the reward.
     # @param actor_number - the actor being rewarded.
     def backpropReward(self, reward, actor_number):
-        if actor_number == self.actor_number:
-            self.sum_reward  += reward
-            if isinstance(reward, np.ndarray):
-                pass
-            else:
-                if reward > self.best_reward:
-                    self.best_reward = reward
-        else:
-            self.sum_reward -= reward
-            if isinstance(reward, np.ndarray):
-                pass
+        is_array = isinstance(reward, np.ndarray)
+        node = self
+        while node is not None:
+            if actor_number == node.actor_number:
+                node.sum_reward += reward
+                actor_reward = reward
             else:
-                if -reward > self.best_reward:
-                    self.best_reward = -reward
-        self.num_updates += 1
+                node.sum_reward -= reward
+                actor_reward = -reward
+            if not is_array and actor_reward > node.best_reward:
+                node.best_reward = actor_reward
+            node.num_updates += 1
+            node._syncParentStats()
+            node = node.parent
+
+    ## childStats
+    # Gets the statistics of the expanded children as arrays, which are cached
+    # and updated in place during backprop (rebuilt when children are added).
+    #
+    # @return - num_updates numpy(n), sum_reward numpy(n) or numpy(n, k)
+    def childStats(self):
+        if self._child_n is None or len(self._child_n) != len(self.children):
+            num_updates = np.array([c.num_updates for c in self.children], dtype=float)
+            shape = max([np.shape(c.sum_reward) for c in self.children], key=len, default=())
+            sum_reward = np.empty((len(self.children),) + shape)
+            for i, c in enumerate(self.children):
+                sum_reward[i] = c.sum_reward
+                c._slot = i
+            if not self.cache_child_stats:
+                return num_updates, sum_reward
+            self._child_n, self._child_r = num_updates, sum_reward
+        return self._child_n, self._child_r
+
+    ## invalidateChildStats
+    # Drops the cached statistics of the children, needed if the statistics
+    # of the children are modified without backpropReward.
+    def invalidateChildStats(self):
+        self._child_n, self._child_r = None, None
+
+    def _syncParentStats(self):
+        parent = self.parent
+        if parent is not None and parent._child_n is not None and self._slot is not None:
+            parent._child_n[self._slot] = self.num_updates
+            parent._child_r[self._slot] = self.sum_reward
+
+    ## getPath
+    # Gets the path from the root to this tree node. The path of tree nodes at
+    # the planning horizon is cached once they have been updated, as repeated
+    # rollouts start from them.
+    # @param keepEdges - [opt] if true, keep the edges in the path.
+    # @param keepNodes - [opt] if true, keep the nodes in the path.
+    #
+    # @return - list of states (and edges) (a new list the caller can modify)
+    def getPath(self, keepEdges=False, keepNodes=True):
+        key = (keepEdges, keepNodes)
+        if self._path_cache is not None and self._path_cache[0] == key:
+            return list(self._path_cache[1])
+
+        path = super(MCTSTree, self).getPath(keepEdges=keepEdges, keepNodes=keepNodes)
+        if self.num_updates > 0 and len(self.children) == 0 and \
+                                    len(self.unpicked_children) == 0:
+            self._path_cache = (key, tuple(path))
+        return path
+
+    ## addVirtualLoss
+    # Adds a virtual loss from this node to the root, so concurrent selections
+    # are discouraged from following the same branch while a rollout is in flight.
+    # @param loss - the virtual loss (float, or array for multi-objective)
+    def addVirtualLoss(self, loss):
+        node = self
+        while node is not None:
+            node.sum_reward = node.sum_reward - loss
+            node.num_updates += 1
+            node._syncParentStats()
+            node = node.parent
 
-        if self.parent is not None:
-            self.parent.backpropReward(reward, actor_number)
+    ## removeVirtualLoss
+    # Removes a virtual loss added with addVirtualLoss.
+    # @param loss - the virtual loss (float, or array for multi-objective)
+    def removeVirtualLoss(self, loss):
+        node = self
+        while node is not None:
+            node.sum_reward = node.sum_reward + loss
+            node.num_updates -= 1
+            node._syncParentStats()
+            node = node.parent
 
     ## expandNode
     # expands the current node at the given index.
-    # If idx is none, then a random unpicked child is selected.
+    # If idx is none, then a random unpicked child is selected, or the last
+    # (highest prior) unpicked child if the unpicked children are ordered.
     # @param idx - the index of the unpicked child to expand (normally random)
     #
     # @return - the MCTSTree to expand
-    # @post - unpicked children has child removed, added to children
+    # @post - unpicked children has child removed (swapped with the last
+    #           unpicked child), added to children
     def expandNode(self, idx = None):
         childIdx = None
-        if idx is None:
-            childIdx = np.random.randint(0, len(self.unpicked_children))
-        else:
+        if idx is not None:
             childIdx = idx
+        elif self.ordered:
+            childIdx = len(self.unpicked_children) - 1
+        else:
+            childIdx = randomIndex(len(self.unpicked_children), self.rng)
         child = self.unpicked_children[childIdx]
-        del self.unpicked_children[childIdx]
+        self.unpicked_children[childIdx] = self.unpicked_children[-1]
+        self.unpicked_children.pop()
+        if not isinstance(child, MCTSTree):
+            # lazy successor index
+            child = self._lazyChild(child)
         self.children.append(child)
 
         return child
 
+    ## lazySuccessor
+    # Generates the successors of the state, but only creates the MCTSTree of
+    # a child once it is expanded (or successor is called).
+    # @param budget - the max budget of the successor function.
+    # @param prior - [opt] prior function (state, data) -> score, if given the
+    #               unpicked children are expanded from the highest score.
+    # @param data - [opt] data passed to the prior function
+    #
+    # @return - list of successor indicies to use as the unpicked children
+    def lazySuccessor(self, budget=np.inf, prior=None, data=None):
+        if self.rCost > budget:
+            return []
+        if self.succ_called:
+            # the children already exist (from a rollout)
+            children = [e.c for e in self.e]
+            states = [c.state for c in children]
+        else:
+            if self._succ is None:
+                self._succ = self.state.successor()
+                self._succ_nodes = [None] * len(self._succ)
+            children = list(range(len(self._succ)))
+            states = [s[0] for s in self._succ]
+
+        if prior is None:
+            return children
+        self.ordered = True
+        scores = [prior(state, data) for state in states]
+        # ascending, so the highest prior is popped from the end
+        return [children[i] for i in np.argsort(scores, kind='stable')]
+
+    def _lazyChild(self, i):
+        child = self._succ_nodes[i]
+        if child is None:
+            s = self._succ[i]
+            child = self._child(s[0], self.rCost + s[1], i)
+            if len(s) == 3:
+                child.actor_number = s[2]
+            child.rng = self.rng
+            self._succ_nodes[i] = child
+        return child
 
     ## successor
     # successor function for states that removes children over budget.
@@ -108,22 +244,41 @@ class MCTSTree(SearchState):
     def successor(self, budget=np.inf, one_after_budget=True):
         if self.succ_called:
             return [e.c for e in self.e]
-        
+
+        with _successor_lock:
+            if self.succ_called:
+                return [e.c for e in self.e]
+            return self._successor(budget, one_after_budget)
+
+    def _successor(self, budget, one_after_budget):
         result = []
         self.e = []
         if one_after_budget and self.rCost > budget:
             return result
 
-        succ = self.state.successor()
+        lazy = self._succ is not None
+        if not lazy:
+            self._succ = self.state.successor()
+            self._succ_nodes = [None] * len(self._succ)
 
-        for i, s in enumerate(succ):
+        for i, s in enumerate(self._succ):
             cost = self.rCost + s[1]
             if cost <= budget or one_after_budget:
-                n = MCTSTree(s[0], cost, self, parent_e_id=i)
+                n = self._lazyChild(i)
                 result.append(n)
                 self.e.append(Edge(self, n, s[1]))
-                if len(s) == 3:
-                    result[-1].actor_number = s[2]
 
+        if not lazy:
+            # the children are kept by the edges (lazy nodes may still
+            # have unpicked successor indicies)
+            self._succ, self._succ_nodes = None, None
         self.succ_called = True
         return result
+
+    ## _child
+    # Creates a child tree node (overridden by subclasses of MCTSTree).
+    # @param state - the state of the child
+    # @param cost - the real cost to the child
+    # @param e_id - the index of the successor edge to the child.
+    def _child(self, state, cost, e_id):
+        return MCTSTree(state, cost, self, parent_e_id=e_id)
@@ -0,0 +1,125 @@
+# Copyright 2020 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+#
+## @package MultiActorTree.py
+# Written Ian Rankin February 2020
+#
+# An MCTS search tree for N actors (multi-robot or adversarial planning). The
+# reward of a rollout is a vector with a value for each actor, and every tree
+# node keeps the sum of the reward vectors. A node is chosen by the actor that
+# made the move to it (the actor number of the successor), so the reward of a
+# node is the component of the actor of that node.
+
+import numpy as np
+from rdml_graph.mcts.MCTSTree import MCTSTree
+
+
+## actorReward
+# Converts a scalar reward for a single actor to a reward vector, where the
+# other actors receive the negative of the reward (zero-sum, as with the two
+# actors of MCTSTree).
+# @param reward - the reward (float), or reward vector numpy(num_actors)
+# @param actor_number - the actor being rewarded.
+# @param num_actors - the number of actors.
+#
+# @return - the reward vector numpy(num_actors)
+def actorReward(reward, actor_number, num_actors):
+    if np.ndim(reward) > 0:
+        return np.asarray(reward, dtype=float)
+    result = np.full(num_actors, -float(reward))
+    result[actor_number] = reward
+    return result
+
+
+## MultiActorTree
+# MCTSTree with a reward vector for every actor. Each node stores the sum and
+# best of the reward vectors, so backprop does not depend on the actor of a node.
+class MultiActorTree(MCTSTree):
+    ## Constructor
+    # @param state - the state of the MCTS tree
+    # @param rCost - the real cost to the state
+    # @param parent - the parent MultiActorTree
+    # @param actor_number - the actor number of the MCTSTree (the actor moving to it)
+    # @param parent_edge_id - the id of the edge that this tree is a child
+    # @param num_actors - [opt] the number of actors.
+    def __init__(self, state, rCost, parent, actor_number=0, parent_e_id=None, num_actors=2):
+        super(MultiActorTree, self).__init__(state, rCost, parent, \
+                        actor_number=actor_number, parent_e_id=parent_e_id)
+        self.num_actors = num_actors
+        self.sum_reward = np.zeros(num_actors)
+        self.best_reward = np.full(num_actors, -np.inf)
+        self._child_a = None
+
+    ## reward
+    # @return - the average reward of the actor of this node.
+    def reward(self):
+        return self.sum_reward[self.actor_number] / self.num_updates
+
+    ## rewards
+    # @return - the average reward vector of all of the actors numpy(num_actors)
+    def rewards(self):
+        return self.sum_reward / self.num_updates
+
+    ## backpropReward
+    # This function back-propogates the reward vector up tree.
+    # @param reward - the reward vector numpy(num_actors), or a float reward
+    #               for actor_number (see actorReward).
+    # @param actor_number - the actor being rewarded (if the reward is a float).
+    def backpropReward(self, reward, actor_number=0):
+        reward = actorReward(reward, actor_number, self.num_actors)
+        node = self
+        while node is not None:
+            node.sum_reward += reward
+            np.maximum(node.best_reward, reward, out=node.best_reward)
+            node.num_updates += 1
+            node._syncParentStats()
+            node = node.parent
+
+    ## childActors
+    # Gets the actor numbers of the expanded children (cached).
+    #
+    # @return - numpy(n) of the actor numbers of the children.
+    def childActors(self):
+        if self._child_a is None or len(self._child_a) != len(self.children):
+            self._child_a = np.array([c.actor_number for c in self.children], dtype=int)
+        return self._child_a
+
+    ## childRewards
+    # Gets the statistics of the expanded children for the actor of each child.
+    #
+    # @return - num_updates numpy(n), sum_reward of the actor of each child numpy(n)
+    def childRewards(self):
+        num_updates, sum_reward = self.childStats()
+        actors = self.childActors()
+        return num_updates, sum_reward[np.arange(len(actors)), actors]
+
+    def _child(self, state, cost, e_id):
+        return MultiActorTree(state, cost, self, parent_e_id=e_id, num_actors=self.num_actors)
+
+
+## actorUCBSelection
+# Upper confidence bound selection for a MultiActorTree, where each child is
+# scored with the reward of the actor moving to it (vectorized over the children).
+# @param current - the current tree node
+# @param budget - the budget of the algorithm, if needed.
+# @param data - generic data, if needed.
+def actorUCBSelection(current, budget, data):
+    num_updates, sum_reward = current.childRewards()
+    score = sum_reward / num_updates + \
+            np.sqrt((2 * np.log(current.num_updates)) / num_updates)
+    return current.children[int(np.argmax(score))]
@@ -0,0 +1,492 @@
+# Copyright 2020 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+#
+## @package ParallelMCTS.py
+# Written Ian Rankin February 2020
+#
+# Parallel versions of the MCTS algorithm.
+# Root parallelization runs independent trees in each worker process and merges
+# the tree statistics. Leaf parallelization runs several rollouts from each
+# selected leaf in the worker processes and backpropagates them together.
+# Tree parallelization runs worker threads that select, roll out, and
+# backpropagate on a single shared tree, using virtual loss to spread the
+# concurrent selections over the tree.
+#
+# For the process based versions, the states, reward, and rollout functions
+# must be picklable, and the successor
+# function of the states must be deterministic (return the same successors in
+# the same order), as the trees are matched using the successor edge indicies.
+# Sequences returned from the workers contain copies of the states.
+
+import os
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, \
+            FIRST_EXCEPTION
+
+from rdml_graph.mcts.MCTSTree import MCTSTree
+from rdml_graph.mcts.MCTSHelper import UCBSelection, randomRollout, bestAvgReward, \
+            highestReward, MCTSProgress, hasKeepEdges
+from rdml_graph.mcts.MCTS import MCTS, selectAndExpand, mctsOutput
+from rdml_graph.mcts.ParetoFront import ParetoFront
+from rdml_graph.mcts.RolloutLog import rolloutStorage
+from rdml_graph.mcts.MCTSRandom import makeRNG, spawnSeeds
+
+
+# parameters of the search for the worker processes (set by _init_worker)
+_worker = {}
+
+def _init_worker(params):
+    global _worker
+    _worker = params
+
+
+## treeStats
+# Gets the statistics of the expanded tree without the states, so they can be
+# cheaply sent between processes. The tree is flattened (parents before their
+# children), so deep trees can be sent without recursion.
+# @param node - the MCTSTree node
+#
+# @return - [(parent_idx, parent_e_id, num_updates, sum_reward, best_reward), ...]
+#           where parent_idx is the index of the parent in the list (-1 for node)
+def treeStats(node):
+    stats = []
+    stack = [(-1, node)]
+    while len(stack) > 0:
+        parent_idx, cur = stack.pop()
+        stats.append((parent_idx, cur.parent_e_id, cur.num_updates, \
+                        cur.sum_reward, cur.best_reward))
+        idx = len(stats) - 1
+        for child in reversed(cur.children):
+            stack.append((idx, child))
+    return stats
+
+## mergeTreeStats
+# Merges the statistics from treeStats into the given tree, expanding the
+# children of the tree as needed. Children are matched by the successor edge index.
+# @param node - the MCTSTree node to merge into
+# @param stats - the output of treeStats of the matching node of another tree.
+# @param budget - the budget of the search.
+def mergeTreeStats(node, stats, budget):
+    nodes = []
+    # parent index -> ({e_id: expanded child}, {e_id: unpicked child})
+    children = {}
+
+    for parent_idx, e_id, num_updates, sum_reward, best_reward in stats:
+        if parent_idx < 0:
+            cur = node
+        else:
+            parent = nodes[parent_idx]
+            if parent_idx not in children:
+                if not parent.succ_called:
+                    parent.unpicked_children = parent.successor(budget)
+                children[parent_idx] = ({c.parent_e_id: c for c in parent.children}, \
+                                        {c.parent_e_id: c for c in parent.unpicked_children})
+            expanded, unpicked = children[parent_idx]
+
+            cur = expanded.get(e_id)
+            if cur is None:
+                cur = unpicked.pop(e_id)
+                parent.unpicked_children.remove(cur)
+                parent.children.append(cur)
+                expanded[e_id] = cur
+                cur.unpicked_children = cur.successor(budget)
+        nodes.append(cur)
+
+        cur.num_updates += num_updates
+        cur.sum_reward = cur.sum_reward + sum_reward
+        if not isinstance(best_reward, np.ndarray) and best_reward > cur.best_reward:
+            cur.best_reward = best_reward
+        cur.invalidateChildStats()
+        if cur.parent is not None:
+            cur.parent.invalidateChildStats()
+
+## edgePath
+# The list of successor edge indicies from the root to the node.
+# @param node - the MCTSTree node
+def edgePath(node):
+    path = []
+    while node.parent is not None:
+        path.append(node.parent_e_id)
+        node = node.parent
+    path.reverse()
+    return path
+
+## split_count
+# splits count into num nearly equal integer parts.
+def split_count(count, num):
+    parts = [count // num] * num
+    for i in range(count % num):
+        parts[i] += 1
+    return parts
+
+
+############################### Root parallel
+
+def _root_parallel_worker(iterations, seed):
+    p = _worker
+    multi = p['multi_obj_dim'] > 1
+    result, reward, other = MCTS(p['start'], iterations, p['rewardFunc'], \
+                budget=p['budget'], selection=p['selection'], rolloutFunc=p['rolloutFunc'], \
+                solutionFunc=highestReward, data=p['data'], actor_number=p['actor_number'], \
+                multi_obj_dim=p['multi_obj_dim'], output_tree=True, \
+                get_all_seq=p['get_all_seq'], keepEdges=p['keepEdges'], keepNodes=p['keepNodes'], \
+                seed=seed)
+
+    all_sequences = None
+    if p['get_all_seq']:
+        all_sequences = list(zip(other['all_paths'], other['all_rewards'], other['all_actors']))
+    if multi:
+        # result is the front paths, reward the front rewards
+        return treeStats(other['root']), list(result), np.array(reward), all_sequences
+    return treeStats(other['root']), result, reward, all_sequences
+
+
+## MCTSRootParallel
+# Root parallel MCTS. Independent trees are searched in worker processes
+# and the statistics of the trees are merged into a single tree, which is
+# used to find the solution.
+# Takes the same parameters as MCTS, with the following additions.
+# @param max_iterations - the total number of iterations (split across workers)
+# @param num_workers - [opt] the number of worker processes (defaults to number of cpus)
+# @param seed - [opt] seed (int, SeedSequence, or Generator), the seed of each
+#               worker is spawned from it (SeedSequence.spawn), so the workers
+#               never share seeds.
+#
+# @return - solution, reward, opt[data] (same as MCTS)
+def MCTSRootParallel(start, max_iterations, rewardFunc, budget=1.0, selection=UCBSelection, \
+            rolloutFunc=randomRollout, solutionFunc=bestAvgReward, data=None, \
+            actor_number=0, multi_obj_dim=1, output_tree=False, get_all_seq=False, \
+            keepEdges=False, keepNodes=True, num_workers=None, seed=None):
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    all_values = multi_obj_dim < -1
+    multi_obj_dim = abs(multi_obj_dim) if all_values else multi_obj_dim
+
+    params = {'start': start, 'rewardFunc': rewardFunc, 'budget': budget, \
+              'selection': selection, 'rolloutFunc': rolloutFunc, 'data': data, \
+              'actor_number': actor_number, 'multi_obj_dim': multi_obj_dim, \
+              'get_all_seq': bool(get_all_seq), 'keepEdges': keepEdges, 'keepNodes': keepNodes}
+
+    iterations = [it for it in split_count(max_iterations, num_workers) if it > 0]
+    seeds = spawnSeeds(seed, len(iterations))
+
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, \
+                                initargs=(params,)) as pool:
+        results = list(pool.map(_root_parallel_worker, iterations, seeds))
+
+    ######## Merge trees
+    root = MCTSTree(start, 0, None)
+    root.unpicked_children = root.successor(budget)
+
+    bestSeq, bestReward, optimal = None, -np.inf, None
+    if multi_obj_dim > 1:
+        optimal = ParetoFront(multi_obj_dim, alloc_size=int(np.ceil(max_iterations/10)))
+    all_sequences = rolloutStorage(get_all_seq)
+
+    for stats, result, reward, sequences in results:
+        mergeTreeStats(root, stats, budget)
+        if multi_obj_dim > 1:
+            for r, path in zip(reward, result):
+                optimal.check_and_add(r, path)
+        elif reward > bestReward:
+            bestSeq, bestReward = result, reward
+        if all_sequences is not None:
+            for rollout in sequences:
+                all_sequences.append(rollout)
+
+    return mctsOutput(root, bestSeq, bestReward, optimal, all_sequences, \
+                solutionFunc, data, multi_obj_dim, all_values, output_tree, \
+                keepEdges, keepNodes)
+
+
+############################### Leaf parallel
+
+def _leaf_parallel_worker(e_path, seeds):
+    p = _worker
+    if 'root' not in p:
+        # each worker keeps a mirror of the tree, which caches successors.
+        p['root'] = MCTSTree(p['start'], 0, None)
+        p['local_best'] = -np.inf
+        if p['multi_obj_dim'] > 1:
+            p['local_front'] = ParetoFront(p['multi_obj_dim'])
+
+    node = p['root']
+    for e_id in e_path:
+        for child in node.successor(p['budget']):
+            if child.parent_e_id == e_id:
+                node = child
+                break
+
+    results = []
+    for seed in seeds:
+        node.rng = makeRNG(seed)
+        if p['rollout_has_keep_edges']:
+            sequence = p['rolloutFunc'](node, p['budget'], p['data'], \
+                            keepEdges=p['keepEdges'], keepNodes=p['keepNodes'])
+        else:
+            sequence = p['rolloutFunc'](node, p['budget'], p['data'])
+        reward, actor = p['rewardFunc'](sequence, p['budget'], p['data'])
+
+        # only send sequences back that could be the best sequence, as they
+        # must beat every previous reward, including the ones in this worker.
+        if p['multi_obj_dim'] > 1:
+            send_seq = p['local_front'].check_and_add(reward, None)
+        else:
+            send_seq = reward > p['local_best']
+            p['local_best'] = max(reward, p['local_best'])
+        if not (send_seq or p['get_all_seq']):
+            sequence = None
+        results.append((sequence, reward, actor))
+
+    # drop the nodes the rollouts created below the leaf, so the mirror only
+    # keeps the successors of the selected paths.
+    if node.succ_called:
+        for child in node.successor(p['budget']):
+            _drop_successors(child)
+    return results
+
+## _drop_successors
+# Drops the cached successors of the node (and so the subtree below it), they
+# are generated again if successor is called.
+def _drop_successors(node):
+    node.e = []
+    node.succ_called = False
+    node._succ = None
+    node._succ_nodes = None
+
+
+## MCTSLeafParallel
+# Leaf parallel MCTS. Selection and expansion are performed on a single tree,
+# then several rollouts from the selected leaf are run in the worker processes,
+# and all of their rewards are backpropagated together.
+# Takes the same parameters as MCTS, with the following additions.
+# @param max_iterations - the total number of rollouts.
+# @param num_workers - [opt] the number of worker processes (defaults to number of cpus)
+# @param rollouts_per_leaf - [opt] the number of rollouts for each selected leaf
+#               (defaults to num_workers)
+# @param seed - [opt] seed (int, SeedSequence, or Generator), the tree uses a
+#               Generator spawned from it, and each rollout has its own spawned
+#               seed, so the results do not depend on which worker runs a rollout.
+# @param show_progress - [opt] if true, show a tqdm progress bar (default false)
+#
+# @return - solution, reward, opt[data] (same as MCTS)
+def MCTSLeafParallel(start, max_iterations, rewardFunc, budget=1.0, selection=UCBSelection, \
+            rolloutFunc=randomRollout, solutionFunc=bestAvgReward, data=None, \
+            actor_number=0, multi_obj_dim=1, output_tree=False, get_all_seq=False, \
+            iter_up_progress=5, progress_func=None, keepEdges=False, keepNodes=True, \
+            num_workers=None, rollouts_per_leaf=None, seed=None, show_progress=False):
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    if rollouts_per_leaf is None:
+        rollouts_per_leaf = num_workers
+    all_values = multi_obj_dim < -1
+    multi_obj_dim = abs(multi_obj_dim) if all_values else multi_obj_dim
+
+    tree_seed, rollout_seeds = spawnSeeds(seed, 2)
+    root = MCTSTree(start, 0, None)
+    root.rng = makeRNG(tree_seed)
+    root.unpicked_children = root.successor(budget)
+
+    bestSeq, bestReward, optimal = None, -np.inf, None
+    if multi_obj_dim > 1:
+        optimal = ParetoFront(multi_obj_dim, alloc_size=int(np.ceil(max_iterations/10)))
+    all_sequences = rolloutStorage(get_all_seq)
+
+    params = {'start': start, 'rewardFunc': rewardFunc, 'budget': budget, \
+              'rolloutFunc': rolloutFunc, 'data': data, \
+              'multi_obj_dim': multi_obj_dim, 'get_all_seq': bool(get_all_seq), \
+              'keepEdges': keepEdges, 'keepNodes': keepNodes, \
+              'rollout_has_keep_edges': hasKeepEdges(rolloutFunc)}
+
+    progress = MCTSProgress(max_iterations, progress_func, \
+                            iter_up_progress * rollouts_per_leaf, show_progress)
+    i = 0
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, \
+                                initargs=(params,)) as pool:
+        while i < max_iterations:
+            futures = []
+            try: # Allow keyboard input to interupt MCTS
+                if i >= progress.next:
+                    progress.update(i)
+
+                ######### SELECTION and Expansion
+                current = selectAndExpand(root, selection, budget, data)
+
+                ######## ROLLOUT (in the worker processes)
+                n = min(rollouts_per_leaf, max_iterations - i)
+                seeds = rollout_seeds.spawn(n)
+                e_path = edgePath(current)
+                futures = [pool.submit(_leaf_parallel_worker, e_path, seeds[start:start+count]) \
+                            for start, count in zip(np.cumsum([0]+split_count(n, num_workers)[:-1]), \
+                                                    split_count(n, num_workers)) if count > 0]
+                results = [future.result() for future in futures]
+            except KeyboardInterrupt:
+                # drop the rollouts of the interrupted leaf
+                for future in futures:
+                    future.cancel()
+                break
+
+            for result in results:
+                for sequence, rolloutReward, rewardActorNum in result:
+                    if all_sequences is not None:
+                        all_sequences.append((sequence, rolloutReward, rewardActorNum))
+                    if multi_obj_dim > 1:
+                        optimal.check_and_add(rolloutReward, sequence)
+                    elif rolloutReward > bestReward:
+                        bestReward = rolloutReward
+                        bestSeq = sequence
+
+                    ######## BACK-PROPOGATE
+                    current.backpropReward(rolloutReward, rewardActorNum)
+            i += n
+    progress.close(i)
+
+    return mctsOutput(root, bestSeq, bestReward, optimal, all_sequences, \
+                solutionFunc, data, multi_obj_dim, all_values, output_tree, \
+                keepEdges, keepNodes)
+
+
+############################### Tree parallel
+
+## MCTSTreeParallel
+# Tree parallel MCTS. num_workers threads each run complete iterations on a
+# single shared tree: selection, expansion, rollout, reward and backprop.
+# The tree updates (selection and expansion, then the backprop) are made while
+# holding a lock on the tree, and the rollouts and rewards run concurrently
+# without it. A virtual loss is applied along the selected path while its
+# rollout is in flight, so the other workers selecting on the tree choose
+# other branches.
+# The workers are threads, so data is shared between them, and the rollout and
+# reward functions should release the GIL (numpy, IO, local services, etc) to
+# benefit from more than one worker.
+# Takes the same parameters as MCTS, with the following additions.
+# @param max_iterations - the total number of rollouts.
+# @param num_workers - [opt] the number of workers (defaults to number of cpus)
+# @param virtual_loss - [opt] the virtual loss applied to the reward sum of each
+#               node on the path of an in flight rollout.
+# @param executor - [opt] a thread based concurrent.futures Executor to run the
+#               workers in, with at least num_workers threads (defaults to a
+#               ThreadPoolExecutor with num_workers). The workers share the
+#               tree, so a ProcessPoolExecutor can not be used.
+# @param show_progress - [opt] if true, show a tqdm progress bar (default false)
+# @param seed - [opt] seed (int, SeedSequence, or Generator) of the search (the
+#               order the rollouts finish in is not deterministic, so the
+#               search is not reproducible with more than one worker).
+#
+# @return - solution, reward, opt[data] (same as MCTS)
+def MCTSTreeParallel(start, max_iterations, rewardFunc, budget=1.0, selection=UCBSelection, \
+            rolloutFunc=randomRollout, solutionFunc=bestAvgReward, data=None, \
+            actor_number=0, multi_obj_dim=1, output_tree=False, get_all_seq=False, \
+            iter_up_progress=5, progress_func=None, keepEdges=False, keepNodes=True, \
+            num_workers=None, virtual_loss=1.0, executor=None, show_progress=False, \
+            seed=None):
+    if isinstance(executor, ProcessPoolExecutor):
+        raise TypeError('MCTSTreeParallel workers share the tree, and need a thread based executor')
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    all_values = multi_obj_dim < -1
+    multi_obj_dim = abs(multi_obj_dim) if all_values else multi_obj_dim
+
+    root = MCTSTree(start, 0, None)
+    if seed is not None:
+        root.rng = makeRNG(seed)
+    root.unpicked_children = root.successor(budget)
+
+    if multi_obj_dim > 1:
+        optimal = ParetoFront(multi_obj_dim, alloc_size=int(np.ceil(max_iterations/10)))
+        # a vector loss keeps the reward sums as arrays for paretoUCBSelection
+        loss = np.full(multi_obj_dim, virtual_loss, dtype=float)
+    else:
+        optimal = None
+        loss = virtual_loss
+    # the search state shared by the workers (guarded by tree_lock)
+    search = {'bestSeq': None, 'bestReward': -np.inf, 'started': 0, 'completed': 0}
+    all_sequences = rolloutStorage(get_all_seq)
+
+    rollout_has_keep_edges = hasKeepEdges(rolloutFunc)
+    progress = MCTSProgress(max_iterations, progress_func, iter_up_progress, show_progress)
+    tree_lock = threading.Lock()
+    stop = threading.Event()
+
+    def worker():
+        while not stop.is_set():
+            ######### SELECTION and Expansion
+            with tree_lock:
+                if search['started'] >= max_iterations:
+                    return
+                search['started'] += 1
+                current = selectAndExpand(root, selection, budget, data)
+                current.addVirtualLoss(loss)
+
+            ######## ROLLOUT (concurrently with the other workers)
+            try:
+                if rollout_has_keep_edges:
+                    sequence = rolloutFunc(current, budget, data, keepEdges=keepEdges, \
+                                            keepNodes=keepNodes)
+                else:
+                    sequence = rolloutFunc(current, budget, data)
+                rolloutReward, rewardActorNum = rewardFunc(sequence, budget, data)
+            except BaseException:
+                with tree_lock:
+                    current.removeVirtualLoss(loss)
+                raise
+
+            ######## BACK-PROPOGATE
+            with tree_lock:
+                current.removeVirtualLoss(loss)
+                if all_sequences is not None:
+                    all_sequences.append((sequence, rolloutReward, rewardActorNum))
+                if multi_obj_dim > 1:
+                    optimal.check_and_add(rolloutReward, sequence)
+                elif rolloutReward > search['bestReward']:
+                    search['bestReward'] = rolloutReward
+                    search['bestSeq'] = sequence
+
+                current.backpropReward(rolloutReward, rewardActorNum)
+                search['completed'] += 1
+                if search['completed'] >= progress.next:
+                    progress.update(search['completed'])
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=num_workers)
+
+    futures = []
+    try:
+        futures = [executor.submit(worker) for _ in range(num_workers)]
+        wait(futures, return_when=FIRST_EXCEPTION)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # stop the workers, and wait for the rollouts in flight to be
+        # backpropagated before the tree is read.
+        stop.set()
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        progress.close(search['completed'])
+        if own_executor:
+            executor.shutdown(wait=True)
+    for future in futures:
+        if not future.cancelled() and future.exception() is not None:
+            raise future.exception()
+
+    return mctsOutput(root, search['bestSeq'], search['bestReward'], optimal, all_sequences, \
+                solutionFunc, data, multi_obj_dim, all_values, output_tree, \
+                keepEdges, keepNodes)
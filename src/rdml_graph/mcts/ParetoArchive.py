@@ -0,0 +1,338 @@
+# Copyright 2020 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+#
+## @package ParetoArchive.py
+# Written Ian Rankin - February 2021
+#
+# A pareto archive (maximizing all rewards) with the same interface as ParetoFront,
+# so checking and adding a value does not need to compare against the whole front.
+# For 2 dimensions the front is kept as a sorted list, where the dominance
+# check and the dominated values are found with a binary search.
+# For other dimensions the front is split into leaves of nearby values with
+# bounding ideal (max) and nadir (min) points, a two level ND-tree
+# (Jaszkiewicz and Lust, "ND-Tree-based update: a fast algorithm for the dynamic
+# nondominance problem", 2018). The bounds of all leaves are checked at once with
+# numpy, and only the leaves the bounds cannot rule out are compared against.
+# The archive can be bounded in size, removing the most crowded values, or the
+# values with the smallest hypervolume contribution. Values are removed in
+# batches, so the cost of scoring the whole archive is shared by the
+# insertions between evictions.
+
+import bisect
+import numpy as np
+
+from rdml_graph.mcts.ParetoFront import get_pareto, crowding_distance, \
+            hypervolume_contributions
+from rdml_graph.mcts.MCTSRandom import randomIndex
+
+
+## ParetoArchive
+# Pareto archive, check_and_add, check_efficient, add, get, and get_random
+# are the same as ParetoFront. (the order of get is not the insertion order)
+class ParetoArchive:
+    ## Constructor
+    # @param reward_dim - the dimension of the rewards
+    # @param max_size - [opt] the max number of values in the archive, values
+    #               are evicted when the archive grows past it.
+    # @param leaf_size - [opt] the max number of values in a leaf, before it is
+    #               split in two. (not used for 2 dimensions)
+    # @param evict - [opt] the values evicted, 'crowding' for the smallest crowding
+    #               distance, or 'hypervolume' for the smallest hypervolume
+    #               contribution (see hypervolume_contributions).
+    # @param evict_batch - [opt] the number of values evicted at once, when the
+    #               archive grows past max_size (defaults to max_size // 10).
+    #               The scores are not updated between the values of a batch.
+    # @param ref - [opt] the reference point of the hypervolume contributions.
+    # @param seed - [opt] the seed (or Generator) of the monte carlo estimate of the
+    #               hypervolume contributions (more than 2 dimensions).
+    def __init__(self, reward_dim=3, max_size=None, leaf_size=128, evict='crowding', \
+                evict_batch=None, ref=None, seed=None):
+        if evict not in ('crowding', 'hypervolume'):
+            raise ValueError('ParetoArchive unknown evict: ' + str(evict))
+        self.reward_dim = reward_dim
+        self.max_size = max_size
+        self.leaf_size = leaf_size
+        self.evict = evict
+        if evict_batch is None:
+            evict_batch = max(1, max_size // 10) if max_size is not None else 1
+        self.evict_batch = min(evict_batch, max_size) if max_size is not None else evict_batch
+        self.ref = ref
+        self.rng = np.random.default_rng(seed)
+        self.size = 0
+
+        if reward_dim == 2:
+            # sorted by the first reward (ascending), so the second reward is
+            # descending, stored negated (ascending) for bisect.
+            self.x = []
+            self.neg_y = []
+            self.vals = []
+        else:
+            # bounds of each leaf numpy(num_leaves, k)
+            self.ideal = np.empty((0, reward_dim))
+            self.nadir = np.empty((0, reward_dim))
+            # values of each leaf, numpy(leaf_size+1, k), the number used, and objects.
+            self.leaf_pts = []
+            self.leaf_count = []
+            self.leaf_vals = []
+
+    def __len__(self):
+        return self.size
+
+    ## check_and_add
+    # checks if the value should be in the pareto front and adds it to the
+    # front if it should (removing values it dominates).
+    # @param r - the input reward vector
+    # @param n - the object associated with the reward vector
+    #
+    # @return - True if the value was added.
+    def check_and_add(self, r, n):
+        added = self._check_and_add(r, n)
+        self._bound_size()
+        return added
+
+    def _check_and_add(self, r, n):
+        r = np.asarray(r, dtype=float)
+        if self.reward_dim == 2:
+            added = self._update_2d(r, n)
+        else:
+            added = self._update(r)
+            if added:
+                self._insert(r, n)
+        if added:
+            self.size += 1
+        return added
+
+    ## check_and_add_batch
+    # checks and adds a batch of values, filtering the batch to its own pareto
+    # front first.
+    # @param R - the reward vectors numpy(n, k)
+    # @param N - [opt] the list of objects associated with the reward vectors
+    #
+    # @return - boolean numpy array, if each value was added
+    #           (it may have been removed by a later value of the batch)
+    def check_and_add_batch(self, R, N=None):
+        R = np.asarray(R, dtype=float)
+        added = np.zeros(R.shape[0], dtype=bool)
+        if R.shape[0] == 0:
+            return added
+        for i in get_pareto(R):
+            added[i] = self._check_and_add(R[i], None if N is None else N[i])
+        self._bound_size()
+        return added
+
+    ## check_efficient
+    # @param r - the input reward vector
+    #
+    # @return - True if r is not (weakly) dominated by the archive.
+    def check_efficient(self, r):
+        r = np.asarray(r, dtype=float)
+        if self.reward_dim == 2:
+            pos = bisect.bisect_left(self.x, r[0])
+            return not (pos < len(self.x) and -self.neg_y[pos] >= r[1])
+
+        if np.any(np.all(self.nadir >= r, axis=1)):
+            return False
+        for l in np.flatnonzero(np.all(self.ideal >= r, axis=1)):
+            if np.any(np.all(self.leaf_pts[l][:self.leaf_count[l]] >= r, axis=1)):
+                return False
+        return True
+
+    ## add
+    # adds the value (if it is not dominated by the archive)
+    # @param r - the input reward vector
+    # @param n - the object associated with the reward vector
+    def add(self, r, n):
+        self.check_and_add(r, n)
+
+    ## get
+    # @return front, front_vals
+    def get(self):
+        if self.reward_dim == 2:
+            front = np.empty((self.size, 2))
+            front[:, 0] = self.x
+            front[:, 1] = self.neg_y
+            front[:, 1] *= -1
+            vals = np.empty(self.size, dtype=object)
+            vals[:] = self.vals
+            return front, vals
+
+        front = np.empty((self.size, self.reward_dim))
+        vals = np.empty(self.size, dtype=object)
+        i = 0
+        for pts, count, leaf_vals in zip(self.leaf_pts, self.leaf_count, self.leaf_vals):
+            front[i:i+count] = pts[:count]
+            vals[i:i+count] = leaf_vals
+            i += count
+        return front, vals
+
+    def get_random(self, rng=None):
+        front, vals = self.get()
+        rand_idx = randomIndex(self.size, rng)
+        return front[rand_idx], vals[rand_idx]
+
+    ######################## 2D sorted list
+
+    def _update_2d(self, r, n):
+        if not self.check_efficient(r):
+            return False
+        # values dominated by r are a contiguous range, with x <= r[0] and y <= r[1]
+        hi = bisect.bisect_right(self.x, r[0])
+        lo = bisect.bisect_left(self.neg_y, -r[1], 0, hi)
+        self.size -= hi - lo
+        del self.x[lo:hi]
+        del self.neg_y[lo:hi]
+        del self.vals[lo:hi]
+
+        self.x.insert(lo, r[0])
+        self.neg_y.insert(lo, -r[1])
+        self.vals.insert(lo, n)
+        return True
+
+    ######################## leaves
+
+    ## _update
+    # Removes the values dominated by r.
+    # @return - False if r is (weakly) dominated by a value in the archive.
+    def _update(self, r):
+        if not self.check_efficient(r):
+            return False
+
+        # r can only dominate values in leaves with a nadir below r.
+        emptied = []
+        for l in np.flatnonzero(np.all(r >= self.nadir, axis=1)):
+            count = self.leaf_count[l]
+            pts = self.leaf_pts[l]
+            removed = np.all(r >= pts[:count], axis=1)
+            num_removed = np.count_nonzero(removed)
+            if num_removed == 0:
+                continue
+
+            keep = np.flatnonzero(~removed)
+            pts[:len(keep)] = pts[keep]
+            self.leaf_vals[l] = [self.leaf_vals[l][i] for i in keep]
+            self.leaf_count[l] = len(keep)
+            self.size -= num_removed
+            if len(keep) == 0:
+                emptied.append(l)
+            else:
+                self._leaf_bounds(l)
+
+        for l in reversed(emptied):
+            self._remove_leaf(l)
+        return True
+
+    def _insert(self, r, n):
+        if len(self.leaf_pts) == 0:
+            self._add_leaf(r[np.newaxis], [n])
+            return
+
+        # the leaf with the closest middle of the bounds.
+        mids = (self.ideal + self.nadir) / 2
+        l = np.argmin(np.sum((mids - r)**2, axis=1))
+
+        count = self.leaf_count[l]
+        self.leaf_pts[l][count] = r
+        self.leaf_vals[l].append(n)
+        self.leaf_count[l] = count + 1
+        np.maximum(self.ideal[l], r, out=self.ideal[l])
+        np.minimum(self.nadir[l], r, out=self.nadir[l])
+
+        if count + 1 > self.leaf_size:
+            self._split(l)
+
+    ## _split
+    # splits the leaf in half along the reward dimension with the largest spread.
+    def _split(self, l):
+        pts = self.leaf_pts[l][:self.leaf_count[l]]
+        vals = self.leaf_vals[l]
+        dim = np.argmax(self.ideal[l] - self.nadir[l])
+        order = np.argsort(pts[:, dim], kind='stable')
+        half = len(order) // 2
+
+        self._remove_leaf(l)
+        for group in (order[:half], order[half:]):
+            self._add_leaf(pts[group], [vals[i] for i in group])
+
+    def _add_leaf(self, pts, vals):
+        leaf = np.empty((self.leaf_size + 1, self.reward_dim))
+        leaf[:len(pts)] = pts
+        self.leaf_pts.append(leaf)
+        self.leaf_count.append(len(pts))
+        self.leaf_vals.append(vals)
+        self.ideal = np.vstack((self.ideal, pts.max(axis=0)))
+        self.nadir = np.vstack((self.nadir, pts.min(axis=0)))
+
+    def _remove_leaf(self, l):
+        del self.leaf_pts[l]
+        del self.leaf_count[l]
+        del self.leaf_vals[l]
+        self.ideal = np.delete(self.ideal, l, axis=0)
+        self.nadir = np.delete(self.nadir, l, axis=0)
+
+    def _leaf_bounds(self, l):
+        pts = self.leaf_pts[l][:self.leaf_count[l]]
+        self.ideal[l] = pts.max(axis=0)
+        self.nadir[l] = pts.min(axis=0)
+
+    ######################## bounded size
+
+    ## _bound_size
+    # evicts values if the archive is past max_size, down to max_size + 1 - evict_batch
+    # (so at least evict_batch values are evicted at once).
+    def _bound_size(self):
+        if self.max_size is not None and self.size > self.max_size:
+            self._evict(self.size - self.max_size - 1 + self.evict_batch)
+
+    ## _evict
+    # removes the num values with the smallest crowding distance or hypervolume
+    # contribution.
+    def _evict(self, num):
+        front, vals = self.get()
+        if self.evict == 'hypervolume':
+            score = hypervolume_contributions(front, self.ref, seed=self.rng)
+        else:
+            score = crowding_distance(front)
+        keep = np.argsort(-score, kind='stable')[:self.size - num]
+        keep.sort()
+
+        if self.reward_dim == 2:
+            self.x = [self.x[i] for i in keep]
+            self.neg_y = [self.neg_y[i] for i in keep]
+            self.vals = [self.vals[i] for i in keep]
+        else:
+            # the values of get are in leaf order, so remove them leaf by leaf.
+            kept = np.zeros(self.size, dtype=bool)
+            kept[keep] = True
+            start = 0
+            emptied = []
+            for l in range(len(self.leaf_pts)):
+                count = self.leaf_count[l]
+                leaf_keep = np.flatnonzero(kept[start:start+count])
+                start += count
+                if len(leaf_keep) == count:
+                    continue
+                self.leaf_pts[l][:len(leaf_keep)] = self.leaf_pts[l][leaf_keep]
+                self.leaf_vals[l] = [self.leaf_vals[l][i] for i in leaf_keep]
+                self.leaf_count[l] = len(leaf_keep)
+                if len(leaf_keep) == 0:
+                    emptied.append(l)
+                else:
+                    self._leaf_bounds(l)
+            for l in reversed(emptied):
+                self._remove_leaf(l)
+        self.size = len(keep)
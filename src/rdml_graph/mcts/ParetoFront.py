@@ -22,9 +22,12 @@
 #
 
 import numpy as np
+import bisect
 import copy
 import pdb
 
+from rdml_graph.mcts.MCTSRandom import randomIndex
+
 class ParetoFront:
     def __init__(self, reward_dim=3, alloc_size=30):
         self.front = np.empty((alloc_size, reward_dim))
@@ -51,8 +54,12 @@ class ParetoFront:
     def get(self):
         return self.front[:self.size], self.front_val[:self.size]
 
-    def get_random(self):
-        rand_idx = np.random.randint(0, self.size)
+    # get_random
+    # @param rng - [opt] the numpy Generator (None uses np.random)
+    #
+    # @return a random front value, front_val
+    def get_random(self, rng=None):
+        rand_idx = randomIndex(self.size, rng)
         return self.front[rand_idx], self.front_val[rand_idx]
 
     # check if point is efficient.
@@ -92,31 +99,14 @@ class ParetoFront:
                                 np.all(np.logical_or(strictly_better, eq_dim), axis=1), \
                                 np.any(strictly_better, axis=1))
 
-            # new indicies
-            lower_idx = self.size - 1
-            cur_idx = 0
-            indicies = np.empty(self.size, dtype=np.int32)
-
-            #pdb.set_trace()
-            ##################### TODO, this needs to be vectorized to be faster.
-            for i in range(self.size):
-                if is_dominated[i]:
-                    indicies[i] = lower_idx
-                    lower_idx -= 1
-                else:
-                    indicies[i] = cur_idx
-                    cur_idx += 1
-            #################### end what needs to be vectorized
-
-            # remove dominated
-            #pdb.set_trace()
-            #print(self.front[:self.size])
-            #print(indicies)
-            # TODO: this op is slow
-            self.front[indicies] = copy.copy(self.front[:self.size])
-            self.front_val[indicies] = copy.copy(self.front_val[:self.size])
-            # TODO: end operation that may be slow
-            self.size -= np.sum(is_dominated)
+            # move the non-dominated values to the front (keeping their order)
+            keep = ~is_dominated
+            num_keep = np.count_nonzero(keep)
+            if num_keep < self.size:
+                self.front[:num_keep] = self.front[:self.size][keep]
+                self.front_val[:num_keep] = self.front_val[:self.size][keep]
+                self.front_val[num_keep:self.size] = None
+                self.size = num_keep
 
 
         if self.size == self.front.shape[0]:
@@ -141,7 +131,7 @@ try:
     # also written using copilot, and uh it seems to work.
     # It at least passed all of the tests I wrote.
     @jit(nopython=True)
-    def get_pareto(values):
+    def _get_pareto(values):
         n_points = values.shape[0]
         is_efficient = np.arange(n_points, dtype=np.int32)
         values_work = values.copy()
@@ -188,15 +178,10 @@ try:
         return is_efficient
 
 except ImportError:
-    ## get_pareto
-    # This function returns the indicies of the pareto optimal values in values
     # Code taken directly from this stackoverflow post for the function
     # is_pareto_efficient by user 'Peter'
     # https://stackoverflow.com/questions/32791911/fast-calculation-of-pareto-front-in-python
-    # @param values - a numpy array of n values with k dimmensions numpy(n, k)
-    #
-    # @return - numpy array of indicies
-    def get_pareto(values, return_mask=False):
+    def _get_pareto(values, return_mask=False):
         is_efficient = np.arange(values.shape[0], dtype=int)
         n_points = values.shape[0]
         next_point_index = 0  # Next index in the is_efficient array to search for
@@ -214,3 +199,344 @@ except ImportError:
             return is_efficient
 
 
+
+
+## get_pareto
+# This function returns the indicies of the pareto optimal values in values
+# Duplicate values only keep the first occurrence. 2 dimensional values use
+# a vectorized sweep, otherwise the values are repeatedly masked.
+# @param values - a numpy array of n values with k dimmensions numpy(n, k)
+# @param return_mask - [opt] return a boolean mask instead of the indicies.
+#
+# @return - numpy array of indicies (sorted)
+def get_pareto(values, return_mask=False):
+    if values.shape[1] == 2:
+        is_efficient = _get_pareto_2d(values)
+    else:
+        is_efficient = _get_pareto(values)
+    if return_mask:
+        is_efficient_mask = np.zeros(values.shape[0], dtype=bool)
+        is_efficient_mask[is_efficient] = True
+        return is_efficient_mask
+    return is_efficient
+
+## _get_pareto_2d
+# sweep in decreasing first value, keeping values with a second value higher
+# than all of the previous values.
+def _get_pareto_2d(values):
+    n = values.shape[0]
+    order = np.lexsort((np.arange(n), -values[:, 1], -values[:, 0]))
+    y = values[order, 1]
+    prev_max = np.empty(n)
+    prev_max[:1] = -np.inf
+    np.maximum.accumulate(y[:-1], out=prev_max[1:])
+    return np.sort(order[y > prev_max])
+
+
+## get_pareto_pairwise
+# Returns the indicies of the pareto optimal values using a single vectorized
+# pairwise comparison, which is faster than get_pareto for a small number of
+# values (such as the children of an MCTS node). Duplicate values only keep
+# the first occurrence, the same as get_pareto.
+# @param values - a numpy array of n values with k dimmensions numpy(n, k)
+#
+# @return - numpy array of indicies
+def get_pareto_pairwise(values):
+    n = values.shape[0]
+    # geq[j, i] = values[j] >= values[i] in all dimensions
+    geq = np.all(values[:, np.newaxis, :] >= values[np.newaxis, :, :], axis=2)
+    gt = np.any(values[:, np.newaxis, :] > values[np.newaxis, :, :], axis=2)
+    earlier = np.tri(n, k=-1, dtype=bool).T
+    dominated = np.any(geq & (gt | earlier), axis=0)
+    return np.flatnonzero(~dominated)
+
+
+## crowding_distance
+# Calculates the crowding distance (NSGA-II) of each value, the sum over the
+# dimensions of the normalized distance between the neighbors of the value.
+# The values at the boundaries of each dimension have an infinite distance.
+# @param values - a numpy array of n values with k dimmensions numpy(n, k)
+#
+# @return - numpy array of crowding distances numpy(n)
+def crowding_distance(values):
+    values = np.asarray(values, dtype=float)
+    n, k = values.shape
+    distance = np.zeros(n)
+    if n <= 2:
+        distance[:] = np.inf
+        return distance
+
+    order = np.argsort(values, axis=0, kind='stable')
+    sorted_vals = np.take_along_axis(values, order, axis=0)
+    span = sorted_vals[-1] - sorted_vals[0]
+    span[span == 0] = 1.0
+
+    gaps = np.empty((n, k))
+    gaps[1:-1] = (sorted_vals[2:] - sorted_vals[:-2]) / span
+    gaps[0] = np.inf
+    gaps[-1] = np.inf
+    # scatter the gaps back to the original order of the values
+    np.add.at(distance, order, gaps)
+    return distance
+
+
+## nondominated_sort
+# Sorts the values into pareto fronts (maximizing), rank 0 is the pareto front,
+# rank 1 the front once rank 0 is removed, etc.
+# For 2 and 3 dimensions, the efficient non-dominated sort (Zhang et al, 2015)
+# with a binary search over the fronts is used, where each front is a sorted
+# staircase, so checking a front is also a binary search. Otherwise each front
+# is checked at once with numpy.
+# @param values - a numpy array of n values with k dimmensions numpy(n, k)
+# @param return_fronts - [opt] also return the list of the indicies in each front.
+#
+# @return - numpy array of the ranks numpy(n), opt[list of fronts]
+def nondominated_sort(values, return_fronts=False):
+    values = np.asarray(values, dtype=float)
+    n, k = values.shape
+    ranks = np.zeros(n, dtype=int)
+
+    # lexicographic decreasing order, so a value can only be dominated by
+    # values before it.
+    order = np.lexsort(tuple(-values[:, d] for d in reversed(range(k))))
+    num_fronts = 0
+
+    if k == 2:
+        # the last value added to each front has the highest second value, and
+        # the lowest first value of the front.
+        last_x = np.empty(n)
+        last_y = np.empty(n)
+        for i in order:
+            x, y = values[i]
+            lo, hi = 0, num_fronts
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if last_y[mid] > y or (last_y[mid] == y and last_x[mid] > x):
+                    lo = mid + 1
+                else:
+                    hi = mid
+            ranks[i] = lo
+            last_x[lo] = x
+            last_y[lo] = y
+            num_fronts = max(num_fronts, lo + 1)
+    elif k == 3:
+        # the values are sorted by the first value, so a front dominates a value
+        # if its 2d staircase of the other values covers the value.
+        # staircase of each front as sorted lists, increasing y, decreasing z,
+        # and the first value of each staircase point.
+        stairs = []
+        for i in order:
+            x, y, z = values[i]
+            lo, hi = 0, num_fronts
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if _stair_dominates(stairs[mid], x, y, z):
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == num_fronts:
+                stairs.append(([], [], []))
+                num_fronts += 1
+            _stair_insert(stairs[lo], x, y, z)
+            ranks[i] = lo
+    else:
+        # with the unique values in decreasing order, a value is dominated by
+        # an earlier value if it is greater or equal in every (other) dimension.
+        unique, inverse = np.unique(values, axis=0, return_inverse=True)
+        unique = unique[::-1, 1:]
+        unique_ranks = np.empty(unique.shape[0], dtype=int)
+        # each front is stored by dimension (k-1, capacity), so the comparison
+        # can be done a dimension at a time (much faster than np.all(axis=1))
+        fronts = []
+        sizes = []
+        for i, v in enumerate(unique):
+            lo, hi = 0, num_fronts
+            while lo < hi:
+                mid = (lo + hi) // 2
+                f = fronts[mid]
+                size = sizes[mid]
+                dom = f[0, :size] >= v[0]
+                for d in range(1, k - 1):
+                    dom &= f[d, :size] >= v[d]
+                if dom.any():
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == num_fronts:
+                fronts.append(np.empty((k - 1, 16)))
+                sizes.append(0)
+                num_fronts += 1
+            elif sizes[lo] == fronts[lo].shape[1]:
+                fronts[lo] = np.concatenate((fronts[lo], np.empty_like(fronts[lo])), axis=1)
+            fronts[lo][:, sizes[lo]] = v
+            sizes[lo] += 1
+            unique_ranks[i] = lo
+        ranks = unique_ranks[::-1][inverse.reshape(-1)]
+
+    if return_fronts:
+        order = np.argsort(ranks, kind='stable')
+        splits = np.cumsum(np.bincount(ranks, minlength=num_fronts))[:-1]
+        return ranks, np.split(order, splits)
+    return ranks
+
+
+def _stair_dominates(stair, x, y, z):
+    ys, neg_zs, xs = stair
+    # the staircase point with the smallest y >= y, has the highest z of them.
+    pos = bisect.bisect_left(ys, y)
+    if pos == len(ys):
+        return False
+    sz = -neg_zs[pos]
+    return sz > z or (sz == z and (ys[pos] > y or xs[pos] > x))
+
+def _stair_insert(stair, x, y, z):
+    ys, neg_zs, xs = stair
+    pos = bisect.bisect_left(ys, y)
+    if pos < len(ys) and -neg_zs[pos] >= z:
+        # covered (an equal value)
+        return
+    # remove the staircase points covered by the value (y' <= y, z' <= z)
+    hi = bisect.bisect_right(ys, y)
+    lo = bisect.bisect_left(neg_zs, -z, 0, hi)
+    del ys[lo:hi]
+    del neg_zs[lo:hi]
+    del xs[lo:hi]
+    ys.insert(lo, y)
+    neg_zs.insert(lo, -z)
+    xs.insert(lo, x)
+
+
+## hypervolume
+# The hypervolume (maximizing) dominated by the values and bounded by the
+# reference point. Values that do not dominate the reference point are ignored.
+# Exact for 1 to 3 dimensions (sweep-line), and estimated with monte carlo
+# sampling for more dimensions.
+# @param values - a numpy array of n values with k dimmensions numpy(n, k)
+# @param ref - the reference point numpy(k)
+# @param num_samples - [opt] the number of samples of the monte carlo estimate.
+# @param seed - [opt] the seed (or Generator) of the monte carlo estimate.
+#
+# @return - the hypervolume
+def hypervolume(values, ref, num_samples=100000, seed=None):
+    values = np.asarray(values, dtype=float)
+    ref = np.asarray(ref, dtype=float)
+    values = values[np.all(values > ref, axis=1)]
+    if values.shape[0] == 0:
+        return 0.0
+    values = values[get_pareto(values)] - ref
+    k = values.shape[1]
+
+    if k == 1:
+        return float(values.max())
+    elif k == 2:
+        # decreasing x, so the front has increasing y.
+        values = values[np.argsort(-values[:, 0], kind='stable')]
+        y_prev = np.concatenate(([0.0], values[:-1, 1]))
+        return float(np.sum(values[:, 0] * (values[:, 1] - y_prev)))
+    elif k == 3:
+        return _hypervolume_3d(values)
+
+    # monte carlo estimate in the bounding box of the values.
+    rng = np.random.default_rng(seed)
+    upper = values.max(axis=0)
+    dominated = 0
+    chunk = max(1, 2**22 // (values.shape[0] * k))
+    for start in range(0, num_samples, chunk):
+        samples = rng.random((min(chunk, num_samples - start), k)) * upper
+        dominated += np.count_nonzero(np.any(np.all( \
+                    values[np.newaxis, :, :] >= samples[:, np.newaxis, :], axis=2), axis=1))
+    return float(np.prod(upper) * dominated / num_samples)
+
+## _hypervolume_3d
+# sweeps down the third dimension, keeping the 2d staircase of the values seen
+# (as sorted lists) and its area.
+def _hypervolume_3d(values):
+    values = values[np.argsort(-values[:, 2], kind='stable')]
+    xs = []      # increasing x
+    neg_ys = []  # so decreasing y (stored negated, increasing)
+    area = 0.0
+    volume = 0.0
+
+    for i in range(values.shape[0]):
+        x, y, z = values[i]
+        # the point is covered if a staircase point has x' >= x and y' >= y
+        pos = bisect.bisect_left(xs, x)
+        if not (pos < len(xs) and -neg_ys[pos] >= y):
+            # remove the dominated staircase points (x' <= x, y' <= y)
+            hi = bisect.bisect_right(xs, x)
+            lo = bisect.bisect_left(neg_ys, -y, 0, hi)
+            # area of the region added above the staircase
+            y_right = -neg_ys[hi] if hi < len(xs) else 0.0
+            x_left = xs[lo - 1] if lo > 0 else 0.0
+            added = (x - x_left) * (y - y_right)
+            for j in range(lo, hi):
+                x_prev = xs[j - 1] if j > 0 else 0.0
+                x_prev = max(x_prev, x_left)
+                added -= (xs[j] - x_prev) * (-neg_ys[j] - y_right)
+            area += added
+            del xs[lo:hi]
+            del neg_ys[lo:hi]
+            xs.insert(lo, x)
+            neg_ys.insert(lo, -y)
+
+        z_next = values[i + 1, 2] if i + 1 < values.shape[0] else 0.0
+        volume += area * (z - z_next)
+    return float(volume)
+
+
+## hypervolume_contributions
+# The hypervolume (maximizing) contributed by each value of a pareto front, the
+# volume dominated only by that value. Exact for 2 dimensions, and estimated
+# with monte carlo sampling (the samples dominated by exactly one value) for
+# other dimensions.
+# If no reference point is given, the minimum of the front is used, and the
+# values at the boundaries of each dimension have an infinite contribution
+# (as for crowding_distance).
+# @param values - a numpy array of n non-dominated values with k dimmensions numpy(n, k)
+# @param ref - [opt] the reference point numpy(k)
+# @param num_samples - [opt] the number of samples of the monte carlo estimate.
+# @param seed - [opt] the seed (or Generator) of the monte carlo estimate.
+#
+# @return - numpy array of hypervolume contributions numpy(n)
+def hypervolume_contributions(values, ref=None, num_samples=10000, seed=None):
+    values = np.asarray(values, dtype=float)
+    n = values.shape[0]
+    contrib = np.zeros(n)
+    if n == 0:
+        return contrib
+    boundary = ref is None
+    ref = values.min(axis=0) if boundary else np.asarray(ref, dtype=float)
+    clipped = np.maximum(values, ref)
+    # dimensions without any volume above the reference are dropped.
+    active = np.flatnonzero(clipped.max(axis=0) > ref)
+    clipped = clipped[:, active]
+    ref = ref[active]
+    k = len(active)
+
+    if k == 1:
+        order = np.argsort(-clipped[:, 0], kind='stable')
+        second = clipped[order[1], 0] if n > 1 else ref[0]
+        contrib[order[0]] = clipped[order[0], 0] - second
+    elif k == 2:
+        # increasing x, so decreasing y.
+        order = np.lexsort((-clipped[:, 1], clipped[:, 0]))
+        x = clipped[order, 0]
+        y = clipped[order, 1]
+        x_prev = np.concatenate(([ref[0]], x[:-1]))
+        y_next = np.concatenate((y[1:], [ref[1]]))
+        contrib[order] = np.maximum(x - x_prev, 0) * np.maximum(y - y_next, 0)
+    elif k > 2:
+        rng = np.random.default_rng(seed)
+        upper = clipped.max(axis=0)
+        counts = np.zeros(n)
+        chunk = max(1, 2**22 // (n * k))
+        for start in range(0, num_samples, chunk):
+            samples = ref + rng.random((min(chunk, num_samples - start), k)) * (upper - ref)
+            dominates = np.all(clipped[np.newaxis, :, :] >= samples[:, np.newaxis, :], axis=2)
+            only = np.count_nonzero(dominates, axis=1) == 1
+            counts += np.bincount(np.argmax(dominates[only], axis=1), minlength=n)
+        contrib = np.prod(upper - ref) * counts / num_samples
+
+    if boundary and k > 0:
+        contrib[np.any(clipped == clipped.max(axis=0), axis=1)] = np.inf
+    return contrib
@@ -0,0 +1,296 @@
+# Copyright 2020 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+#
+## @package RolloutLog.py
+# Written Ian Rankin - March 2021
+#
+# A memory-bounded log of the rollouts of MCTS. Instead of keeping every rollout
+# sequence as a list of python objects, the sequences are stored as compact
+# integer ids (flattened with offsets), with the rewards and actors as numpy
+# arrays. The log is written in chunks, either kept in memory or appended to
+# files and read back with np.memmap, or can keep a fixed size reservoir sample
+# of the rollouts.
+
+import os
+import numpy as np
+
+
+## nodeId
+# id function for rollouts of graph nodes (or edges, using the child node).
+# @param x - the Node or Edge in the rollout sequence.
+#
+# @return - the id of the node.
+def nodeId(x):
+    if hasattr(x, 'c'):
+        return x.c.id
+    return x.id
+
+## rolloutStorage
+# Gets the storage for all of the rollouts given the get_all_seq parameter of
+# MCTS.
+# @param get_all_seq - False, True, or a RolloutLog
+#
+# @return - None, a list, or the RolloutLog (both use append((seq, reward, actor)))
+def rolloutStorage(get_all_seq):
+    if isinstance(get_all_seq, RolloutLog):
+        return get_all_seq
+    elif get_all_seq:
+        return []
+    return None
+
+
+## RolloutLog
+# A log of rollouts of (sequence, reward, actor), storing the sequences as ids.
+# Can be passed as get_all_seq to MCTS in place of True, where it is returned
+# in the output data as 'rollouts' (along with 'all_rewards' and 'all_actors').
+class RolloutLog(object):
+    ## constructor
+    # @param max_size - [opt] if given, keep a uniform reservoir sample of at most
+    #               max_size rollouts, rather than every rollout.
+    # @param path - [opt] if given, the chunks are appended to files starting with
+    #               path (path_ids.bin, path_lens.bin, path_rewards.bin, path_actors.bin)
+    #               and read back with np.memmap.
+    # @param chunk_size - [opt] the number of rollouts per chunk.
+    # @param idFunc - [opt] function (element) -> int id of the sequence elements.
+    #               If None, ids are given in order of first appearence and the
+    #               elements are kept to decode the ids (see decode). With
+    #               max_size the kept elements are limited to those of the
+    #               sampled rollouts (ids of evicted elements are reused), otherwise
+    #               every distinct element is kept in memory (even with a path),
+    #               so give an idFunc to bound the memory of long searches.
+    # @param seed - [opt] the seed (or Generator) of the reservoir sampling.
+    def __init__(self, max_size=None, path=None, chunk_size=4096, idFunc=None, seed=None):
+        if max_size is not None and path is not None:
+            raise ValueError('RolloutLog can not have both a max_size and a path')
+        self.max_size = max_size
+        self.path = path
+        self.chunk_size = chunk_size
+        self.idFunc = idFunc
+        self.vocab = {}
+        self.items = []
+        # reference counts of the ids (with max_size and no idFunc) and free ids
+        self._refs = []
+        self._free = []
+        self.num_seen = 0
+        self.reward_shape = None
+
+        # the current chunk
+        self._ids = []
+        self._lens = []
+        self._rewards = []
+        self._actors = []
+        # the finished chunks (ids, lens, rewards, actors)
+        self._chunks = []
+        self._num_flushed = 0
+        self._num_ids_flushed = 0
+
+        if max_size is not None:
+            self.rng = np.random.default_rng(seed)
+            self._res_seqs = [None] * max_size
+            self._res_rewards = None
+            self._res_actors = np.zeros(max_size, dtype=np.int64)
+
+        if path is not None:
+            for name in ['ids', 'lens', 'rewards', 'actors']:
+                open(self._file(name), 'wb').close()
+
+    ## @var num_seen
+    # the number of rollouts added to the log (can be more than len with max_size)
+    ## @var items
+    # the sequence elements of each id, if no idFunc is given (None for
+    # evicted ids).
+
+    def _file(self, name):
+        return self.path + '_' + name + '.bin'
+
+    ## encode
+    # @param sequence - the rollout sequence
+    #
+    # @return - the ids of the sequence elements as a list
+    def encode(self, sequence):
+        if self.idFunc is not None:
+            return [self.idFunc(x) for x in sequence]
+        count_refs = self.max_size is not None
+        ids = []
+        for x in sequence:
+            id = self.vocab.get(x)
+            if id is None:
+                if len(self._free) > 0:
+                    id = self._free.pop()
+                    self.items[id] = x
+                else:
+                    id = len(self.items)
+                    self.items.append(x)
+                    self._refs.append(0)
+                self.vocab[x] = id
+            if count_refs:
+                self._refs[id] += 1
+            ids.append(id)
+        return ids
+
+    ## _release
+    # removes the references of a sequence evicted from the reservoir, evicting
+    # the elements no longer in any sampled sequence.
+    # @param ids - the ids of the evicted sequence
+    def _release(self, ids):
+        for id in ids:
+            self._refs[id] -= 1
+            if self._refs[id] == 0:
+                del self.vocab[self.items[id]]
+                self.items[id] = None
+                self._free.append(id)
+
+    ## decode
+    # @param ids - the ids of a sequence (if no idFunc is given)
+    #
+    # @return - list of the sequence elements
+    def decode(self, ids):
+        return [self.items[id] for id in ids]
+
+    ## append
+    # adds a rollout to the log (same as a list of rollouts).
+    # @param rollout - tuple of (sequence, reward, actor)
+    def append(self, rollout):
+        sequence, reward, actor = rollout
+        self.add(sequence, reward, actor)
+
+    ## add
+    # adds a rollout to the log.
+    # @param sequence - the rollout sequence.
+    # @param reward - the reward of the rollout (float or numpy array)
+    # @param actor - the actor number of the reward.
+    def add(self, sequence, reward, actor=0):
+        reward = np.asarray(reward, dtype=float)
+        if self.reward_shape is None:
+            self.reward_shape = reward.shape
+        self.num_seen += 1
+
+        if self.max_size is not None:
+            # reservoir sampling (Vitter's algorithm R)
+            if self.num_seen <= self.max_size:
+                idx = self.num_seen - 1
+            else:
+                idx = int(self.rng.integers(self.num_seen))
+                if idx >= self.max_size:
+                    return
+            if self._res_rewards is None:
+                self._res_rewards = np.zeros((self.max_size,) + reward.shape)
+            old = self._res_seqs[idx]
+            self._res_seqs[idx] = np.array(self.encode(sequence), dtype=np.int64)
+            if old is not None and self.idFunc is None:
+                self._release(old)
+            self._res_rewards[idx] = reward
+            self._res_actors[idx] = actor
+            return
+
+        ids = self.encode(sequence)
+        self._ids += ids
+        self._lens.append(len(ids))
+        self._rewards.append(reward)
+        self._actors.append(actor)
+        if len(self._lens) >= self.chunk_size:
+            self.flush()
+
+    ## flush
+    # finishes the current chunk, writing it to the files if a path is given.
+    def flush(self):
+        if self.max_size is not None or len(self._lens) == 0:
+            return
+        chunk = (np.array(self._ids, dtype=np.int64), \
+                np.array(self._lens, dtype=np.int64), \
+                np.array(self._rewards, dtype=float).reshape((-1,) + self.reward_shape), \
+                np.array(self._actors, dtype=np.int64))
+        if self.path is not None:
+            for name, arr in zip(['ids', 'lens', 'rewards', 'actors'], chunk):
+                with open(self._file(name), 'ab') as f:
+                    f.write(arr.tobytes())
+        else:
+            self._chunks.append(chunk)
+        self._num_flushed += len(self._lens)
+        self._num_ids_flushed += len(self._ids)
+        self._ids, self._lens, self._rewards, self._actors = [], [], [], []
+
+    def __len__(self):
+        if self.max_size is not None:
+            return min(self.num_seen, self.max_size)
+        return self.num_seen
+
+    def _read(self, i, name, dtype, shape):
+        if self.path is not None:
+            if shape[0] == 0:
+                return np.zeros(shape, dtype=dtype)
+            return np.memmap(self._file(name), dtype=dtype, mode='r', shape=shape)
+        if len(self._chunks) == 1:
+            return self._chunks[0][i]
+        return np.concatenate([c[i] for c in self._chunks]) if len(self._chunks) > 0 \
+                else np.zeros(shape, dtype=dtype)
+
+    ## ids
+    # @return - the flattened ids of all of the sequences (see offsets)
+    def ids(self):
+        if self.max_size is not None:
+            seqs = self._res_seqs[:len(self)]
+            return np.concatenate(seqs) if len(seqs) > 0 else np.zeros(0, dtype=np.int64)
+        self.flush()
+        return self._read(0, 'ids', np.int64, (self._num_ids_flushed,))
+
+    ## offsets
+    # @return - the offsets of the sequences into ids numpy(n+1), so sequence i
+    #           is ids[offsets[i]:offsets[i+1]]
+    def offsets(self):
+        if self.max_size is not None:
+            lens = np.array([len(s) for s in self._res_seqs[:len(self)]], dtype=np.int64)
+        else:
+            self.flush()
+            lens = self._read(1, 'lens', np.int64, (self._num_flushed,))
+        return np.concatenate(([0], np.cumsum(lens)))
+
+    ## rewards
+    # @return - numpy array of the rewards of the rollouts, (n,) + reward shape
+    def rewards(self):
+        shape = self.reward_shape if self.reward_shape is not None else ()
+        if self.max_size is not None:
+            if self._res_rewards is None:
+                return np.zeros((0,) + shape)
+            return self._res_rewards[:len(self)]
+        self.flush()
+        return self._read(2, 'rewards', float, (self._num_flushed,) + shape)
+
+    ## actors
+    # @return - numpy array of the actor numbers of the rollouts (n)
+    def actors(self):
+        if self.max_size is not None:
+            return self._res_actors[:len(self)]
+        self.flush()
+        return self._read(3, 'actors', np.int64, (self._num_flushed,))
+
+    ## sequences
+    # generator of the id sequences of the rollouts.
+    def sequences(self):
+        ids = self.ids()
+        offsets = self.offsets()
+        for i in range(len(offsets) - 1):
+            yield ids[offsets[i]:offsets[i+1]]
+
+    ## remove
+    # removes the files of the log (if a path is given)
+    def remove(self):
+        if self.path is not None:
+            for name in ['ids', 'lens', 'rewards', 'actors']:
+                if os.path.exists(self._file(name)):
+                    os.remove(self._file(name))
@@ -0,0 +1,149 @@
+# Copyright 2020 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+#
+## @package TranspositionTree.py
+# Written Ian Rankin February 2020
+#
+# An MCTS search tree with a transposition table. Tree nodes with the same key
+# (given by a user supplied key function) share their statistics, so states
+# reached through different orderings (for example the same graph node with the
+# same remaining budget) do not split their statistics across the tree.
+# The tree structure (and so the paths) is unchanged, only the statistics are shared.
+
+import numpy as np
+from rdml_graph.mcts.MCTSTree import MCTSTree
+
+
+## TranspositionTree
+# MCTSTree where num_updates, sum_reward, and best_reward are shared between all
+# nodes with the same key.
+class TranspositionTree(MCTSTree):
+    # the statistics can change through other nodes with the same key.
+    cache_child_stats = False
+
+    ## Constructor
+    # @param state - the state of the MCTS tree
+    # @param rCost - the real cost to the state
+    # @param parent - the parent TranspositionTree
+    # @param key - the key function (tree node) -> hashable key
+    # @param table - [opt] the transposition table dictionary (shared by the tree)
+    # @param actor_number - the actor number of the MCTSTree
+    # @param parent_e_id - the id of the edge that this tree is a child
+    def __init__(self, state, rCost, parent, key, table=None, actor_number=0, parent_e_id=None):
+        # statistics, [num_updates, sum_reward, best_reward]
+        self._stats = [0, 0.0, -np.inf]
+        super(TranspositionTree, self).__init__(state, rCost, parent, \
+                    actor_number=actor_number, parent_e_id=parent_e_id)
+        self.key = key
+        self.table = {} if table is None else table
+        self._stats = self.table.setdefault(key(self), self._stats)
+
+    @property
+    def num_updates(self):
+        return self._stats[0]
+
+    @num_updates.setter
+    def num_updates(self, value):
+        self._stats[0] = value
+
+    @property
+    def sum_reward(self):
+        return self._stats[1]
+
+    @sum_reward.setter
+    def sum_reward(self, value):
+        self._stats[1] = value
+
+    @property
+    def best_reward(self):
+        return self._stats[2]
+
+    @best_reward.setter
+    def best_reward(self, value):
+        self._stats[2] = value
+
+    def _child(self, state, cost, e_id):
+        return TranspositionTree(state, cost, self, self.key, self.table, parent_e_id=e_id)
+
+    ## pathNodes
+    # The nodes from this node to the root, skipping nodes sharing the statistics
+    # of a node already given (the same key appearing twice on the path), so the
+    # statistics of each key are only updated once per iteration.
+    def pathNodes(self):
+        visited = set()
+        node = self
+        while node is not None:
+            # the table holds a single stats list per key
+            if id(node._stats) not in visited:
+                visited.add(id(node._stats))
+                yield node
+            node = node.parent
+
+    ## backpropReward
+    # Same as MCTSTree.backpropReward, updating each key at most once.
+    def backpropReward(self, reward, actor_number):
+        is_array = isinstance(reward, np.ndarray)
+        for node in self.pathNodes():
+            if actor_number == node.actor_number:
+                node.sum_reward += reward
+                actor_reward = reward
+            else:
+                node.sum_reward -= reward
+                actor_reward = -reward
+            if not is_array and actor_reward > node.best_reward:
+                node.best_reward = actor_reward
+            node.num_updates += 1
+
+    def addVirtualLoss(self, loss):
+        for node in self.pathNodes():
+            node.sum_reward = node.sum_reward - loss
+            node.num_updates += 1
+
+    def removeVirtualLoss(self, loss):
+        for node in self.pathNodes():
+            node.sum_reward = node.sum_reward + loss
+            node.num_updates -= 1
+
+
+############## key functions
+
+## nodeBudgetKey
+# Key function generator of the graph node id and the discretized cost so far.
+# @param resolution - [opt] the resolution of the discretized cost.
+#
+# @return - key function (tree node) -> (id, discretized cost)
+def nodeBudgetKey(resolution=1.0):
+    def key(tree):
+        return (tree.state.id, int(np.floor(tree.rCost / resolution)))
+    return key
+
+## nodeVisitedKey
+# Key function generator of the graph node id, the set of visited node ids,
+# and the discretized cost so far. (useful for information gathering rewards)
+# @param resolution - [opt] the resolution of the discretized cost.
+#
+# @return - key function (tree node) -> (id, visited ids, discretized cost)
+def nodeVisitedKey(resolution=1.0):
+    def key(tree):
+        visited = set()
+        cur = tree
+        while cur is not None:
+            visited.add(cur.state.id)
+            cur = cur.parent
+        return (tree.state.id, frozenset(visited), int(np.floor(tree.rCost / resolution)))
+    return key
@@ -1,4 +1,16 @@
 from .MCTSTree import MCTSTree
-from .MCTSHelper import UCBSelection, randomRollout, bestAvgReward, bestAvgNext, mostSimulations, mostSimulationsSingle, highestReward, paretoUCBSelection
-from .MCTS import MCTS
-from .ParetoFront import ParetoFront, get_pareto
+from .TranspositionTree import TranspositionTree, nodeBudgetKey, nodeVisitedKey
+from .MultiActorTree import MultiActorTree, actorReward, actorUCBSelection
+from .MCTSHelper import UCBSelection, randomRollout, bestAvgReward, bestAvgNext, mostSimulations, mostSimulationsSingle, highestReward, paretoUCBSelection, \
+        MCTSProgress, hasKeepEdges, \
+        cachedSuccessors, cachedRollout, randomPolicy, greedyPolicy, epsilonGreedyPolicy, softmaxCostPolicy
+from .MCTS import MCTS, MCTSBatch
+from .MCTSPlanner import MCTSPlanner
+from .ParallelMCTS import MCTSRootParallel, MCTSLeafParallel, MCTSTreeParallel
+from .ParetoFront import ParetoFront, get_pareto, get_pareto_pairwise, crowding_distance, nondominated_sort, hypervolume, \
+                hypervolume_contributions
+from .MCTSRandom import makeRNG, spawnSeeds, randomIndex, randomFloat
+from .ParetoArchive import ParetoArchive
+from .RolloutLog import RolloutLog, nodeId
+from .MCTSArrayTree import MCTSArrayTree
+from .ArrayMCTS import MCTSArray, arrayUCBSelection, arrayParetoUCBSelection, arrayRandomRollout, arrayBestAvgReward, arrayMostSimulations
@@ -0,0 +1,80 @@
+# test_cont_homology_sign.py
+#
+# A test suite for the continuous (winding angle) homology signature.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+
+def test_subtended_angles():
+    features = np.array([[0.0, 0.0], [10.0, 0.0]])
+    path = np.array([[-1.0, 1.0], [1.0, 1.0], [1.0, -1.0]])
+
+    angles = gr.computeSubtendedAngles(path, features)
+    assert angles.shape == (2, 2)
+    # moving left to right above the feature is clockwise (positive)
+    assert angles[0, 0] == pytest.approx(np.pi / 2)
+    assert angles[1, 0] == pytest.approx(np.pi / 2)
+
+    single = gr.computeSubtendedAngleLineSegment(path[0], path[1], features)
+    assert np.allclose(single, angles[0])
+
+
+def test_cont_homology_path_classes():
+    features = np.array([[0.0, 0.0]])
+    above = np.array([[-2.0, 0.0], [0.0, 2.0], [2.0, 0.0]])
+    below = np.array([[-2.0, 0.0], [0.0, -2.0], [2.0, 0.0]])
+    above2 = np.array([[-2.0, 0.0], [-1.0, 3.0], [1.0, 3.0], [2.0, 0.0]])
+
+    a = gr.ContHomologySignature(1)
+    a.compute_path(above, features)
+    b = gr.ContHomologySignature(1)
+    b.compute_path(below, features)
+    c = gr.ContHomologySignature(1)
+    c.compute_path(above2, features)
+
+    assert a[0] == pytest.approx(np.pi)
+    assert b[0] == pytest.approx(-np.pi)
+    assert a != b
+    assert a == c
+    assert hash(a) == hash(c)
+    assert (a - b)[0] == pytest.approx(2 * np.pi)
+
+
+def test_cont_homology_edges():
+    features = np.array([[0.0, 0.0]])
+    n = gr.GeometricNode(0, np.array([-1.0, 1.0]))
+    n1 = gr.GeometricNode(1, np.array([1.0, 1.0]))
+    n2 = gr.GeometricNode(2, np.array([1.0, -1.0]))
+    n3 = gr.GeometricNode(3, np.array([-1.0, -1.0]))
+
+    sign = gr.ContHomologySignature(1)
+    edges = [gr.HEdge(n, n1, sign, features=features), \
+             gr.HEdge(n1, n2, sign, features=features), \
+             gr.HEdge(n2, n3, sign, features=features), \
+             gr.HEdge(n3, n, sign, features=features)]
+
+    h = gr.ContHomologySignature(1)
+    for e in edges:
+        assert h.edge_cross(e)
+    assert h[0] == pytest.approx(2 * np.pi)
+
+    # going around a second time is a loop
+    assert not h.edge_cross(edges[0])
+
+
+def test_cont_homology_hash_matches_eq():
+    tol = 1e-6
+    a = gr.ContHomologySignature(2, tol=tol)
+    b = gr.ContHomologySignature(2, tol=tol)
+    c = gr.ContHomologySignature(2, tol=tol)
+    a.sign[:] = [np.pi, 0.45*tol]
+    b.sign[:] = [np.pi, 0.55*tol] # within tol, across a rounding boundary
+    c.sign[:] = [np.pi, 0.3*tol]
+
+    for x, y in [(a, b), (a, c), (b, c)]:
+        assert (x == y) == (hash(x) == hash(y))
+    assert a == c
+    assert len({a, b, c}) == 2
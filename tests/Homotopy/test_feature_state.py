@@ -0,0 +1,91 @@
+# test_feature_state.py
+#
+# A test suite for the HomotopyFeatureState used for searching for paths that
+# visit named features.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+
+def feature_graph():
+    features = np.array([[0.0, 0.0]])
+    sign = gr.HomologySignature(features.shape[0])
+
+    start = gr.GeometricNode(0, np.array([-3.0, -3.0]))
+    end = gr.GeometricNode(1, np.array([3.0, -3.0]))
+    feat = gr.FeatureNode(2, 'Shaw Island', pt=np.array([-3.0, -6.0]))
+    other = gr.GeometricNode(3, np.array([0.0, -6.0]))
+
+    G = [start, end, feat, other]
+
+    def connect(a, b):
+        a.addEdge(gr.HEdge(a, b, sign, features=features, \
+                            cost=np.linalg.norm(a.pt - b.pt)))
+        b.addEdge(gr.HEdge(b, a, sign, features=features, \
+                            cost=np.linalg.norm(a.pt - b.pt)))
+
+    connect(start, end)
+    connect(start, feat)
+    connect(feat, other)
+    connect(other, end)
+
+    return G, features
+
+
+def test_feature_state_names_mask():
+    G, features = feature_graph()
+    needed = frozenset(['shaw island', 'uf-1'])
+    start = gr.HomotopyFeatureState(G[0], gr.HomologySignature(1), root=G[0], \
+                                    neededNames=needed)
+
+    assert start.names == frozenset()
+    assert start.has_names(frozenset())
+    assert not start.has_names(frozenset(['shaw island']))
+
+    succ = [s for s, c in start.successor() if s.node == G[2]]
+    assert len(succ) == 1
+    assert succ[0].names == frozenset(['shaw island'])
+    assert succ[0].has_names(frozenset(['shaw island']))
+    assert not succ[0].has_names(frozenset(['shaw island', 'uf-1']))
+    # names that are not tracked can never be satisfied.
+    assert not succ[0].has_names(frozenset(['unknown']))
+
+    same = gr.HomotopyFeatureState(G[2], gr.HomologySignature(1), root=G[0], \
+                                    neededNames=needed)
+    assert same != succ[0]
+    assert hash(same) != hash(succ[0])
+
+
+def test_feature_state_astar():
+    G, features = feature_graph()
+    names = frozenset(['shaw island'])
+
+    for prune in [True, False]:
+        start = gr.HomotopyFeatureState(G[0], gr.HomologySignature(1), root=G[0], \
+                                        neededNames=names, prune_dominated=prune)
+        goalH = gr.HomologySignatureGoal(1)
+
+        path, cost = gr.AStar(start, g=gr.partial_h_feature_goal, \
+                                goal=(G[1], goalH, names, set()))
+
+        assert [s.node.id for s in path] == [0, 2, 3, 1]
+        assert path[-1].has_names(names)
+        assert cost == pytest.approx(3 + 3 + 3*np.sqrt(2))
+
+
+def test_feature_state_dominance():
+    G, features = feature_graph()
+    start = gr.HomotopyFeatureState(G[0], gr.HomologySignature(1), root=G[0], \
+                                    neededNames=frozenset(['shaw island']))
+
+    key = (G[1], gr.HomologySignature(1))
+    assert not start.is_dominated(key, 0b1, 5.0)
+    # fewer names and more cost is dominated
+    assert start.is_dominated(key, 0b0, 6.0)
+    # fewer names but cheaper is not dominated
+    assert not start.is_dominated(key, 0b0, 4.0)
+    # more names and cheaper removes both previous entries
+    assert not start.is_dominated(key, 0b1, 3.0)
+    assert start.name_idx['dominance'][key] == [(0b1, 3.0)]
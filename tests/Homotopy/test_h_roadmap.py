@@ -0,0 +1,59 @@
+# test_h_roadmap.py
+#
+# A test suite for saving and loading homotopy augmented roadmaps.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+
+def h_euclidean_tuple(n, data, goal):
+    return np.linalg.norm(n.node.pt - goal[0].pt)
+
+
+@pytest.mark.parametrize('connection', [gr.HEdgeConn, gr.HomotopyEdgeConn])
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_load_h_roadmap(tmp_path, connection, mmap):
+    np.random.seed(3)
+    map = {'width': 20, 'height': 20, 'hazards': np.array([[5.0, 5.0], [-3.0, 2.0]])}
+    feat = gr.FeatureNode(0, 'Shaw Island', pt=np.array([4.0, 8.0]), keywords={'shaw'})
+    G = gr.PRM(map, 60, 6.0, connection=connection, initialNodes=[feat])
+
+    gr.save_h_roadmap(G, str(tmp_path), map=map)
+    loaded, loaded_map = gr.load_h_roadmap(str(tmp_path), mmap=mmap)
+
+    assert len(loaded) == len(G)
+    assert np.array_equal(loaded_map['hazards'], map['hazards'])
+    assert isinstance(loaded[0], gr.FeatureNode)
+    assert loaded[0].name == 'Shaw Island'
+    assert loaded[0].keywords == {'shaw'}
+    for n, m in zip(G, loaded):
+        assert n.id == m.id
+        assert np.array_equal(n.pt, m.pt)
+        assert len(n.e) == len(m.e)
+        for e1, e2 in zip(n.e, m.e):
+            assert e1.c.id == e2.c.id
+            assert e1.getCost() == e2.getCost()
+            assert e1.HSign == e2.HSign
+
+    # search both graphs with the same homology goal
+    num_features = map['hazards'].shape[0]
+    if connection is gr.HEdgeConn:
+        sign = gr.HomologySignature(num_features)
+        goalH = gr.HomologySignatureGoal(num_features)
+        goalH.addConstraint(0, 1)
+    else:
+        sign = gr.HomotopySignature()
+        goalH = gr.HomotopySignatureGoal(gr.HomotopySignature([]))
+
+    for graph in [G, loaded]:
+        start = gr.HNode(graph[1], sign.copy(), root=graph[1])
+        path, cost = gr.AStar(start, g=gr.partial_h_goal_check, h=h_euclidean_tuple, \
+                                goal=(graph[5], goalH))
+        assert len(path) > 0
+        if graph is G:
+            expected = (cost, [s.node.id for s in path])
+        else:
+            assert cost == pytest.approx(expected[0])
+            assert [s.node.id for s in path] == expected[1]
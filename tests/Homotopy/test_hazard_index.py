@@ -0,0 +1,74 @@
+# test_hazard_index.py
+#
+# A test suite for the spatial index of hazards used for ray intersection tests.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+
+@pytest.mark.parametrize('angle', [np.pi/2, 0.0, 0.7, -2.3])
+def test_hazard_index_matches_ray_intersection(angle):
+    rng = np.random.RandomState(4)
+    features = rng.uniform(-10, 10, size=(50, 2))
+    index = gr.HazardIndex(features, ray_angle=angle)
+
+    for _ in range(100):
+        pt1, pt2 = rng.uniform(-12, 12, size=(2, 2))
+
+        expected = np.array([gr.rayIntersection(pt1, pt2, f, angle) for f in features])
+        assert np.array_equal(gr.rayIntersections(pt1, pt2, features, angle), expected)
+
+        idx, signs = index.crossings(pt1, pt2)
+        assert np.array_equal(idx, np.nonzero(expected)[0])
+        assert np.array_equal(signs, expected[idx])
+
+        start, end = index.candidates(pt1, pt2)
+        assert end - start <= len(features)
+
+
+def test_hazard_index_signatures():
+    rng = np.random.RandomState(5)
+    features = rng.uniform(-10, 10, size=(30, 2))
+    index = gr.HazardIndex(features)
+
+    for _ in range(50):
+        pt1, pt2 = rng.uniform(-12, 12, size=(2, 2))
+
+        h1 = gr.HomologySignature(len(features))
+        h1.compute_line_segment(pt1, pt2, features)
+        h2 = gr.HomologySignature(len(features))
+        h2.compute_line_segment(pt1, pt2, index)
+        assert h1 == h2
+
+        h1 = gr.HomotopySignature()
+        h1.compute_line_segment(pt1, pt2, features)
+        h2 = gr.HomotopySignature()
+        h2.compute_line_segment(pt1, pt2, index)
+        assert h1 == h2
+
+
+@pytest.mark.parametrize('use_index', [True, False])
+def test_hazard_index_prm(use_index):
+    np.random.seed(2)
+    map = {'width': 20, 'height': 20, 'hazards': np.array([[5.0, 5.0], [7.5, 3.0]])}
+    if use_index:
+        map['hazard_index'] = gr.get_hazard_index(map)
+    G = gr.PRM(map, 30, 6.0, connection=gr.HEdgeConn)
+
+    assert ('hazard_index' in map) == use_index
+    for n in G:
+        for e in n.e:
+            h = gr.HomologySignature(2)
+            h.compute_line_segment(e.p.pt, e.c.pt, map['hazards'])
+            assert h == e.HSign
+
+
+def test_hazard_index_prm_mismatch():
+    map = {'width': 20, 'height': 20, 'hazards': np.array([[5.0, 5.0], [7.5, 3.0]])}
+    map['hazard_index'] = gr.get_hazard_index(map)
+    map['ray_angle'] = 0.0
+    with pytest.raises(ValueError):
+        gr.HEdgeConn(gr.GeometricNode(0, np.array([1.0, 1.0])), \
+                    gr.GeometricNode(1, np.array([2.0, 2.0])), map)
@@ -0,0 +1,79 @@
+# test_path_signatures.py
+#
+# A test suite for batch computation of path signatures.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+
+def path_homology(path, features):
+    sign = np.zeros(len(features), dtype=int)
+    for i in range(1, len(path)):
+        h = gr.HomologySignature(len(features))
+        h.compute_line_segment(path[i-1], path[i], features)
+        sign += h.sign
+    return sign
+
+
+def path_homotopy(path, features):
+    sign = gr.HomotopySignature()
+    for i in range(1, len(path)):
+        h = gr.HomotopySignature()
+        h.compute_line_segment(path[i-1], path[i], features)
+        sign += h
+    return sign.sign
+
+
+def test_batch_signatures_ragged():
+    rng = np.random.RandomState(7)
+    features = rng.uniform(-10, 10, size=(15, 2))
+    paths = [rng.uniform(-12, 12, size=(rng.randint(1, 9), 2)) for _ in range(40)]
+
+    homology = gr.batchHomologySignatures(paths, features)
+    homotopy = gr.batchHomotopySignatures(paths, features)
+
+    assert homology.shape == (40, 15)
+    for i, p in enumerate(paths):
+        assert np.array_equal(homology[i], path_homology(p, features))
+        assert homotopy[i] == path_homotopy(p, features)
+
+
+def test_batch_signatures_padded():
+    rng = np.random.RandomState(8)
+    features = rng.uniform(-10, 10, size=(6, 2))
+    paths = rng.uniform(-12, 12, size=(10, 5, 2))
+    lengths = rng.randint(0, 6, size=10)
+
+    nan_paths = paths.copy()
+    for i, l in enumerate(lengths):
+        nan_paths[i, l:] = np.nan
+
+    index = gr.HazardIndex(features)
+    a = gr.batchHomologySignatures(paths, features, lengths=lengths)
+    b = gr.batchHomologySignatures(nan_paths, index)
+    assert np.array_equal(a, b)
+
+    c = gr.batchHomotopySignatures(nan_paths, features)
+    for i, l in enumerate(lengths):
+        assert np.array_equal(a[i], path_homology(paths[i, :l], features))
+        assert c[i] == path_homotopy(paths[i, :l], features)
+
+
+def test_group_by_signature():
+    features = np.array([[0.0, 0.0]])
+    above = np.array([[-2.0, 0.0], [0.0, 2.0], [2.0, 0.0]])
+    below = np.array([[-2.0, 0.0], [0.0, -2.0], [2.0, 0.0]])
+    hpath = gr.HPath(above, gr.HomologySignature(1))
+
+    paths = [above, below, hpath, below]
+    labels, unique = gr.groupBySignature(gr.batchHomologySignatures(paths, features))
+    assert len(unique) == 2
+    assert labels[0] == labels[2]
+    assert labels[1] == labels[3]
+    assert labels[0] != labels[1]
+
+    labels, unique = gr.groupBySignature(gr.batchHomotopySignatures(paths, features))
+    assert list(labels) == [0, 1, 0, 1]
+    assert unique == [[1], []]
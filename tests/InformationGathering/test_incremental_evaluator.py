@@ -0,0 +1,56 @@
+# test_incremental_evaluator.py
+#
+# Tests of the prefix cached IncrementalMaskedEvaluator.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+
+def evaluator():
+    rng = np.random.default_rng(7)
+    field = rng.random((40, 30, 2))
+    return gr.MaskedEvaluator(field, np.arange(40)*0.5, np.arange(30)*0.5, 1.2)
+
+
+def test_incremental_push_pop():
+    eval = evaluator()
+    rng = np.random.default_rng(1)
+    path = rng.uniform(0, 15, (8, 2))
+    inc = gr.IncrementalMaskedEvaluator(eval)
+
+    for i, pt in enumerate(path):
+        gain = inc.gain(pt)
+        assert inc.push(pt) == pytest.approx(gain)
+        if i > 0:
+            assert inc.score() == pytest.approx(eval.getScore(path[:i+1]))
+    assert len(inc) == 8
+    assert np.array_equal(inc.getMask(), eval.getScore(path, return_mask=True)[1])
+
+    # undo back to a prefix
+    for i in range(3):
+        assert np.array_equal(inc.pop(), path[-1-i])
+    assert inc.score() == pytest.approx(eval.getScore(path[:5]))
+    assert np.array_equal(inc.getMask(), eval.getScore(path[:5], return_mask=True)[1])
+
+
+def test_incremental_set_point():
+    eval = evaluator()
+    rng = np.random.default_rng(2)
+    path = rng.uniform(0, 15, (6, 2))
+    inc = gr.IncrementalMaskedEvaluator(eval, path)
+    start = inc.score()
+
+    for idx in [0, 2, -1]:
+        moved = path.copy()
+        moved[idx] = rng.uniform(0, 15, 2)
+        old, change = inc.setPoint(idx, moved[idx])
+        assert np.array_equal(old, path[idx])
+        assert inc.score() == pytest.approx(eval.getScore(moved))
+        assert change == pytest.approx(eval.getScore(moved) - start)
+
+        # undo
+        inc.setPoint(idx, old)
+        assert inc.score() == pytest.approx(start)
+    assert np.array_equal(inc.getMask(), eval.getScore(path, return_mask=True)[1])
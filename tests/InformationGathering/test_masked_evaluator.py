@@ -0,0 +1,92 @@
+# test_masked_evaluator.py
+#
+# Tests of the swath rasterization of the MaskedEvaluator.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+
+def masked_evaluator(radius=1.0, channels=None):
+    x_ticks = np.arange(10, dtype=float)
+    y_ticks = np.arange(8, dtype=float)
+    field = np.ones((10, 8, 2))
+    field[:, :, 1] = np.arange(8)
+    return gr.MaskedEvaluator(field, x_ticks, y_ticks, radius, channels=channels)
+
+
+def test_masked_horizontal_segment():
+    eval = masked_evaluator(radius=1.0)
+    scores, mask = eval.getScore(np.array([[2.0, 3.0], [6.0, 3.0]]), return_mask=True)
+
+    # cells are indexed by the ceil of the swath bounds
+    expected = np.zeros((10, 8), dtype=np.int8)
+    expected[3:7, 2:4] = 1
+    assert np.array_equal(mask, expected)
+    assert scores == pytest.approx([8, 4*(2+3)])
+
+
+def test_masked_overlap_counted_once():
+    eval = masked_evaluator(radius=1.5)
+    path = np.array([[1.0, 1.0], [7.0, 5.0], [1.0, 1.0], [7.0, 5.0]])
+    scores, mask = eval.getScore(path, return_mask=True)
+    single, single_mask = eval.getScore(path[:2], return_mask=True)
+
+    assert np.array_equal(mask, single_mask)
+    assert scores == pytest.approx(single)
+    assert scores[0] == np.sum(mask)
+
+
+def test_masked_segment_along_x():
+    eval = masked_evaluator(radius=1.0, channels=[0])
+    mask = np.zeros((10, 8), dtype=np.int8)
+
+    first = eval.getSegmentAlongX(np.array([2.0, 3.0]), np.array([6.0, 3.0]), mask)
+    again = eval.getSegmentAlongX(np.array([6.0, 3.0]), np.array([2.0, 3.0]), mask)
+    assert first == pytest.approx([8])
+    assert again == pytest.approx([0])
+    assert np.sum(mask) == 8
+
+
+def test_masked_degenerate_segments():
+    eval = masked_evaluator(radius=1.0, channels=[0])
+    # a zero length segment covers a disk
+    disk = eval.getScore(np.array([[4.0, 4.0], [4.0, 4.0]]), return_mask=True)[1]
+    assert np.array_equal(np.argwhere(disk), [[4, 3], [4, 4]])
+    # a vertical segment
+    scores, vert = eval.getScore(np.array([[4.0, 1.0], [4.0, 5.0]]), return_mask=True)
+    assert np.array_equal(np.nonzero(vert.any(axis=1))[0], [3, 4])
+    assert scores == pytest.approx([10])
+    # a path entirely outside of the field
+    assert eval.getScore(np.array([[-20.0, -20.0], [-30.0, -20.0]])) == pytest.approx([0])
+
+
+def test_masked_get_scores():
+    rng = np.random.default_rng(4)
+    field = rng.random((30, 25, 2))
+    eval = gr.MaskedEvaluator(field, np.arange(30)*0.5, np.arange(25)*0.5, 0.8, budget=12)
+    paths = [rng.uniform(-1, 16, (rng.integers(1, 6), 2)) for i in range(23)]
+
+    expected = np.array([eval.getScore(path) for path in paths])
+    assert eval.getScores(paths, chunk_size=5) == pytest.approx(expected)
+    assert eval.getScores(paths, budget=3) == \
+            pytest.approx(np.array([eval.getScore(path, 3) for path in paths]))
+    # single point and empty paths do not cover anything
+    assert np.all(eval.getScores([paths[0][:1]]) == 0)
+    empty = eval.getScores([paths[1], np.zeros((0, 2)), paths[0][:1], paths[2]])
+    assert np.all(empty[1:3] == 0)
+    assert empty[[0, 3]] == pytest.approx(expected[[1, 2]])
+    assert np.all(eval.getScore(np.zeros((0, 2))) == 0)
+    assert eval.getScores([]).shape == (0, 2)
+
+
+def test_masked_get_scores_parallel():
+    rng = np.random.default_rng(5)
+    field = rng.random((20, 20))
+    eval = gr.MaskedEvaluator(field, np.arange(20.0), np.arange(20.0), 1.5)
+    paths = rng.uniform(0, 20, (12, 4, 2))
+
+    scores = eval.getScores(paths, num_workers=2, chunk_size=4)
+    assert scores.shape == (12, 1)
+    assert scores == pytest.approx(eval.getScores(paths))
@@ -0,0 +1,63 @@
+# test_path_evaluator_radius.py
+#
+# Tests of the windowed distance computations of the PathEvaluatorWithRadius.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+from shapely.geometry import Point, LineString
+
+
+def radius_evaluator(method, radius=1.5):
+    rng = np.random.default_rng(3)
+    field = rng.random((40, 30))
+    x_ticks = np.arange(40)*0.5 - 2
+    y_ticks = np.arange(30)*0.5 - 1
+    return gr.PathEvaluatorWithRadius(field, field, x_ticks, y_ticks, \
+                                    {'radius': radius, 'method': method})
+
+
+@pytest.mark.parametrize('method', ['binary', 'linear', 'squared'])
+def test_exact_score_matches_shapely(method):
+    eval = radius_evaluator(method)
+    path = np.array([[0.0, 0.5], [6.0, 4.0], [6.0, 9.0], [25.0, 12.0]])
+
+    ls = LineString(path)
+    distances = np.array([[ls.distance(Point(x, y)) for y in eval.y_ticks] \
+                            for x in eval.x_ticks])
+    expected = eval.distanceMask(distances)
+
+    assert np.allclose(eval.getExactMask(path), expected)
+    assert eval.getExactScore(path)[0] == pytest.approx(np.sum(expected*eval.info_field))
+
+
+@pytest.mark.parametrize('method', ['binary', 'linear', 'squared'])
+def test_distance_transform_score(method):
+    eval = radius_evaluator(method)
+    rng = np.random.default_rng(8)
+
+    for i in range(5):
+        path = rng.uniform(-4, 20, (5, 2))
+        score, _ = eval.getScore(path)
+        exact, _ = eval.getExactScore(path)
+        assert score == pytest.approx(exact, rel=0.02)
+
+        mask = eval.getMask(path)
+        assert mask.shape == eval.info_field.shape
+        assert np.sum(mask*eval.info_field) == pytest.approx(score)
+
+
+def test_distance_transform_window():
+    eval = radius_evaluator('linear', radius=1.0)
+    path = np.array([[3.0, 3.0], [5.0, 3.0]])
+    distances = eval.getDistances(path)
+
+    # outside of the bounding box plus the radius nothing is computed
+    far = (eval.xx < 2) | (eval.xx > 6) | (eval.yy < 2) | (eval.yy > 4)
+    assert np.all(np.isinf(distances[far]))
+    assert np.allclose(distances[~far], eval.getExactDistances(path)[~far])
+
+    # paths outside of the field
+    assert np.all(eval.getMask(np.array([[-50.0, 0.0], [-40.0, 0.0]])) == 0)
+    assert eval.getScore(np.array([[0.0, 0.0]])) == (0., 0.)
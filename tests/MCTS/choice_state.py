@@ -0,0 +1,29 @@
+# choice_state.py
+#
+# The simple search problem shared by the MCTS tests. Each state chooses a
+# value 0-2 (with cost 1), and the reward is the sum of the chosen values.
+
+import rdml_graph as gr
+import numpy as np
+
+
+class ChoiceState(gr.State):
+    def __init__(self, seq=()):
+        self.seq = seq
+
+    def successor(self):
+        return [(ChoiceState(self.seq + (v,)), 1) for v in range(3)]
+
+    def __eq__(self, other):
+        return isinstance(other, ChoiceState) and self.seq == other.seq
+
+    def __hash__(self):
+        return hash(self.seq)
+
+def rewardSum(sequence, budget, data):
+    return float(sum(sequence[-1].seq)), 0
+
+# two conflicting objectives, the sum and the sum of 2 - each value.
+def rewardMulti(sequence, budget, data):
+    seq = sequence[-1].seq
+    return np.array([float(sum(seq)), float(sum(2 - v for v in seq))]), 0
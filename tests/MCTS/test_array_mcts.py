@@ -0,0 +1,60 @@
+# test_array_mcts.py
+#
+# Tests of MCTS using the array backed search tree.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+from choice_state import ChoiceState, rewardSum, rewardMulti
+
+
+def test_array_tree_store():
+    tree = gr.MCTSArrayTree(ChoiceState(), capacity=2)
+    children = tree.successor(0, 1.5)
+    assert len(children) == 3
+    assert tree.capacity >= 4
+    assert tree.num_unpicked(0) == 3
+
+    child = tree.expandNode(0, 2)
+    assert tree.states[child].seq == (2,)
+    assert tree.edge_id[child] == 2
+    assert list(tree.children(0)) == [child]
+    assert tree.num_unpicked(0) == 2
+
+    assert len(tree.successor(child, 1.5)) == 3
+    grand = tree.expandNode(child, 0)
+    assert [s.seq for s in tree.getPath(grand)] == [(), (2,), (2, 0)]
+
+    tree.backpropReward(grand, 2.0, 0)
+    tree.backpropReward(child, 4.0, 0)
+    assert tree.num_updates[0] == 2 and tree.num_updates[grand] == 1
+    assert tree.reward(child) == pytest.approx(3.0)
+    assert tree.best_reward[child] == 4.0
+
+
+def test_array_mcts():
+    solution, reward, other = gr.MCTSArray(ChoiceState(), 300, rewardSum, budget=1.5, \
+                        output_tree=True, get_all_seq=True, capacity=4)
+    assert solution[-1].seq == (2, 2)
+    assert reward == pytest.approx(4)
+    assert other['root'].num_updates[0] == 300
+    assert len(other['all_paths']) == 300
+
+    solution, reward, other = gr.MCTSArray(ChoiceState(), 300, rewardSum, budget=1.5, \
+                        solutionFunc=gr.highestReward)
+    assert reward == 4
+
+    paths, rewards, other = gr.MCTSArray(ChoiceState(), 300, rewardMulti, budget=1.5, \
+                        selection=gr.arrayParetoUCBSelection, multi_obj_dim=2)
+    assert sorted(rewards[:, 0].tolist()) == [0, 1, 2, 3, 4]
+
+
+def test_array_mcts_actor_number():
+    solution, reward, other = gr.MCTSArray(ChoiceState(), 50, rewardSum, budget=1.5, \
+                        actor_number=1, output_tree=True, get_all_seq=True)
+    tree = other['root']
+    assert tree.actor[0] == 1
+    # the rewards are for actor 0, so they are a loss for the root's actor.
+    assert tree.sum_reward[0] == pytest.approx(-np.sum(other['all_rewards']))
@@ -0,0 +1,71 @@
+# test_cached_rollout.py
+#
+# Tests of the rollouts using cached successor tables and rollout policies.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+
+def line_graph():
+    # 0 -> 1 (cost 1) or 2 (cost 3), both -> 3 (cost 1), 3 -> 0 (cost 1)
+    n = [gr.Node(i) for i in range(4)]
+    n[0].addEdge(gr.Edge(n[0], n[1], 1))
+    n[0].addEdge(gr.Edge(n[0], n[2], 3))
+    n[1].addEdge(gr.Edge(n[1], n[3], 1))
+    n[2].addEdge(gr.Edge(n[2], n[3], 1))
+    n[3].addEdge(gr.Edge(n[3], n[0], 1))
+    return n
+
+def rewardIds(sequence, budget, data):
+    return float(sum(s.id for s in sequence)), 0
+
+
+def test_cached_rollout_path():
+    n = line_graph()
+    rollout = gr.cachedRollout(gr.greedyPolicy(lambda s, data: s.id))
+    root = gr.MCTSTree(n[0], 0, None)
+
+    path = rollout(root, 4.5)
+    assert [s.id for s in path] == [0, 2, 3, 0]
+    assert n[0] in rollout.table and n[2] in rollout.table
+
+    path = rollout(root, 4.5, keepEdges=True)
+    assert len(path) == 7
+    assert path[1].c.id == 2 and path[1].p.id == 0
+
+    # the rollout matches the paths of the tree nodes.
+    child = root.successor(4.5)[0]
+    path = rollout(child, 1.5)
+    assert [s.id for s in path] == [0, 1, 3]
+
+
+def test_rollout_policies():
+    n = line_graph()
+    children, costs = gr.cachedSuccessors(n[0], {})
+    assert costs.tolist() == [1, 3]
+
+    greedy = gr.epsilonGreedyPolicy(lambda s, data: s.id, epsilon=0.0)
+    assert greedy(n[0], children, costs, None) == 1
+
+    # the heuristic depends on data, so it is not cached with data
+    weighted = gr.greedyPolicy(lambda s, data: data['w'][s.id])
+    data = {'w': [0, 1, 0, 0]}
+    assert weighted(n[0], children, costs, data) == 0
+    data['w'] = [0, 0, 1, 0]
+    assert weighted(n[0], children, costs, data) == 1
+    assert weighted(n[0], children, costs, {'w': [0, 1, 0, 0]}) == 0
+
+    np.random.seed(0)
+    softmax = gr.softmaxCostPolicy(temperature=1.0)
+    picks = [softmax(n[0], children, costs, None) for i in range(2000)]
+    assert np.mean(picks) == pytest.approx(1 / (1 + np.exp(2)), abs=0.03)
+
+
+def test_mcts_cached_rollout():
+    n = line_graph()
+    solution, reward, other = gr.MCTS(n[0], 100, rewardIds, budget=4.5, \
+                rolloutFunc=gr.cachedRollout(), solutionFunc=gr.highestReward)
+    # 0, 1, 3, 0, 1, 3
+    assert reward == 8
@@ -0,0 +1,50 @@
+# test_child_stats.py
+#
+# Tests of the cached child statistics arrays used by multi-objective selection.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+from choice_state import ChoiceState, rewardMulti
+
+
+def test_child_stats_in_place():
+    root = gr.MCTSTree(ChoiceState(), 0, None)
+    root.unpicked_children = root.successor(2)
+    a = root.expandNode(0)
+    b = root.expandNode(0)
+    a.backpropReward(np.array([1.0, 2.0]), 0)
+    b.backpropReward(np.array([3.0, 0.0]), 0)
+
+    n, r = root.childStats()
+    assert n.tolist() == [1, 1]
+    assert r.tolist() == [[1, 2], [3, 0]]
+
+    # updated in place by backprop and virtual loss
+    a.backpropReward(np.array([1.0, 1.0]), 0)
+    assert root.childStats()[0] is n
+    assert n.tolist() == [2, 1]
+    assert r.tolist() == [[2, 3], [3, 0]]
+    b.addVirtualLoss(np.ones(2))
+    assert r.tolist() == [[2, 3], [2, -1]]
+    b.removeVirtualLoss(np.ones(2))
+    assert n.tolist() == [2, 1]
+
+    # rebuilt once a child is added
+    c = root.expandNode(0)
+    c.backpropReward(np.array([0.0, 0.0]), 0)
+    n, r = root.childStats()
+    assert n.tolist() == [2, 1, 1]
+
+
+def test_pareto_mcts_child_stats():
+    paths, rewards, other = gr.MCTS(ChoiceState(), 300, rewardMulti, budget=1.5, \
+                    selection=gr.paretoUCBSelection, multi_obj_dim=2, output_tree=True)
+    assert sorted(rewards[:, 0].tolist()) == [0, 1, 2, 3, 4]
+
+    root = other['root']
+    n, r = root.childStats()
+    assert n.tolist() == [c.num_updates for c in root.children]
+    assert np.allclose(r, [c.sum_reward for c in root.children])
@@ -0,0 +1,36 @@
+# test_mcts_batch.py
+#
+# Tests of MCTS with batched reward evaluation.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+from choice_state import ChoiceState, rewardSum
+
+
+def rewardSumBatch(sequences, budget, data):
+    data['calls'] += 1
+    seqs = np.array([seq[-1].seq for seq in sequences])
+    return np.sum(seqs, axis=1).astype(float), np.zeros(len(sequences), dtype=int)
+
+
+def test_mcts_batch():
+    data = {'calls': 0}
+    solution, reward, other = gr.MCTSBatch(ChoiceState(), 300, budget=1.5, \
+                    reward_batch=rewardSumBatch, batch_size=16, data=data, \
+                    output_tree=True, get_all_seq=True)
+
+    assert data['calls'] == int(np.ceil(300 / 16))
+    assert solution[-1].seq == (2, 2)
+    assert other['root'].num_updates == 300
+    assert other['root'].sum_reward == pytest.approx(np.sum(other['all_rewards']))
+
+    # falls back to the single reward function
+    solution, reward, other = gr.MCTSBatch(ChoiceState(), 300, rewardSum, budget=1.5, \
+                    solutionFunc=gr.highestReward, batch_size=8)
+    assert reward == 4
+
+    with pytest.raises(ValueError):
+        gr.MCTSBatch(ChoiceState(), 10)
@@ -0,0 +1,98 @@
+# test_mcts_deep.py
+#
+# Tests that backpropagation and path extraction work for trees deeper than
+# the recursion limit.
+
+import pytest
+import sys
+import pickle
+
+import rdml_graph as gr
+from rdml_graph.mcts.ParallelMCTS import treeStats, mergeTreeStats
+import numpy as np
+
+
+class IncrementState(gr.State):
+    def __init__(self, num):
+        self.num = num
+
+    def successor(self):
+        return [(IncrementState(self.num+1), 1)]
+
+
+def test_deep_backprop_and_path():
+    depth = sys.getrecursionlimit() + 100
+    root = gr.MCTSTree(IncrementState(0), 0, None)
+    node = root
+    for i in range(depth):
+        node = node.successor(np.inf)[0]
+
+    path = node.getPath()
+    assert len(path) == depth + 1
+    assert [s.num for s in path[:3]] == [0, 1, 2]
+    assert path[-1].num == depth
+
+    node.backpropReward(2.0, 0)
+    node.backpropReward(1.0, 1)
+    assert root.num_updates == 2
+    assert root.sum_reward == pytest.approx(1.0)
+    assert root.best_reward == 2.0
+
+
+def test_horizon_path_cache():
+    root = gr.MCTSTree(IncrementState(0), 0, None)
+    root.unpicked_children = root.successor(0.5)
+    child = root.expandNode()
+    child.unpicked_children = child.successor(0.5)
+
+    # horizon node, the path is cached after the first update.
+    path = gr.randomRollout(child, 0.5)
+    assert [s.num for s in path] == [0, 1]
+    child.backpropReward(1.0, 0)
+    path.append(None)
+
+    for i in range(2):
+        path = gr.randomRollout(child, 0.5)
+        assert [s.num for s in path] == [0, 1]
+    assert child._path_cache is not None
+
+
+def test_deep_tree_stats_merge():
+    depth = sys.getrecursionlimit() + 100
+    root = gr.MCTSTree(IncrementState(0), 0, None)
+    node = root
+    for i in range(depth):
+        node.unpicked_children = node.successor(np.inf)
+        node = node.expandNode()
+    node.backpropReward(3.0, 0)
+
+    stats = pickle.loads(pickle.dumps(treeStats(root)))
+    assert len(stats) == depth + 1
+
+    merged = gr.MCTSTree(IncrementState(0), 0, None)
+    merged.unpicked_children = merged.successor(np.inf)
+    mergeTreeStats(merged, stats, np.inf)
+    mergeTreeStats(merged, stats, np.inf)
+
+    leaf = merged
+    while len(leaf.children) > 0:
+        assert len(leaf.children) == 1
+        assert leaf.num_updates == 2
+        leaf = leaf.children[0]
+    assert leaf.state.num == depth
+    assert leaf.sum_reward == pytest.approx(6.0)
+
+
+def rewardNum(sequence, budget, data):
+    return float(sequence[-1].num), 0
+
+
+@pytest.mark.parametrize('solutionFunc', [gr.bestAvgReward, gr.mostSimulations])
+def test_deep_mcts_search(solutionFunc):
+    depth = sys.getrecursionlimit() + 100
+    seq, reward, other = gr.MCTS(IncrementState(0), depth, rewardNum, budget=depth + 50, \
+                            solutionFunc=solutionFunc)
+
+    # a chain, so the tree is a single path as deep as the iterations.
+    assert len(seq) == depth + 1
+    assert [s.num for s in seq] == list(range(depth + 1))
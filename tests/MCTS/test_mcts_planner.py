@@ -0,0 +1,51 @@
+# test_mcts_planner.py
+#
+# Tests of the anytime resumable MCTS planner.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+from choice_state import ChoiceState, rewardSum
+
+
+def test_planner_resume_and_advance():
+    planner = gr.MCTSPlanner(ChoiceState(), rewardSum, budget=2.5, \
+                    solutionFunc=gr.highestReward)
+
+    solution, reward, other = planner.run(max_iterations=200)
+    assert planner.iterations == 200
+    assert solution[-1].seq == (2, 2, 2)
+
+    solution, reward, other = planner.run(max_iterations=100, output_tree=True)
+    assert planner.iterations == 300
+    assert other['root'].num_updates == 300
+
+    child = [c for c in planner.root.children if c.parent_e_id == 1][0]
+    updates = child.num_updates
+    root = planner.advance(1)
+    assert root is child
+    assert root.parent is None
+    assert root.num_updates == updates
+
+    solution, reward, other = planner.run(max_iterations=100)
+    assert solution[0].seq == (1,)
+    assert solution[-1].seq == (1, 2, 2)
+    assert planner.root.num_updates == updates + 100
+
+    # advance by state
+    root = planner.advance(ChoiceState((1, 0)))
+    assert root.state.seq == (1, 0)
+    with pytest.raises(ValueError):
+        planner.advance(5)
+
+
+def test_planner_time_limit():
+    planner = gr.MCTSPlanner(ChoiceState(), rewardSum, budget=1.5)
+    solution, reward, other = planner.run(time_limit=0.05)
+    assert planner.iterations > 0
+    assert len(solution) == 3
+
+    with pytest.raises(ValueError):
+        planner.run()
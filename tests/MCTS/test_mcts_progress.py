@@ -0,0 +1,54 @@
+# test_mcts_progress.py
+#
+# Tests of the opt-in, rate-limited progress reporting of MCTS.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+from choice_state import ChoiceState, rewardSum
+
+
+def test_mcts_no_progress_output(capsys):
+    gr.MCTS(ChoiceState(), 50, rewardSum, budget=1.5)
+    captured = capsys.readouterr()
+    assert captured.err == ''
+    assert captured.out == ''
+
+    gr.MCTS(ChoiceState(), 50, rewardSum, budget=1.5, show_progress=True)
+    assert '50/50' in capsys.readouterr().err
+
+
+def test_mcts_progress_rate_limited():
+    calls = []
+    gr.MCTS(ChoiceState(), 500, rewardSum, budget=1.5, iter_up_progress=1, \
+                progress_func=calls.append)
+    # the first update is always reported, the rest are limited to every 0.1s
+    assert calls[0] == 0
+    assert 1 <= len(calls) < 50
+
+    progress = gr.MCTSProgress(100, calls.append, iter_up_progress=10, min_interval=0)
+    assert progress.next == 0
+    progress.update(0)
+    assert progress.next == 10
+    assert gr.MCTSProgress(100).next == np.inf
+
+
+def test_has_keep_edges():
+    assert gr.hasKeepEdges(gr.randomRollout)
+    assert not gr.hasKeepEdges(rewardSum)
+
+
+def test_planner_progress(capsys):
+    planner = gr.MCTSPlanner(ChoiceState(), rewardSum, budget=1.5)
+    planner.run(30)
+    assert capsys.readouterr().err == ''
+
+    planner.run(30, show_progress=True)
+    assert '30/30' in capsys.readouterr().err
+
+    calls = []
+    planner.run(time_limit=0.05, iter_up_progress=1, progress_func=calls.append)
+    assert calls[0] == pytest.approx(0, abs=0.1)
+    assert all(0 <= c <= 1 for c in calls)
@@ -0,0 +1,68 @@
+# test_mcts_seed.py
+#
+# Tests that seeded MCTS searches (including the parallel searches) are
+# reproducible, using numpy Generators.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+from choice_state import ChoiceState, rewardMulti
+
+
+def rewardNoisy(sequence, budget, data):
+    # a reward that depends on the whole sequence, so rollouts differ.
+    seq = sequence[-1].seq
+    return float(sum((i + 1) * v for i, v in enumerate(seq))), 0
+
+
+def run(seed, **kwargs):
+    return gr.MCTS(ChoiceState(), 100, rewardNoisy, budget=2.5, seed=seed, \
+                    get_all_seq=True, output_tree=True, **kwargs)
+
+
+def test_mcts_seed_reproducible():
+    _, _, a = run(3)
+    # the global random state should not change the search
+    np.random.seed(10)
+    _, _, b = run(np.random.SeedSequence(3))
+    _, _, c = run(4)
+
+    assert a['all_rewards'].tolist() == b['all_rewards'].tolist()
+    assert a['all_rewards'].tolist() != c['all_rewards'].tolist()
+    assert [n.num_updates for n in a['root'].children] == \
+                [n.num_updates for n in b['root'].children]
+    # the generator is shared with the children
+    assert a['root'].children[0].rng is a['root'].rng
+
+
+def test_mcts_seed_pareto():
+    def front(seed):
+        paths, rewards, other = gr.MCTS(ChoiceState(), 100, rewardMulti, budget=2.5, \
+                    selection=gr.paretoUCBSelection, multi_obj_dim=2, seed=seed, \
+                    get_all_seq=True)
+        return other['all_rewards']
+    assert np.array_equal(front(1), front(1))
+
+
+def test_spawn_seeds():
+    a = gr.spawnSeeds(5, 3)
+    b = gr.spawnSeeds(5, 3)
+    assert len(a) == 3
+    assert [s.generate_state(2).tolist() for s in a] == [s.generate_state(2).tolist() for s in b]
+    assert len(set(tuple(s.generate_state(2)) for s in a)) == 3
+    assert len(gr.spawnSeeds(np.random.default_rng(1), 2)) == 2
+
+
+@pytest.mark.parametrize('planner', [gr.MCTSRootParallel, gr.MCTSLeafParallel])
+def test_parallel_seed_reproducible(planner):
+    def search():
+        return planner(ChoiceState(), 120, rewardNoisy, budget=2.5, num_workers=2, \
+                        seed=7, get_all_seq=True)
+    seq_a, reward_a, a = search()
+    seq_b, reward_b, b = search()
+
+    assert reward_a == reward_b
+    assert [s.seq for s in seq_a] == [s.seq for s in seq_b]
+    assert sorted(a['all_rewards'].tolist()) == sorted(b['all_rewards'].tolist())
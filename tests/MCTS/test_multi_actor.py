@@ -0,0 +1,81 @@
+# test_multi_actor.py
+#
+# Tests of MCTS with N actors, using reward vectors with a reward for each actor.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+
+class PickState(gr.State):
+    def __init__(self, picks=(), num_actors=3):
+        self.picks = picks
+        self.num_actors = num_actors
+
+    # each actor picks a value in turn (one round), returning the actor moving.
+    def successor(self):
+        if len(self.picks) >= self.num_actors:
+            return []
+        actor = len(self.picks)
+        return [(PickState(self.picks + (v,), self.num_actors), 0, actor) for v in range(3)]
+
+# each actor gains its own pick, and loses half of the other picks, so picking
+# 2 is best for every actor, while bad for the other actors.
+def rewardPicks(sequence, budget, data):
+    picks = np.array(sequence[-1].picks, dtype=float)
+    return picks - 0.5 * (np.sum(picks) - picks), 0
+
+
+def test_actor_reward():
+    assert gr.actorReward(2.0, 1, 3).tolist() == [-2, 2, -2]
+    assert gr.actorReward(np.array([1, 2, 3]), 0, 3).tolist() == [1, 2, 3]
+
+
+def test_multi_actor_tree_backprop():
+    root = gr.MultiActorTree(PickState(), 0, None, num_actors=3)
+    root.unpicked_children = root.successor()
+    child = root.expandNode(0)
+    child.backpropReward(np.array([1.0, -1.0, 3.0]), 0)
+    child.backpropReward(np.array([3.0, 0.0, -1.0]), 0)
+
+    assert child.actor_number == 0
+    assert root.num_updates == 2
+    assert root.rewards().tolist() == [2.0, -0.5, 1.0]
+    assert child.reward() == 2.0
+    assert child.best_reward.tolist() == [3.0, 0.0, 3.0]
+
+    num_updates, sum_reward = root.childRewards()
+    assert num_updates.tolist() == [2]
+    assert sum_reward.tolist() == [4.0]
+
+
+@pytest.mark.parametrize('selection', [gr.actorUCBSelection, gr.UCBSelection])
+def test_multi_actor_mcts(selection):
+    np.random.seed(0)
+    solution, reward, other = gr.MCTS(PickState(), 600, rewardPicks, \
+                        selection=selection, num_actors=3, output_tree=True)
+
+    # every actor picks the best for itself.
+    assert solution[-1].picks == (2, 2, 2)
+    assert reward == pytest.approx(0.0)
+    root = other['root']
+    assert root.sum_reward.shape == (3,)
+    assert [c.actor_number for c in root.children] == [0, 0, 0]
+    assert [c.actor_number for c in root.children[0].children] == [1, 1, 1]
+
+
+def test_multi_actor_best_sequence():
+    solution, reward, other = gr.MCTS(PickState(), 200, rewardPicks, \
+                        selection=gr.actorUCBSelection, solutionFunc=gr.highestReward, \
+                        num_actors=3, actor_number=1, get_all_seq=True)
+    # the best sequence seen for actor 1.
+    assert reward[1] == np.max(other['all_rewards'][:, 1])
+    assert solution[-1].picks[1] == 2
+    assert reward.tolist() == rewardPicks(solution, 1.0, None)[0].tolist()
+
+
+def test_multi_actor_transposition_unsupported():
+    with pytest.raises(ValueError):
+        gr.MCTS(PickState(), 10, rewardPicks, num_actors=3, \
+                transposition=lambda node: node.state.picks)
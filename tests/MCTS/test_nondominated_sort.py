@@ -0,0 +1,71 @@
+# test_nondominated_sort.py
+#
+# Tests of the non-dominated sorting and hypervolume functions.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+
+def peel_ranks(values):
+    ranks = np.full(values.shape[0], -1)
+    remaining = np.arange(values.shape[0])
+    rank = 0
+    while len(remaining) > 0:
+        # get_pareto removes duplicates, so compare directly.
+        v = values[remaining]
+        dominated = np.array([np.any(np.all(v >= p, axis=1) & np.any(v > p, axis=1)) for p in v])
+        ranks[remaining[~dominated]] = rank
+        remaining = remaining[dominated]
+        rank += 1
+    return ranks
+
+
+@pytest.mark.parametrize('dim', [2, 3, 4])
+def test_nondominated_sort(dim):
+    rng = np.random.RandomState(dim)
+    values = rng.randint(0, 8, size=(300, dim)).astype(float)
+
+    ranks, fronts = gr.nondominated_sort(values, return_fronts=True)
+    assert ranks.tolist() == peel_ranks(values).tolist()
+    assert len(fronts) == ranks.max() + 1
+    for r, front in enumerate(fronts):
+        assert np.all(ranks[front] == r)
+    assert sorted(fronts[0].tolist()) == sorted(np.flatnonzero(ranks == 0).tolist())
+
+
+def test_get_pareto_2d():
+    rng = np.random.RandomState(2)
+    values = rng.randint(0, 10, size=(200, 2)).astype(float)
+    expected = [i for i in range(200) if not np.any( \
+                (np.all(values >= values[i], axis=1) & np.any(values > values[i], axis=1)) | \
+                (np.all(values == values[i], axis=1) & (np.arange(200) < i)))]
+    assert gr.get_pareto(values).tolist() == expected
+    assert np.flatnonzero(gr.get_pareto(values, return_mask=True)).tolist() == expected
+
+
+def brute_volume(values, ref):
+    # unit cubes of integer values dominated by any value
+    upper = values.max(axis=0).astype(int)
+    grid = np.stack(np.meshgrid(*[np.arange(int(r), u) + 0.5 for r, u in zip(ref, upper)], \
+                        indexing='ij'), axis=-1).reshape(-1, values.shape[1])
+    return np.count_nonzero(np.any(np.all(values[np.newaxis] >= grid[:, np.newaxis], axis=2), axis=1))
+
+
+@pytest.mark.parametrize('dim', [2, 3])
+def test_hypervolume_exact(dim):
+    rng = np.random.RandomState(7 + dim)
+    for i in range(5):
+        values = rng.randint(1, 12, size=(25, dim)).astype(float)
+        ref = np.zeros(dim)
+        assert gr.hypervolume(values, ref) == pytest.approx(brute_volume(values, ref))
+
+    assert gr.hypervolume(np.array([[1.0, 2.0], [2.0, 1.0]]), [0, 0]) == pytest.approx(3.0)
+    assert gr.hypervolume(np.array([[-1.0, 2.0]]), [0, 0]) == 0.0
+
+
+def test_hypervolume_monte_carlo():
+    values = np.array([[2.0, 1.0, 1.0, 1.0], [1.0, 2.0, 1.0, 1.0]])
+    hv = gr.hypervolume(values, np.zeros(4), num_samples=200000, seed=1)
+    assert hv == pytest.approx(3.0, rel=0.03)
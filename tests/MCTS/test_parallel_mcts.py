@@ -0,0 +1,163 @@
+# test_parallel_mcts.py
+#
+# Tests of the root, leaf, and tree parallel versions of MCTS.
+
+import pytest
+import threading
+import time
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+
+import rdml_graph as gr
+import numpy as np
+
+import rdml_graph.mcts.ParallelMCTS as ParallelMCTS
+
+from choice_state import ChoiceState, rewardSum, rewardMulti
+
+
+@pytest.mark.parametrize('planner', [gr.MCTSRootParallel, gr.MCTSLeafParallel])
+def test_parallel_mcts_single(planner):
+    start = ChoiceState()
+    solution, reward, other = planner(start, 400, rewardSum, budget=1.5, \
+                    solutionFunc=gr.highestReward, output_tree=True, \
+                    get_all_seq=True, num_workers=2, seed=3)
+
+    assert reward == 4
+    assert solution[-1].seq == (2, 2)
+    assert other['root'].num_updates == 400
+    assert len(other['all_paths']) == 400
+    # the trees are merged with expanded children.
+    assert len(other['root'].children) == 3
+
+
+@pytest.mark.parametrize('planner', [gr.MCTSRootParallel, gr.MCTSLeafParallel])
+def test_parallel_mcts_multi(planner):
+    start = ChoiceState()
+    paths, rewards, other = planner(start, 300, rewardMulti, budget=1.5, \
+                    selection=gr.paretoUCBSelection, multi_obj_dim=2, \
+                    num_workers=2, seed=5)
+
+    assert len(paths) == len(rewards)
+    assert np.all(np.sum(rewards, axis=1) == 4)
+    assert sorted(rewards[:, 0].tolist()) == [0, 1, 2, 3, 4]
+
+
+def rewardSlow(sequence, budget, data):
+    time.sleep(0.005)
+    return rewardSum(sequence, budget, data)
+
+
+def test_leaf_parallel_interrupt():
+    timer = threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGINT))
+    timer.start()
+    solution, reward, other = gr.MCTSLeafParallel(ChoiceState(), 100000, rewardSlow, \
+                    budget=1.5, solutionFunc=gr.highestReward, output_tree=True, \
+                    get_all_seq=True, num_workers=2)
+    timer.join()
+
+    root = other['root']
+    assert 0 < len(other['all_paths']) < 100000
+    assert root.num_updates == len(other['all_paths'])
+
+
+def test_leaf_parallel_worker_mirror():
+    params = {'start': ChoiceState(), 'rewardFunc': rewardSum, 'budget': 1.5, \
+              'rolloutFunc': gr.randomRollout, 'data': None, 'multi_obj_dim': 1, \
+              'get_all_seq': False, 'keepEdges': False, 'keepNodes': True, \
+              'rollout_has_keep_edges': True}
+    ParallelMCTS._init_worker(params)
+    try:
+        for e_path in [[], [1], [1, 2]]:
+            results = ParallelMCTS._leaf_parallel_worker(e_path, gr.spawnSeeds(0, 5))
+            assert len(results) == 5
+
+        # only the successors of the selected paths are kept.
+        root = ParallelMCTS._worker['root']
+        expanded = [n for n in [root] + [e.c for e in root.e] if n.succ_called]
+        assert len(expanded) == 2
+        assert not any(e.c.succ_called for e in root.e[1].c.e)
+    finally:
+        ParallelMCTS._init_worker({})
+
+
+def test_tree_parallel_mcts():
+    start = ChoiceState()
+    solution, reward, other = gr.MCTSTreeParallel(start, 400, rewardSum, budget=1.5, \
+                    solutionFunc=gr.highestReward, output_tree=True, \
+                    get_all_seq=True, num_workers=4)
+
+    assert reward == 4
+    assert solution[-1].seq == (2, 2)
+    assert len(other['all_paths']) == 400
+
+    # all of the virtual loss has been removed.
+    root = other['root']
+    assert root.num_updates == 400
+    assert root.sum_reward == pytest.approx(np.sum(other['all_rewards']))
+
+    paths, rewards, other = gr.MCTSTreeParallel(start, 300, rewardMulti, budget=1.5, \
+                    selection=gr.paretoUCBSelection, multi_obj_dim=2, num_workers=4)
+    assert sorted(rewards[:, 0].tolist()) == [0, 1, 2, 3, 4]
+
+
+def test_virtual_loss():
+    root = gr.MCTSTree(ChoiceState(), 0, None)
+    root.unpicked_children = root.successor(2)
+    child = root.expandNode(0)
+    child.backpropReward(2.0, 0)
+
+    child.addVirtualLoss(1.0)
+    assert child.num_updates == 2 and root.num_updates == 2
+    assert child.reward() == pytest.approx(0.5)
+
+    child.removeVirtualLoss(1.0)
+    assert child.num_updates == 1 and root.num_updates == 1
+    assert child.reward() == pytest.approx(2.0)
+
+
+def test_tree_parallel_concurrent_workers():
+    lock = threading.Lock()
+    count = {'in_flight': 0, 'max': 0}
+
+    def rewardSlow(sequence, budget, data):
+        with lock:
+            count['in_flight'] += 1
+            count['max'] = max(count['max'], count['in_flight'])
+        time.sleep(0.002)
+        with lock:
+            count['in_flight'] -= 1
+        return rewardSum(sequence, budget, data)
+
+    solution, reward, other = gr.MCTSTreeParallel(ChoiceState(), 100, rewardSlow, \
+                    budget=1.5, solutionFunc=gr.highestReward, output_tree=True, \
+                    num_workers=4)
+    assert count['max'] > 1
+    assert reward == 4
+    assert other['root'].num_updates == 100
+
+
+def test_tree_parallel_process_executor():
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(TypeError):
+            gr.MCTSTreeParallel(ChoiceState(), 10, rewardSum, budget=1.5, executor=executor)
+
+
+def test_tree_parallel_interrupt():
+    def rewardSlow(sequence, budget, data):
+        time.sleep(0.005)
+        return rewardSum(sequence, budget, data)
+
+    timer = threading.Timer(0.1, os.kill, (os.getpid(), signal.SIGINT))
+    timer.start()
+    solution, reward, other = gr.MCTSTreeParallel(ChoiceState(), 100000, rewardSlow, \
+                    budget=1.5, solutionFunc=gr.highestReward, output_tree=True, \
+                    get_all_seq=True, num_workers=2)
+    timer.join()
+
+    # the in flight rollouts finished, and none of the virtual loss remains.
+    root = other['root']
+    assert 0 < len(other['all_paths']) < 100000
+    assert root.num_updates == len(other['all_paths'])
+    assert root.sum_reward == pytest.approx(np.sum(other['all_rewards']))
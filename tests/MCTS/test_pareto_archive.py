@@ -0,0 +1,109 @@
+# test_pareto_archive.py
+#
+# Tests of the pareto archive, compared against ParetoFront and get_pareto.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+
+def as_set(front):
+    return set(map(tuple, np.asarray(front).tolist()))
+
+
+@pytest.mark.parametrize('dim', [2, 3, 4])
+def test_pareto_archive_matches_front(dim):
+    rng = np.random.RandomState(dim)
+    rewards = rng.randint(0, 30, size=(600, dim)).astype(float)
+
+    archive = gr.ParetoArchive(dim, leaf_size=5)
+    front = gr.ParetoFront(dim)
+    for i, r in enumerate(rewards):
+        assert archive.check_efficient(r) == front.check_efficient(r)
+        assert archive.check_and_add(r, i) == front.check_and_add(r, i)
+        assert len(archive) == front.size
+
+    a_front, a_vals = archive.get()
+    f_front, f_vals = front.get()
+    assert as_set(a_front) == as_set(f_front)
+    assert as_set(a_front) == as_set(rewards[gr.get_pareto(rewards)])
+    for r, v in zip(a_front, a_vals):
+        assert np.array_equal(rewards[v], r)
+
+
+@pytest.mark.parametrize('dim', [2, 3])
+def test_pareto_archive_batch(dim):
+    rng = np.random.RandomState(10 + dim)
+    rewards = rng.random_sample((2000, dim))
+
+    archive = gr.ParetoArchive(dim)
+    archive.check_and_add_batch(rewards[:1000], list(range(1000)))
+    archive.check_and_add_batch(rewards[1000:])
+    assert as_set(archive.get()[0]) == as_set(rewards[gr.get_pareto(rewards)])
+
+
+@pytest.mark.parametrize('dim', [2, 3])
+@pytest.mark.parametrize('evict', ['crowding', 'hypervolume'])
+@pytest.mark.parametrize('evict_batch', [1, None])
+def test_pareto_archive_bounded(dim, evict, evict_batch):
+    # points on a front, so every value is non-dominated.
+    angles = np.linspace(0, np.pi/2, 200)
+    rewards = np.zeros((200, dim))
+    rewards[:, 0] = np.cos(angles)
+    rewards[:, 1] = np.sin(angles)
+
+    archive = gr.ParetoArchive(dim, max_size=20, leaf_size=4, evict=evict, \
+                                evict_batch=evict_batch, seed=1)
+    for r in np.random.RandomState(0).permutation(rewards):
+        archive.check_and_add(r, None)
+        assert len(archive) <= 20
+    front, vals = archive.get()
+    # each eviction removes a batch of evict_batch values (20 // 10 by default).
+    assert archive.evict_batch == (1 if evict_batch == 1 else 2)
+    assert 21 - archive.evict_batch <= len(archive) <= 20
+    assert front.shape == (len(archive), dim)
+    # the boundaries are never removed
+    assert as_set(rewards[[0, -1]]) <= as_set(front)
+
+
+def test_crowding_distance():
+    values = np.array([[0, 4], [1, 3], [3, 1], [4, 0]])
+    d = gr.crowding_distance(values)
+    assert np.isinf(d[0]) and np.isinf(d[3])
+    assert d[1] == pytest.approx(2 * 3 / 4)
+    assert d[2] == pytest.approx(2 * 3 / 4)
+
+
+def test_pareto_archive_bounded_batch():
+    rewards = np.random.RandomState(2).uniform(size=(500, 3))
+    rewards /= np.linalg.norm(rewards, axis=1)[:, np.newaxis]
+
+    archive = gr.ParetoArchive(3, max_size=50, evict_batch=10)
+    archive.check_and_add_batch(rewards)
+    assert 41 <= len(archive) <= 50
+    with pytest.raises(ValueError):
+        gr.ParetoArchive(3, evict='random')
+
+
+def test_hypervolume_contributions():
+    values = np.array([[0, 4], [1, 3], [3, 1], [4, 0]])
+    c = gr.hypervolume_contributions(values)
+    assert np.isinf(c[0]) and np.isinf(c[3])
+    assert c[1] == pytest.approx(1 * 2)
+    assert c[2] == pytest.approx(2 * 1)
+
+    ref = np.array([-1.0, -1.0])
+    c = gr.hypervolume_contributions(values, ref)
+    total = gr.hypervolume(values, ref)
+    for i in range(len(values)):
+        assert c[i] == pytest.approx(total - gr.hypervolume(np.delete(values, i, axis=0), ref))
+
+    # 3 dimensions (monte carlo) against the exact leave one out volumes.
+    values = np.random.RandomState(3).uniform(size=(20, 3))
+    values = values[gr.get_pareto(values)]
+    ref = np.zeros(3)
+    c = gr.hypervolume_contributions(values, ref, num_samples=400000, seed=4)
+    total = gr.hypervolume(values, ref)
+    exact = [total - gr.hypervolume(np.delete(values, i, axis=0), ref) for i in range(len(values))]
+    assert c == pytest.approx(exact, abs=0.01)
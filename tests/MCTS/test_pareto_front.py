@@ -78,3 +78,14 @@ def test_pareto_function_with_realloc():
         assert pr_idxs[i] == ans[i]
 
 
+
+
+def test_pareto_pairwise():
+    rewards = np.array([[3,4,5], [2, 3,4], [5,2,1], [3,4,6], [3, 2, 1], [2, 7,2], [5,2,1]])
+    assert gr.get_pareto_pairwise(rewards).tolist() == [2,3,5]
+
+    rng = np.random.RandomState(4)
+    for i in range(20):
+        rewards = rng.randint(0, 4, size=(30, 3)).astype(float)
+        assert gr.get_pareto_pairwise(rewards).tolist() == \
+                    sorted(gr.get_pareto(rewards).tolist())
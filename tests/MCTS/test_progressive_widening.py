@@ -0,0 +1,57 @@
+# test_progressive_widening.py
+#
+# Tests of MCTS with progressive widening and lazy successor generation.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+from choice_state import rewardSum
+
+
+class WideState(gr.State):
+    def __init__(self, seq=()):
+        self.seq = seq
+
+    def successor(self):
+        return [(WideState(self.seq + (v,)), 1) for v in range(200)]
+
+    def __eq__(self, other):
+        return isinstance(other, WideState) and self.seq == other.seq
+
+    def __hash__(self):
+        return hash(self.seq)
+
+def priorLast(state, data):
+    return state.seq[-1]
+
+
+def test_lazy_successor():
+    root = gr.MCTSTree(WideState(), 0, None)
+    root.unpicked_children = root.lazySuccessor(np.inf, prior=priorLast)
+    assert len(root.unpicked_children) == 200
+    assert all(c is None for c in root._succ_nodes)
+
+    child = root.expandNode()
+    assert child.state.seq == (199,)
+    assert child.parent_e_id == 199
+    assert sum(c is not None for c in root._succ_nodes) == 1
+    assert root.expandNode().state.seq == (198,)
+
+    # successor reuses the already created children
+    succ = root.successor(np.inf)
+    assert len(succ) == 200
+    assert succ[199] is child
+    assert root.expandNode().state.seq == (197,)
+
+
+def test_progressive_widening():
+    solution, reward, other = gr.MCTS(WideState(), 400, rewardSum, budget=1.5, \
+                rolloutFunc=gr.cachedRollout(), widening=(1.0, 0.5), prior=priorLast, \
+                output_tree=True)
+    root = other['root']
+    assert len(root.children) <= np.ceil(np.sqrt(root.num_updates))
+    assert len(root.unpicked_children) + len(root.children) == 200
+    assert sorted(c.state.seq[0] for c in root.children)[-1] == 199
+    assert solution[1].seq[0] >= 180
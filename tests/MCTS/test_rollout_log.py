@@ -0,0 +1,87 @@
+# test_rollout_log.py
+#
+# Tests of the memory-bounded RolloutLog of the MCTS rollouts.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+from choice_state import ChoiceState, rewardSum, rewardMulti
+
+
+def rewardMultiActor(sequence, budget, data):
+    return rewardMulti(sequence, budget, data)[0], 1
+
+
+def test_rollout_log_chunks():
+    log = gr.RolloutLog(chunk_size=3)
+    seqs = [[0, 1, 2], [3], [], [4, 5], [1, 0]]
+    for i, seq in enumerate(seqs):
+        log.append((seq, float(i), i % 2))
+
+    assert len(log) == 5
+    assert log.rewards().tolist() == [0, 1, 2, 3, 4]
+    assert log.actors().tolist() == [0, 1, 0, 1, 0]
+    assert [log.decode(ids) for ids in log.sequences()] == seqs
+    assert log.offsets().tolist() == [0, 3, 4, 4, 6, 8]
+    # ids are given in order of first appearence
+    assert log.ids().tolist() == [0, 1, 2, 3, 4, 5, 1, 0]
+
+
+def test_rollout_log_memmap(tmp_path):
+    path = str(tmp_path / 'rollouts')
+    log = gr.RolloutLog(path=path, chunk_size=4, idFunc=lambda x: x * 10)
+    for i in range(10):
+        log.add(list(range(i % 3)), np.array([i, -i]), 0)
+
+    rewards = log.rewards()
+    assert isinstance(rewards, np.memmap)
+    assert rewards.shape == (10, 2)
+    assert rewards[:, 1].tolist() == [-i for i in range(10)]
+    assert [s.tolist() for s in log.sequences()][:3] == [[], [0], [0, 10]]
+    log.remove()
+
+
+def test_rollout_log_reservoir():
+    log = gr.RolloutLog(max_size=50, seed=3)
+    for i in range(1000):
+        log.add([i], float(i), 0)
+
+    assert len(log) == 50
+    assert log.num_seen == 1000
+    rewards = log.rewards()
+    assert len(np.unique(rewards)) == 50
+    # uniform sample over all of the rollouts
+    assert rewards.mean() > 250
+    assert all(log.decode(ids)[0] == r for ids, r in zip(log.sequences(), rewards))
+    # only the elements of the sampled rollouts are kept
+    assert len(log.vocab) == 50
+    assert len(log.items) < 100
+
+
+def test_mcts_rollout_log():
+    log = gr.RolloutLog()
+    seq, reward, other = gr.MCTS(ChoiceState(), 200, rewardSum, budget=1.5, \
+                            get_all_seq=log, output_tree=True)
+
+    assert reward == 4
+    assert other['rollouts'] is log
+    assert 'all_paths' not in other
+    assert len(log) == 200
+    assert other['root'].sum_reward == pytest.approx(np.sum(other['all_rewards']))
+    for ids, r in zip(log.sequences(), other['all_rewards']):
+        path = log.decode(ids)
+        assert len(path) == 3
+        assert r == sum(path[-1].seq)
+
+
+def test_mcts_rollout_log_multi():
+    log = gr.RolloutLog(max_size=20, idFunc=lambda s: len(s.seq))
+    paths, rewards, other = gr.MCTS(ChoiceState(), 100, rewardMultiActor, budget=1.5, \
+                            selection=gr.paretoUCBSelection, multi_obj_dim=2, \
+                            get_all_seq=log)
+
+    assert other['all_rewards'].shape == (20, 2)
+    assert np.all(other['all_actors'] == 1)
+    assert all(ids.tolist() == [0, 1, 2] for ids in log.sequences())
@@ -0,0 +1,70 @@
+# test_transposition.py
+#
+# Tests of MCTS with a transposition table sharing statistics between tree nodes.
+
+import pytest
+
+import rdml_graph as gr
+import numpy as np
+
+from choice_state import ChoiceState, rewardSum
+
+
+def orderKey(tree):
+    return tuple(sorted(tree.state.seq))
+
+
+def test_transposition_shared_stats():
+    root = gr.TranspositionTree(ChoiceState(), 0, None, orderKey)
+    a, b, c = root.successor(np.inf)
+    ab = a.successor(np.inf)[1]
+    ba = b.successor(np.inf)[0]
+    assert ab.state.seq == (0, 1) and ba.state.seq == (1, 0)
+
+    ab.backpropReward(1.0, 0)
+    assert ba.num_updates == 1
+    assert ba.sum_reward == 1.0
+    assert ba.best_reward == 1.0
+    # the other parent is not updated by the backprop
+    assert b.num_updates == 0
+    assert root.num_updates == 1
+    assert len(root.table) == 9
+
+
+def test_mcts_transposition():
+    solution, reward, other = gr.MCTS(ChoiceState(), 300, rewardSum, budget=1.5, \
+                    transposition=orderKey, output_tree=True)
+    assert solution[-1].seq == (2, 2)
+    assert isinstance(other['root'], gr.TranspositionTree)
+
+
+def test_graph_keys():
+    node = gr.Node(4)
+    root = gr.MCTSTree(gr.Node(1), 0, None)
+    child = gr.MCTSTree(node, 2.4, root)
+
+    assert gr.nodeBudgetKey(1.0)(child) == (4, 2)
+    assert gr.nodeBudgetKey(0.5)(child) == (4, 4)
+    assert gr.nodeVisitedKey(1.0)(child) == (4, frozenset([1, 4]), 2)
+
+
+def sumKey(tree):
+    return sum(tree.state.seq)
+
+
+def test_transposition_repeated_key():
+    # (), (0,), and (0, 0) all have the key 0, so they share one entry
+    root = gr.TranspositionTree(ChoiceState(), 0, None, sumKey)
+    leaf = root.successor(np.inf)[0].successor(np.inf)[0]
+    assert leaf.state.seq == (0, 0)
+
+    leaf.backpropReward(2.0, 0)
+    assert root.num_updates == 1
+    assert root.sum_reward == 2.0
+
+    leaf.addVirtualLoss(1.0)
+    assert root.num_updates == 2
+    assert root.sum_reward == 1.0
+    leaf.removeVirtualLoss(1.0)
+    assert root.num_updates == 1
+    assert root.sum_reward == 2.0